@@ -1,6 +1,8 @@
 """Module for admin."""
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils.translation import ngettext
+from .jobs import enqueue
 from .models import Country, Feast, City, Client, CountryToFeast, CountryClient
 
 class CountryFeastInline(admin.TabularInline):
@@ -28,6 +30,16 @@ class CountryAdmin(admin.ModelAdmin):
 
     model = Country
     inlines = (CountryFeastInline,)
+    actions = ('delete_in_background',)
+
+    @admin.action(description='Delete selected countries in the background', permissions=('delete',))
+    def delete_in_background(self, request, queryset):
+        """Queues a delete_country job for every selected country, so large countries do not hold up the request."""
+        ids = [str(country_id) for country_id in queryset.values_list('id', flat=True)]
+        for country_id in ids:
+            enqueue('delete_country', {'id': country_id})
+        message = ngettext('Queued %d country for deletion.', 'Queued %d countries for deletion.', len(ids))
+        self.message_user(request, message % len(ids), messages.SUCCESS)
 
 @admin.register(Feast)
 class FeastAdmin(admin.ModelAdmin):
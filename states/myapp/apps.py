@@ -15,3 +15,7 @@ class MyappConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myapp'
+
+    def ready(self) -> None:
+        """Connects the signal receivers of the application."""
+        from . import signals  # noqa: F401
@@ -0,0 +1,83 @@
+"""Module for the async read API."""
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from .authentication import aauthenticate
+from .pagination import KeysetPagination, decode_cursor, encode_cursor, keyset_querysets
+
+
+def error_response(detail: str, status: int) -> JsonResponse:
+    """Returns an error in the format of the REST framework."""
+    return JsonResponse({'detail': detail}, status=status)
+
+async def check_request(request):
+    """Returns an error response for requests other than authenticated reads, else None."""
+    if request.method not in ('GET', 'HEAD'):
+        return error_response(f'Method "{request.method}" not allowed.', 405)
+    if await aauthenticate(request) is None:
+        return error_response('Authentication credentials were not provided.', 401)
+    return None
+
+def get_page_size(request) -> int:
+    """Returns the requested page size capped like the sync API."""
+    try:
+        size = int(request.GET[KeysetPagination.page_size_query_param])
+    except (KeyError, ValueError):
+        return KeysetPagination.page_size
+    return min(max(size, 1), KeysetPagination.max_page_size)
+
+def create_async_api(model, serializer):
+    """
+    Creates async list and detail views serving flat rows of a model.
+
+    The views use the async ORM, so under ASGI one worker serves many slow
+    clients concurrently instead of blocking a thread on every query. Lists are
+    always paginated with the keyset cursor of the sync API.
+
+    Args:
+        model (type): The Django model class to read.
+        serializer (type): The flat serializer class of the model.
+
+    Returns:
+        tuple: list view and detail view
+    """
+    async def list_view(request):
+        """Returns a page of rows after the cursor, with the total when `count` is set."""
+        denied = await check_request(request)
+        if denied is not None:
+            return denied
+        cursor = None
+        if request.GET.get(KeysetPagination.cursor_query_param):
+            try:
+                cursor = decode_cursor(request.GET[KeysetPagination.cursor_query_param])
+            except ValueError as error:
+                return error_response(str(error), 404)
+        size = get_page_size(request)
+        rows = []
+        for segment in keyset_querysets(serializer.get_values(model.objects.all()), cursor):
+            async for row in segment[:size + 1 - len(rows)].aiterator():
+                rows.append(row)
+            if len(rows) > size:
+                break
+        next_cursor = None
+        if len(rows) > size:
+            rows = rows[:size]
+            next_cursor = encode_cursor(rows[-1]['created'], rows[-1]['id'])
+        data = {'next_cursor': next_cursor, 'results': serializer(rows, many=True).data}
+        if request.GET.get('count'):
+            data['count'] = await model.objects.acount()
+        return JsonResponse(data, encoder=DjangoJSONEncoder)
+
+    async def detail_view(request, pk):
+        """Returns a single row."""
+        denied = await check_request(request)
+        if denied is not None:
+            return denied
+        try:
+            row = await serializer.get_values(model.objects.all()).aget(pk=pk)
+        except (model.DoesNotExist, ValidationError):
+            return error_response('Not found.', 404)
+        return JsonResponse(serializer(row).data, encoder=DjangoJSONEncoder)
+
+    return list_view, detail_view
@@ -0,0 +1,160 @@
+"""Module for authentication."""
+
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+
+
+class LocalCache:
+    """A small thread-safe LRU cache whose entries expire after ttl seconds."""
+
+    def __init__(self, ttl: float, size: int) -> None:
+        """Creates an empty cache."""
+        self.ttl = ttl
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        """Returns a fresh value or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value) -> None:
+        """Stores a value and drops the least recently used entries over the size."""
+        with self.lock:
+            self.entries[key] = (monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key) -> None:
+        """Drops a value."""
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drops all values."""
+        with self.lock:
+            self.entries.clear()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication which keeps resolved tokens in caches.
+
+    Tokens are looked up in a short-lived in-process cache, then in the shared
+    Django cache and only then in the database. Entries hold only the user id
+    and the flags permissions check, and the user is rebuilt from them with
+    its other fields deferred. Shared entries are keyed by a version of the
+    token which signals bump when the token is deleted or its user is saved,
+    and are written with cache.add, so a lookup which read the database
+    before the bump can not bring a revoked token back. In-process entries of
+    other workers expire after local_ttl seconds.
+    """
+
+    local_ttl = 5
+    shared_ttl = 300
+    local_cache = LocalCache(ttl=local_ttl, size=1024)
+    user_fields = ('id', 'is_active', 'is_staff', 'is_superuser')
+
+    @staticmethod
+    def cache_key(key: str) -> str:
+        """Returns the cache key of a token without exposing the token itself."""
+        return f'myapp:token:{sha256(key.encode()).hexdigest()}'
+
+    @staticmethod
+    def entry_key(cache_key: str, version: int) -> str:
+        """Returns the key of the shared entry of a token version."""
+        return f'{cache_key}:{version}'
+
+    @classmethod
+    def get_entry_fields(cls) -> list:
+        """Returns the cached user fields in the order of the user model, as Model.from_db expects."""
+        user_model = Token._meta.get_field('user').related_model
+        return [field.attname for field in user_model._meta.concrete_fields if field.attname in cls.user_fields]
+
+    @classmethod
+    def to_entry(cls, token) -> tuple:
+        """Returns the cached values of a token: its user id and permission flags."""
+        return tuple(getattr(token.user, name) for name in cls.get_entry_fields())
+
+    @classmethod
+    def from_entry(cls, key: str, entry: tuple):
+        """Rebuilds a token and its user from a cache entry, deferring the other user fields."""
+        user_model = Token._meta.get_field('user').related_model
+        user = user_model.from_db(DEFAULT_DB_ALIAS, cls.get_entry_fields(), entry)
+        return Token(key=key, user=user)
+
+    def authenticate_credentials(self, key):
+        """Returns the user and the token of a key, reading the caches first."""
+        cache_key = self.cache_key(key)
+        entry = self.local_cache.get(cache_key)
+        if entry is None:
+            version = cache.get_or_set(cache_key, 0, None)
+            entry = cache.get(self.entry_key(cache_key, version))
+            if entry is None:
+                token = super().authenticate_credentials(key)[1]
+                entry = self.to_entry(token)
+                cache.add(self.entry_key(cache_key, version), entry, self.shared_ttl)
+            self.local_cache.set(cache_key, entry)
+        token = self.from_entry(key, entry)
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return token.user, token
+
+    @classmethod
+    def invalidate(cls, keys) -> None:
+        """Moves tokens to new versions of their shared entries and drops them from the in-process cache."""
+        for cache_key in map(cls.cache_key, keys):
+            cache.add(cache_key, 0, None)
+            cache.incr(cache_key)
+            cls.local_cache.delete(cache_key)
+
+
+async def aauthenticate(request):
+    """
+    Resolves the user of a `Token` authorization header without blocking the event loop.
+
+    Uses the same caches as CachedTokenAuthentication and the async ORM on a miss.
+
+    Returns:
+        User | None: an active user or None if the request is not authenticated
+    """
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2 or auth[0].lower() != b'token':
+        return None
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        return None
+    cache_key = CachedTokenAuthentication.cache_key(key)
+    entry = CachedTokenAuthentication.local_cache.get(cache_key)
+    if entry is None:
+        version = await cache.aget_or_set(cache_key, 0, None)
+        entry_key = CachedTokenAuthentication.entry_key(cache_key, version)
+        entry = await cache.aget(entry_key)
+        if entry is None:
+            try:
+                token = await Token.objects.select_related('user').aget(key=key)
+            except Token.DoesNotExist:
+                return None
+            entry = CachedTokenAuthentication.to_entry(token)
+            await cache.aadd(entry_key, entry, CachedTokenAuthentication.shared_ttl)
+        CachedTokenAuthentication.local_cache.set(cache_key, entry)
+    user = CachedTokenAuthentication.from_entry(key, entry).user
+    return user if user.is_active else None
@@ -0,0 +1,229 @@
+"""Module for bulk writes."""
+
+from typing import Any
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.dispatch import Signal
+from .caching import invalidate
+from .models import LOCATION_FIELDS, City, get_datetime
+
+BATCH_SIZE = 1000
+MAX_ITEMS = 10000
+
+bulk_saved = Signal()
+
+
+def item_error(index: int, errors: Any) -> dict:
+    """Builds the error entry of a single item."""
+    return {'index': index, 'errors': errors}
+
+def writable_fields(model) -> dict:
+    """Returns the fields a bulk request may set, keyed by name."""
+    return {
+        field.name: field for field in model._meta.concrete_fields
+        if field.editable and not field.primary_key
+    }
+
+def check_list(items) -> list:
+    """Checks the payload is a non-empty list of an allowed size."""
+    if not isinstance(items, list) or not items:
+        return [item_error(None, 'Expected a non-empty list.')]
+    if len(items) > MAX_ITEMS:
+        return [item_error(None, f'Expected at most {MAX_ITEMS} items.')]
+    return []
+
+def check_items(items) -> list:
+    """Checks the payload is a list of objects of an allowed size."""
+    return check_list(items) or [
+        item_error(index, 'Expected an object.')
+        for index, item in enumerate(items) if not isinstance(item, dict)
+    ]
+
+def to_pk(field, value) -> Any:
+    """Converts a raw value to a primary key of the related or own model."""
+    target = field.target_field if field.is_relation else field
+    return target.to_python(value)
+
+def assign(instance, item: dict, fields: dict, partial: bool = False) -> tuple[dict, dict]:
+    """
+    Sets item values on an instance and cleans them.
+
+    Related objects are given by id and only converted here: their existence
+    is checked later for the whole batch at once. Partial assignment validates
+    only the fields present in the item.
+
+    Returns:
+        tuple: field errors and ids of related objects keyed by field name
+    """
+    errors = {key: ['Unknown field.'] for key in item.keys() - fields.keys() - {'id'}}
+    related = {}
+    for name, field in fields.items():
+        if name not in item:
+            if field.is_relation and not field.null and not partial:
+                errors[name] = ['This field is required.']
+            continue
+        if not field.is_relation:
+            setattr(instance, field.attname, item[name])
+            continue
+        try:
+            value = None if item[name] is None else to_pk(field, item[name])
+        except ValidationError as error:
+            errors[name] = error.messages
+            continue
+        setattr(instance, field.attname, value)
+        if value is not None:
+            related[name] = value
+    exclude = [
+        name for name, field in fields.items()
+        if field.is_relation or (partial and name not in item)
+    ]
+    try:
+        instance.full_clean(exclude=exclude, validate_unique=False)
+    except ValidationError as error:
+        errors.update(error.message_dict)
+    except ValueError as error:
+        errors.setdefault('non_field_errors', []).append(str(error))
+    return errors, related
+
+def derive(instance, item: dict) -> set:
+    """
+    Sets the fields a model derives from others on save, which bulk writes skip.
+
+    Returns:
+        set: names of the derived fields which were set
+    """
+    if isinstance(instance, City) and 'coordinates' in item:
+        instance.locate()
+        return set(LOCATION_FIELDS)
+    return set()
+
+def check_related(model, related_items: list[dict]) -> list:
+    """Checks that all referenced related objects exist with one query per relation."""
+    errors = []
+    fields = writable_fields(model)
+    for name in {name for related in related_items for name in related}:
+        field = fields[name]
+        wanted = {related[name] for related in related_items if name in related}
+        existing = set(field.related_model.objects.filter(pk__in=wanted).values_list('pk', flat=True))
+        errors.extend(
+            item_error(index, {name: [f'Object with id={related[name]} does not exist.']})
+            for index, related in enumerate(related_items)
+            if name in related and related[name] not in existing
+        )
+    return errors
+
+def bulk_create(model, items, ignore_conflicts: bool = False) -> tuple[list, list]:
+    """
+    Validates items and inserts them with bulk_create in one transaction.
+
+    Nothing is written if any item is invalid. bulk_create sends no signals,
+    so cached responses of the model are dropped here and bulk_saved is sent.
+    When conflicts are ignored, only the objects actually inserted are
+    returned, found by the primary keys they were given before the insert.
+
+    Returns:
+        tuple: created objects and per-item errors
+    """
+    errors = check_items(items)
+    if errors:
+        return [], errors
+    fields = writable_fields(model)
+    instances, related_items = [], []
+    for index, item in enumerate(items):
+        instance = model()
+        item_errors, related = assign(instance, item, fields)
+        if item_errors:
+            errors.append(item_error(index, item_errors))
+        derive(instance, item)
+        instances.append(instance)
+        related_items.append(related)
+    errors.extend(check_related(model, related_items))
+    if errors:
+        return [], sorted(errors, key=lambda error: error['index'])
+    with transaction.atomic():
+        created = model.objects.bulk_create(
+            instances, batch_size=BATCH_SIZE, ignore_conflicts=ignore_conflicts,
+        )
+        if ignore_conflicts:
+            inserted = set(
+                model.objects.filter(pk__in=[instance.pk for instance in created]).values_list('pk', flat=True)
+            )
+            created = [instance for instance in created if instance.pk in inserted]
+        if created:
+            invalidate(model)
+            bulk_saved.send(sender=model, instances=created)
+    return created, []
+
+def bulk_update(model, items) -> tuple[list, list]:
+    """
+    Validates items with ids and saves the given fields with bulk_update in one transaction.
+
+    Nothing is written if any item is invalid or refers to a missing object.
+    Cached responses of the model are dropped and bulk_saved is sent here as
+    bulk_update sends no signals.
+
+    Returns:
+        tuple: updated objects and per-item errors
+    """
+    errors = check_items(items)
+    if errors:
+        return [], errors
+    pk_field = model._meta.pk
+    pks = []
+    for index, item in enumerate(items):
+        try:
+            pks.append(to_pk(pk_field, item['id']))
+        except (KeyError, ValidationError):
+            errors.append(item_error(index, {'id': ['A valid id is required.']}))
+            pks.append(None)
+    if errors:
+        return [], errors
+    fields = writable_fields(model)
+    existing = model.objects.in_bulk(pks)
+    instances, related_items, updated_fields = [], [], set()
+    for index, (pk, item) in enumerate(zip(pks, items)):
+        instance = existing.get(pk)
+        if instance is None:
+            errors.append(item_error(index, {'id': [f'Object with id={pk} does not exist.']}))
+            related_items.append({})
+            continue
+        item_errors, related = assign(instance, item, fields, partial=True)
+        if item_errors:
+            errors.append(item_error(index, item_errors))
+        if 'modified' in fields and 'modified' not in item:
+            instance.modified = get_datetime()
+            updated_fields.add('modified')
+        updated_fields.update(item.keys() & fields.keys(), derive(instance, item))
+        instances.append(instance)
+        related_items.append(related)
+    errors.extend(check_related(model, related_items))
+    if errors:
+        return [], sorted(errors, key=lambda error: error['index'])
+    if updated_fields:
+        with transaction.atomic():
+            model.objects.bulk_update(instances, sorted(updated_fields), batch_size=BATCH_SIZE)
+            invalidate(model)
+            bulk_saved.send(sender=model, instances=instances)
+    return instances, []
+
+def bulk_delete(model, ids) -> tuple[int, list]:
+    """
+    Deletes objects by a list of ids in one transaction.
+
+    Returns:
+        tuple: number of deleted objects of the model and per-item errors
+    """
+    errors = check_list(ids)
+    if errors:
+        return 0, errors
+    pks = []
+    for index, pk in enumerate(ids):
+        try:
+            pks.append(to_pk(model._meta.pk, pk))
+        except ValidationError as error:
+            errors.append(item_error(index, error.messages))
+    if errors:
+        return 0, errors
+    with transaction.atomic():
+        _, deleted = model.objects.filter(pk__in=pks).delete()
+    return deleted.get(model._meta.label, 0), []
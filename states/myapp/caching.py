@@ -0,0 +1,172 @@
+"""Module for the API response cache."""
+
+from hashlib import sha1
+from time import time_ns
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from django.utils.translation import get_language
+
+RESPONSE_TTL = 24 * 60 * 60
+STATS_KEYS = {'hits': 'myapp:response:hits', 'misses': 'myapp:response:misses'}
+STORED_HEADERS = ('ETag', 'Last-Modified')
+
+
+def version_key(model) -> str:
+    """Returns the cache key of the data version of a model."""
+    return f'myapp:version:{model._meta.label_lower}'
+
+def get_versions(models) -> list:
+    """
+    Returns the current data versions of models.
+
+    A missing version starts from the current time instead of zero, so entries
+    stored before the version was evicted can never match again.
+    """
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+def bump_versions(*models) -> None:
+    """Moves the data versions of models forward, which drops all their cached responses."""
+    for model in models:
+        key = version_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time_ns(), None)
+
+def invalidate(*models) -> None:
+    """
+    Drops cached responses of models right away and once more after the commit.
+
+    The second bump drops responses cached by readers that still saw the old
+    rows between the write and the commit.
+    """
+    bump_versions(*models)
+    transaction.on_commit(lambda: bump_versions(*models))
+
+def cached_count(queryset, models, *parts) -> int:
+    """
+    Returns the number of rows of a queryset, counted once per data version of models.
+
+    Parts, like the path and the search query, name the queryset in the key.
+    """
+    versions = get_versions(models)
+    digest = sha1('|'.join(map(str, (*parts, *versions))).encode()).hexdigest()
+    key = f'myapp:count:{digest}'
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        transaction.on_commit(lambda: cache.set(key, total, RESPONSE_TTL))
+    return total
+
+def get_fragment_keys(**groups) -> dict:
+    """
+    Returns the timeout of template fragments and a key part per named group of models.
+
+    A part holds the active language and the data versions of the models, so
+    fragments rendered from the models are dropped as soon as one of them changes.
+    """
+    models = list(dict.fromkeys(model for group in groups.values() for model in group))
+    versions = dict(zip(models, get_versions(models)))
+    language = get_language()
+    parts = {name: ':'.join([language, *(str(versions[model]) for model in group)]) for name, group in groups.items()}
+    return {'ttl': RESPONSE_TTL, **parts}
+
+def count(name: str) -> None:
+    """Adds one to a hit or miss counter."""
+    key = STATS_KEYS[name]
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+def get_stats() -> dict:
+    """Returns hit and miss counters and the hit ratio."""
+    values = cache.get_many(STATS_KEYS.values())
+    stats = {name: values.get(key, 0) for name, key in STATS_KEYS.items()}
+    total = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / total, 4) if total else None
+    return stats
+
+
+class CachedResponseMixin:
+    """
+    Serves list and retrieve from the shared cache until the data changes.
+
+    Responses are keyed by host, URL, query parameters, Accept header, permission
+    classes, positional handler arguments and the data versions of the viewset
+    model and of cache_models. Handlers whose response depends on a default
+    which changes over time, like today, get it resolved as an argument.
+    Versions are bumped by signals and bulk writes, so entries are never served
+    stale and need no short TTL. JSON responses are stored once the transaction
+    they were read in commits, so rows which are rolled back are never cached.
+    """
+
+    cache_models = ()
+
+    def get_cache_key(self, request, *args) -> str:
+        """Returns the cache key of the current request and handler arguments."""
+        versions = get_versions((self.queryset.model, *self.cache_models))
+        parts = [
+            request.get_host(),
+            request.path,
+            *sorted(f'{key}={value}' for key, value in request.query_params.lists()),
+            *map(str, args),
+            request.META.get('HTTP_ACCEPT', ''),
+            *(f'{permission.__module__}.{permission.__qualname__}' for permission in self.permission_classes),
+            *map(str, versions),
+        ]
+        return f'myapp:response:{sha1("|".join(parts).encode()).hexdigest()}'
+
+    def cached(self, handler, request, *args, **kwargs):
+        """Returns the cached response or calls the handler and stores its response."""
+        if request.method != 'GET':
+            return handler(request, *args, **kwargs)
+        key = self.get_cache_key(request, *args)
+        entry = cache.get(key)
+        if entry is not None:
+            count('hits')
+            content, content_type, headers = entry
+            response = get_conditional_response(
+                request,
+                etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(headers.get('Last-Modified', '')),
+            )
+            if response is None:
+                response = HttpResponse(content, content_type=content_type)
+            for name, value in headers.items():
+                response[name] = value
+            response['X-Cache'] = 'HIT'
+            return response
+        count('misses')
+        response = handler(request, *args, **kwargs)
+        response['X-Cache'] = 'MISS'
+        if response.status_code == 200:
+            response.add_post_render_callback(lambda rendered: self.store(key, rendered))
+        return response
+
+    @staticmethod
+    def store(key: str, response) -> None:
+        """Stores a rendered JSON response, leaving the browsable API out."""
+        if response.accepted_renderer.format != 'json':
+            return
+        headers = {name: response[name] for name in STORED_HEADERS if name in response}
+        entry = (response.content, response['Content-Type'], headers)
+        transaction.on_commit(lambda: cache.set(key, entry, RESPONSE_TTL))
+
+    def list(self, request, *args, **kwargs):
+        """Lists resources from the cache when possible."""
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieves a resource from the cache when possible."""
+        return self.cached(super().retrieve, request, *args, **kwargs)
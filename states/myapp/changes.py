@@ -0,0 +1,77 @@
+"""Module for incremental change feeds of catalog tables."""
+
+from uuid import UUID
+from django.db import connection
+from django.db.models import Q
+from .counters import table_name
+from .models import Tombstone
+from .pagination import encode_cursor
+
+PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+FIRST_ID = UUID(int=0)
+
+SETTLED_SQL = '''
+    SELECT least(statement_timestamp(), min(xact_start)) FROM pg_stat_activity
+    WHERE pid <> pg_backend_pid() AND backend_type = 'client backend' AND xact_start IS NOT NULL
+'''
+
+
+def get_settled_time():
+    """
+    Returns the time before which every write is committed.
+
+    Triggers stamp rows with the clock time of the write, which is never
+    before the start of the writing transaction, so rows stamped before the
+    start of the oldest running transaction can not appear later.
+    Transactions of other roles are only seen by roles allowed to read all
+    statistics.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(SETTLED_SQL)
+        return cursor.fetchone()[0]
+
+def after(value_field: str, id_field: str, cursor) -> Q:
+    """Returns the condition of keys (value, id) following the cursor position."""
+    value, id_ = cursor
+    return Q(**{f'{value_field}__gt': value}) | Q(**{value_field: value, f'{id_field}__gt': id_})
+
+def get_changes(model, serializer, cursor=None, size: int = PAGE_SIZE) -> dict:
+    """
+    Returns rows changed and ids of rows deleted after the cursor position.
+
+    Changes are ordered by (modified, id) and deletes by (deleted, row id).
+    A page covers changes up to the last one it has room for or, when all
+    fit, up to the settled time. Rows changed and then deleted within a page
+    are listed in both `changed` and `deleted`, and deletes are to be applied
+    last, as ids are never reused.
+
+    Args:
+        model (type): catalog model with a modified field
+        serializer (type): flat serializer of the rows
+        cursor (tuple): (time, id) position of the previous page end or None to start from the beginning
+        size (int): maximum number of changed rows and of deleted ids
+
+    Returns:
+        dict: changed .values() rows, deleted ids, the cursor of the next page and if more changes are ready
+    """
+    settled = get_settled_time()
+    rows = model.objects.filter(modified__lt=settled)
+    tombstones = Tombstone.objects.filter(table=table_name(model), deleted__lt=settled)
+    if cursor is not None:
+        rows = rows.filter(after('modified', 'pk', cursor))
+        tombstones = tombstones.filter(after('deleted', 'row_id', cursor))
+    changed = list(serializer.get_values(rows.order_by('modified', 'pk'))[:size])
+    deleted = list(tombstones.order_by('deleted', 'row_id').values_list('deleted', 'row_id')[:size])
+    ends = []
+    if len(changed) == size:
+        ends.append((changed[-1]['modified'], changed[-1]['id']))
+    if len(deleted) == size:
+        ends.append(deleted[-1])
+    end = min(ends, default=(settled, FIRST_ID))
+    return {
+        'changed': [row for row in changed if (row['modified'], row['id']) <= end],
+        'deleted': [row_id for time, row_id in deleted if (time, row_id) <= end],
+        'next': encode_cursor(*end),
+        'more': bool(ends),
+    }
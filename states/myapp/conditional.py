@@ -0,0 +1,74 @@
+"""Module for conditional requests."""
+
+from hashlib import sha1
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+class ConditionalMixin:
+    """
+    Adds strong ETag and Last-Modified validators to list and retrieve.
+
+    Validators are computed from max(modified) and the row count of the requested
+    rows, so a matching If-None-Match or If-Modified-Since is answered with 304
+    before anything is serialized. Models whose rows change the representation
+    are listed in conditional_related as (model, lookup to this resource, timestamp).
+    conditional_timestamp is the expression of the modification time of a row.
+    """
+
+    conditional_related = ()
+    conditional_timestamp = 'modified'
+
+    def get_validators(self, queryset, related_filter: dict) -> tuple:
+        """
+        Computes the validators of a set of rows.
+
+        Returns:
+            tuple: number of rows, quoted ETag and the last modification time
+        """
+        stats = [queryset.aggregate(last=Max(self.conditional_timestamp), count=Count('pk'))]
+        for model, lookup, timestamp in self.conditional_related:
+            related = {f'{lookup}{key}': value for key, value in related_filter.items()}
+            stats.append(model.objects.filter(**related).aggregate(last=Max(timestamp), count=Count('pk')))
+        request = self.request
+        parts = [
+            request.path,
+            *sorted(f'{key}={value}' for key, value in request.query_params.lists()),
+            request.META.get('HTTP_ACCEPT', ''),
+            *(f"{stat['count']}:{stat['last'].isoformat() if stat['last'] else ''}" for stat in stats),
+        ]
+        last_modified = max((stat['last'] for stat in stats if stat['last']), default=None)
+        return stats[0]['count'], f'"{sha1("|".join(parts).encode()).hexdigest()}"', last_modified
+
+    def conditional(self, handler, validators: tuple, request, *args, **kwargs):
+        """Answers 304 when the client copy is fresh or calls the handler and sets validators."""
+        _, etag, last_modified = validators
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """Lists resources unless the client copy of the list is fresh."""
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = self.get_validators(queryset, {'__in': queryset.values('pk')})
+        return self.conditional(super().list, validators, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieves a resource unless the client copy is fresh."""
+        pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: pk})
+        except ValidationError:
+            return super().retrieve(request, *args, **kwargs)
+        validators = self.get_validators(queryset, {'': pk})
+        if not validators[0]:
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional(super().retrieve, validators, request, *args, **kwargs)
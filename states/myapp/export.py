@@ -0,0 +1,99 @@
+"""Module for streaming catalog export."""
+
+import csv
+import json
+import zlib
+from typing import Iterable, Iterator
+from .models import Country, Feast, City, CountryToFeast
+from .serializers import (
+    CountryFlatSerializer, FeastFlatSerializer, CityFlatSerializer, CountryToFeastFlatSerializer,
+)
+
+CHUNK_SIZE = 2000
+
+DATASETS = {
+    'countries': (Country, CountryFlatSerializer),
+    'feasts': (Feast, FeastFlatSerializer),
+    'cities': (City, CityFlatSerializer),
+    'country-feasts': (CountryToFeast, CountryToFeastFlatSerializer),
+}
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    """A file-like object whose write returns the written value to the caller."""
+
+    def write(self, value: str) -> str:
+        """Returns the value instead of storing it."""
+        return value
+
+
+def export_rows(dataset: str) -> tuple[Iterator[dict], tuple]:
+    """
+    Streams .values() rows of a dataset over a server-side cursor.
+
+    Only concrete columns are read: many-to-many links are exported as
+    their own `country-feasts` dataset, so no aggregation delays the first row.
+
+    Returns:
+        tuple: iterator over rows and the exported field names
+    """
+    model, serializer = DATASETS[dataset]
+    fields = serializer.value_fields
+    rows = model.objects.values(*fields).order_by().iterator(chunk_size=CHUNK_SIZE)
+    return (serializer().to_representation(row) for row in rows), fields
+
+def batched(lines: Iterable[str], size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Joins lines into utf-8 chunks so the response is not written line by line.
+
+    The first line is sent alone for the client to get the first byte right away.
+    """
+    lines = iter(lines)
+    for line in lines:
+        yield line.encode()
+        break
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch).encode()
+            batch = []
+    if batch:
+        yield ''.join(batch).encode()
+
+def ndjson_lines(rows: Iterable[dict], _) -> Iterator[str]:
+    """Renders rows as newline delimited JSON."""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+def csv_lines(rows: Iterable[dict], fields: tuple) -> Iterator[str]:
+    """Renders rows as CSV lines with a header line first."""
+    writer = csv.DictWriter(Echo(), fieldnames=fields)
+    yield writer.writerow(dict(zip(fields, fields)))
+    for row in rows:
+        yield writer.writerow(row)
+
+RENDERERS = {
+    'ndjson': ndjson_lines,
+    'csv': csv_lines,
+}
+
+def gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compresses a stream of chunks into a single gzip member."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_stream(dataset: str, fmt: str, gzip: bool = False) -> Iterator[bytes]:
+    """Returns the byte stream of a dataset export in the given format."""
+    rows, fields = export_rows(dataset)
+    chunks = batched(RENDERERS[fmt](rows, fields))
+    return gzipped(chunks) if gzip else chunks
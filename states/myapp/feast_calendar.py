@@ -0,0 +1,123 @@
+"""Module for the feast calendar."""
+
+from datetime import date, timedelta
+from itertools import groupby
+from uuid import UUID
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from .models import CountryToFeast, Feast, FeastOccurrence, Recurrence
+from .recurrence import get_window, occurrence_dates
+from .serializers import to_primitive
+
+MAX_DAYS = 366
+CALENDAR_FIELDS = {
+    'id': 'feast_id',
+    'title': 'feast__title',
+    'recurrence': 'feast__recurrence',
+    'country_ids': 'country_ids',
+}
+
+
+def parse_day(params, name: str, default: date) -> date:
+    """Reads an ISO date query parameter."""
+    value = params.get(name)
+    if not value:
+        return default
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({name: 'A date in the YYYY-MM-DD format is required.'})
+    return day
+
+def parse_range(params) -> tuple[date, date]:
+    """
+    Reads the `start` and `end` query parameters, both including and by default today.
+
+    Ranges must end within the window recurring feasts are expanded over, as
+    they would silently miss recurring feasts after it.
+
+    Returns:
+        tuple: first and last day of the range
+    """
+    today = timezone.localdate()
+    start = parse_day(params, 'start', today)
+    end = parse_day(params, 'end', start)
+    if end < start:
+        raise ValidationError({'end': 'The end must not be before the start.'})
+    if end - start >= timedelta(days=MAX_DAYS):
+        raise ValidationError({'end': f'The range must not be longer than {MAX_DAYS} days.'})
+    _, horizon = get_window(today)
+    if end > horizon:
+        raise ValidationError({'end': f'The range must end by {horizon.isoformat()}.'})
+    return start, end
+
+def parse_countries(params) -> list:
+    """Reads country ids from repeated or comma-separated `country` query parameters."""
+    ids = [value for values in params.getlist('country') for value in values.split(',') if value]
+    try:
+        return [UUID(value) for value in ids]
+    except ValueError as error:
+        raise ValidationError({'country': 'Country ids must be UUIDs.'}) from error
+
+def linked_countries(outer: str) -> ArraySubquery:
+    """Returns the sorted ids of the countries linked with the feast referenced by `outer`."""
+    return ArraySubquery(CountryToFeast.objects.filter(feast=OuterRef(outer)).order_by('country').values('country'))
+
+def expand_rules(start: date, end: date, countries=()) -> list:
+    """Returns calendar rows of recurring feasts between two days, expanded from their rules."""
+    feasts = Feast.objects.exclude(recurrence=Recurrence.NONE)
+    if countries:
+        feasts = feasts.filter(Exists(CountryToFeast.objects.filter(feast=OuterRef('pk'), country__in=countries)))
+    return [
+        {
+            'date': day, 'feast_id': feast.pk, 'feast__title': feast.title,
+            'feast__recurrence': feast.recurrence, 'country_ids': feast.country_ids,
+        }
+        for feast in feasts.annotate(country_ids=linked_countries('pk'))
+        for day in occurrence_dates(feast, start, end)
+    ]
+
+def get_calendar(start: date, end: date, countries=()) -> list:
+    """
+    Returns feasts celebrated between two days, optionally in any of the countries, grouped by day.
+
+    Days are read from the (date, feast) index of the precomputed occurrences,
+    so recurring feasts cost a range scan instead of evaluating their rules.
+    The country ids of every feast in the range are probed in the (feast,
+    country) index of the link table, which is far cheaper than joining and
+    grouping the whole table. Recurring feasts are only expanded from the
+    start of the window of recurrence.get_window, so days before it are
+    expanded from the rules on the fly.
+
+    Returns:
+        list: {'date', 'feasts'} dicts for the days with feasts in date order
+    """
+    window_start, _ = get_window()
+    queryset = FeastOccurrence.objects.filter(date__range=(start, end))
+    if countries:
+        queryset = queryset.filter(Exists(
+            CountryToFeast.objects.filter(feast=OuterRef('feast'), country__in=countries),
+        ))
+    if start < window_start:
+        queryset = queryset.exclude(Q(date__lt=window_start) & ~Q(feast__recurrence=Recurrence.NONE))
+    rows = queryset.annotate(country_ids=linked_countries('feast')).values(
+        'date', *CALENDAR_FIELDS.values(),
+    ).order_by('date', 'feast__title', 'feast')
+    if start < window_start:
+        expanded = expand_rules(start, min(end, window_start - timedelta(days=1)), countries)
+        rows = sorted([*rows, *expanded], key=lambda row: (row['date'], row['feast__title'], row['feast_id']))
+    return [
+        {
+            'date': day.isoformat(),
+            'feasts': [
+                {name: to_primitive(row[column]) for name, column in CALENDAR_FIELDS.items()}
+                for row in day_rows
+            ],
+        }
+        for day, day_rows in groupby(rows, key=lambda row: row['date'])
+    ]
@@ -0,0 +1,171 @@
+"""Module for city coordinates and proximity queries."""
+
+import re
+from math import log, pi, radians, sin
+from django.db.models import BooleanField, F, FloatField, Func, Q, Value
+from rest_framework.exceptions import ValidationError
+
+MAX_RADIUS = 1000000
+NEAREST_LIMIT = 10
+MAX_NEAREST_LIMIT = 100
+WITHIN_LIMIT = 100
+MAX_WITHIN_LIMIT = 1000
+LOCATED = Q(latitude__isnull=False, longitude__isnull=False)
+MAX_ZOOM = 18
+SUMMARY_ZOOM = 8
+MAX_MERCATOR_LATITUDE = 85.05112878
+COORDINATE = re.compile(
+    r"""
+    (?P<sign>[-+])?\s*
+    (?P<degrees>\d+(?:\.\d+)?)\s*°?\s*
+    (?:(?P<minutes>\d+(?:\.\d+)?)\s*['′]\s*)?
+    (?:(?P<seconds>\d+(?:\.\d+)?)\s*(?:["″]|'')\s*)?
+    (?P<hemisphere>[NSEW](?![a-z]))?
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+
+def parse_coordinate(match) -> tuple[float, str]:
+    """Returns the signed decimal degrees and the upper-case hemisphere letter of a match."""
+    value = float(match['degrees']) + float(match['minutes'] or 0) / 60 + float(match['seconds'] or 0) / 3600
+    hemisphere = (match['hemisphere'] or '').upper()
+    if match['sign'] == '-' or hemisphere in ('S', 'W'):
+        value = -value
+    return value, hemisphere
+
+def parse_coordinates(text):
+    """
+    Parses free-form coordinates into latitude and longitude.
+
+    Accepts decimal degrees like "55.7558, 37.6173" or "-33.86 151.21" and
+    degrees, minutes and seconds like "55°45′21″N 37°37′04″E". Hemisphere
+    letters may swap the order, as in "37.62 E 55.76 N".
+
+    Returns:
+        tuple | None: latitude and longitude or None if the text is not a valid point
+    """
+    if not text:
+        return None
+    coordinates = [parse_coordinate(match) for match in COORDINATE.finditer(text) if match['degrees']]
+    if len(coordinates) != 2:
+        return None
+    (latitude, first), (longitude, second) = coordinates
+    if first in ('E', 'W') or second in ('N', 'S'):
+        (latitude, first), (longitude, second) = (longitude, second), (latitude, first)
+    if first in ('E', 'W') or second in ('N', 'S'):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+def quadkey(latitude: float, longitude: float, zoom: int = MAX_ZOOM) -> str:
+    """
+    Returns the quadkey of the Web Mercator tile of a point at a zoom level.
+
+    Every digit picks one of four child tiles, so the key of a tile is the
+    prefix of the keys of all points in it. Latitudes beyond the reach of the
+    projection are clamped to its edge.
+    """
+    latitude = min(max(latitude, -MAX_MERCATOR_LATITUDE), MAX_MERCATOR_LATITUDE)
+    tiles = 1 << zoom
+    sine = sin(radians(latitude))
+    x = int((longitude + 180) / 360 * tiles)
+    y = int((0.5 - log((1 + sine) / (1 - sine)) / (4 * pi)) * tiles)
+    return tile_quadkey(zoom, min(max(x, 0), tiles - 1), min(max(y, 0), tiles - 1))
+
+def tile_quadkey(zoom: int, x: int, y: int) -> str:
+    """Returns the quadkey of the x and y tile of a zoom level."""
+    return ''.join(
+        str((x >> bit & 1) + 2 * (y >> bit & 1))
+        for bit in range(zoom - 1, -1, -1)
+    )
+
+
+class LlToEarth(Func):
+    """Converts latitude and longitude to a point of the earthdistance cube."""
+
+    function = 'll_to_earth'
+
+
+class CubeDistance(Func):
+    """Returns the straight distance of two cubes, the operator served by GiST KNN scans."""
+
+    arg_joiner = ' <-> '
+    template = '(%(expressions)s)'
+    output_field = FloatField()
+
+
+class EarthDistance(Func):
+    """Returns the great circle distance of two earth points in meters."""
+
+    function = 'earth_distance'
+    output_field = FloatField()
+
+
+class EarthBox(Func):
+    """Returns the cube bounding the circle of a radius in meters around an earth point."""
+
+    function = 'earth_box'
+
+
+class CubeContains(Func):
+    """Checks that the first cube contains the second, the operator served by GiST scans."""
+
+    arg_joiner = ' @> '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+def city_location():
+    """Returns the expression of the GiST index over city coordinates."""
+    return LlToEarth(F('latitude'), F('longitude'))
+
+def point(latitude: float, longitude: float) -> LlToEarth:
+    """Returns an earth point expression of constant coordinates."""
+    return LlToEarth(Value(latitude, FloatField()), Value(longitude, FloatField()))
+
+def nearest(queryset, latitude: float, longitude: float, limit: int = NEAREST_LIMIT):
+    """
+    Returns the limit located rows closest to a point with their `distance` in meters.
+
+    Rows are ordered by cube distance, which is monotonic in the great circle
+    distance, so the GiST index returns them nearest first without a sort.
+    """
+    origin = point(latitude, longitude)
+    return queryset.filter(LOCATED).annotate(
+        distance=EarthDistance(origin, city_location()),
+    ).order_by(CubeDistance(city_location(), origin))[:limit]
+
+def within(queryset, latitude: float, longitude: float, radius: float, limit: int = WITHIN_LIMIT):
+    """
+    Returns up to limit located rows not farther than radius meters from a point, nearest first.
+
+    The GiST index finds the rows in the bounding box of the circle, and only
+    those are checked against the exact distance.
+    """
+    origin = point(latitude, longitude)
+    distance = EarthDistance(origin, city_location())
+    return queryset.filter(LOCATED).filter(
+        CubeContains(EarthBox(origin, Value(radius, FloatField())), city_location()),
+    ).alias(
+        exact_distance=distance,
+    ).filter(
+        exact_distance__lte=radius,
+    ).annotate(
+        distance=distance,
+    ).order_by('distance', 'pk')[:limit]
+
+def parse_number(params, name: str, low: float, high: float, default=None) -> float:
+    """Reads a number query parameter between low and high."""
+    try:
+        value = float(params[name]) if name in params else default
+    except ValueError:
+        value = None
+    if value is None or not low <= value <= high:
+        raise ValidationError({name: f'A number from {low} to {high} is required.'})
+    return value
+
+def parse_point(params) -> tuple[float, float]:
+    """Reads the `lat` and `lon` query parameters."""
+    return parse_number(params, 'lat', -90, 90), parse_number(params, 'lon', -180, 180)
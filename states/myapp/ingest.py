@@ -0,0 +1,432 @@
+"""Module for bulk catalog import."""
+
+import csv
+import gzip
+import io
+import json
+from hashlib import sha1
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+from django.db import connection, transaction
+from django.utils import timezone
+from .bulk import bulk_saved
+from .caching import invalidate
+from .models import Country, Feast, City, CountryToFeast, CatalogImport, Recurrence, uuid7
+
+BATCH_SIZE = 10000
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+STAGING_TABLE = 'import_rows'
+
+# Columns are (SQL type, condition on the typed value or None, message when the condition fails).
+POSITIVE = ('integer', '>= 0', 'Ensure this value is greater than or equal to 0.')
+TEXT = ('text', None, None)
+FLOAT = ('double precision', None, None)
+
+DATASETS = {
+    'countries': {
+        'model': Country,
+        'keys': ('name',),
+        'columns': {'name': TEXT, 'population': POSITIVE, 'area_country': POSITIVE, 'hymn': TEXT},
+        'defaults': {'area_country': '0'},
+    },
+    'feasts': {
+        'model': Feast,
+        'keys': ('title',),
+        'columns': {
+            'title': TEXT,
+            'date_of_feast': ('date', None, None),
+            'description': TEXT,
+            'recurrence': (
+                'text', f"IN ({', '.join(repr(value) for value in Recurrence.values)})", 'Select a valid choice.',
+            ),
+            'recurrence_month': ('smallint', 'BETWEEN 1 AND 12', 'Select a valid choice.'),
+            'recurrence_weekday': ('smallint', 'BETWEEN 0 AND 6', 'Select a valid choice.'),
+            'recurrence_week': ('smallint', 'IN (1, 2, 3, 4, -1)', 'Select a valid choice.'),
+        },
+        'defaults': {'recurrence': "''"},
+        # Cross-field rules of Feast.clean, as (condition on the values a row leaves, message).
+        'rules': (
+            (
+                f"recurrence IS DISTINCT FROM '{Recurrence.YEARLY}' OR date_of_feast IS NOT NULL",
+                'date_of_feast: Yearly feasts need a date to repeat.',
+            ),
+            (
+                f"recurrence IS DISTINCT FROM '{Recurrence.WEEKDAY}' "
+                'OR num_nulls(recurrence_month, recurrence_weekday, recurrence_week) = 0',
+                'recurrence_month: Weekday feasts need a month, a weekday and a week.',
+            ),
+        ),
+    },
+    'cities': {
+        'model': City,
+        'keys': ('name', 'country'),
+        'columns': {
+            'name': TEXT, 'country': TEXT, 'population': POSITIVE, 'coordinates': TEXT, 'area_city': POSITIVE,
+        },
+        'references': {'country': ('country', 'name')},
+        # Columns the model sets with locate() from a file column, staged along with it.
+        'derived': ('coordinates', {'latitude': FLOAT, 'longitude': FLOAT, 'quadkey': TEXT}),
+    },
+    'country-feasts': {
+        'model': CountryToFeast,
+        'keys': ('country', 'feast'),
+        'columns': {'country': TEXT, 'feast': TEXT},
+        'references': {'country': ('country', 'name'), 'feast': ('feast', 'title')},
+    },
+}
+
+TYPE_MESSAGES = {
+    'integer': 'Enter a whole number.',
+    'smallint': 'Enter a whole number.',
+    'date': 'Enter a valid date.',
+}
+
+
+def detect_format(path: Path) -> str:
+    """Returns the format of a file by its suffix, skipping a `.gz` one."""
+    suffixes = [suffix for suffix in path.suffixes if suffix != '.gz']
+    fmt = FORMATS.get(suffixes[-1] if suffixes else '')
+    if fmt is None:
+        raise ValueError(f"Unknown format of {path.name}, expected one of {', '.join(FORMATS)}.")
+    return fmt
+
+def open_text(path: Path):
+    """Opens a plain or gzip-compressed utf-8 file for reading, telling them apart by the gzip magic number."""
+    with path.open('rb') as file:
+        compressed = file.read(2) == b'\x1f\x8b'
+    if compressed:
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return path.open('r', encoding='utf-8', newline='')
+
+def to_text(value) -> str | None:
+    """Converts a parsed value to the text loaded into staging, with empty values as NULL."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (dict, list, bool)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+def read_rows(file, fmt: str) -> Iterator[dict]:
+    """
+    Reads rows of a CSV file with a header line or of a JSON Lines file of objects.
+
+    Raises:
+        ValueError: a JSON line is malformed or not an object
+    """
+    if fmt == 'csv':
+        for row in csv.DictReader(file):
+            yield {key: to_text(value) for key, value in row.items() if key is not None}
+        return
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise ValueError(f'Line {number} is not valid JSON: {error.msg}.') from error
+        if not isinstance(row, dict):
+            raise ValueError(f'Line {number} is not a JSON object.')
+        yield {key: to_text(value) for key, value in row.items()}
+
+def copy_value(value: str | None) -> str:
+    """Escapes a value for the text format of COPY."""
+    if value is None:
+        return '\\N'
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+def check_columns(dataset: str, columns: Iterable[str]) -> list:
+    """
+    Checks the columns of a file can be imported into a dataset.
+
+    Raises:
+        ValueError: unknown or missing key columns
+
+    Returns:
+        list: the columns in dataset order
+    """
+    spec = DATASETS[dataset]
+    columns = set(columns)
+    unknown = columns - spec['columns'].keys()
+    if unknown:
+        raise ValueError(
+            f"Unknown columns {', '.join(sorted(unknown))}, expected some of {', '.join(spec['columns'])}."
+        )
+    missing = [key for key in spec['keys'] if key not in columns]
+    if missing:
+        raise ValueError(f"Missing key columns {', '.join(missing)}.")
+    return [name for name in spec['columns'] if name in columns]
+
+def column_types(dataset: str) -> dict:
+    """Returns the (type, condition, message) of file and derived columns of a dataset."""
+    spec = DATASETS[dataset]
+    _, derived = spec.get('derived', (None, {}))
+    return {**spec['columns'], **derived}
+
+def derived_columns(dataset: str, columns: list) -> list:
+    """Returns the derived columns staged with the file columns, which need their source column."""
+    source, derived = DATASETS[dataset].get('derived', (None, {}))
+    return list(derived) if source in columns else []
+
+def derive(model, source: str, row: dict, derived: list) -> list:
+    """Returns the text values of derived columns of a row, set by the model from the source column."""
+    instance = model(**{source: row.get(source)})
+    instance.locate()
+    return [to_text(getattr(instance, name)) for name in derived]
+
+def typed(dataset: str, name: str, alias: str = 'staged') -> str:
+    """Returns the SQL expression casting a staged text column to its type."""
+    sql_type = column_types(dataset)[name][0]
+    return f'{alias}.{name}' if sql_type == 'text' else f'{alias}.{name}::{sql_type}'
+
+def validation_sql(dataset: str, columns: list) -> str:
+    """
+    Builds a query of (row, message) pairs for every invalid staged value.
+
+    Key columns are required, values must cast to their types and pass their
+    conditions, and referenced names must match exactly one row.
+    """
+    spec = DATASETS[dataset]
+    checks = [
+        f"SELECT row, '{key}: This field is required.' FROM {STAGING_TABLE} WHERE {key} IS NULL"
+        for key in spec['keys']
+    ]
+    for name in columns:
+        sql_type, condition, message = spec['columns'][name]
+        valid = 'true'
+        if sql_type != 'text':
+            valid = f"pg_input_is_valid({name}, '{sql_type}')"
+            checks.append(
+                f"SELECT row, '{name}: {TYPE_MESSAGES[sql_type]}' FROM {STAGING_TABLE} "
+                f'WHERE {name} IS NOT NULL AND NOT {valid}'
+            )
+        if condition:
+            checks.append(
+                f"SELECT row, '{name}: {message}' FROM {STAGING_TABLE} AS staged "
+                f'WHERE {name} IS NOT NULL AND CASE WHEN {valid} THEN NOT {typed(dataset, name)} {condition} END'
+            )
+    for name, (table, column) in spec.get('references', {}).items():
+        checks.append(
+            f"SELECT row, '{name}: No single {table} has this {column}.' FROM {STAGING_TABLE} AS staged "
+            f'WHERE {name} IS NOT NULL AND (SELECT count(*) FROM states.{table} AS target '
+            f'WHERE target.{column} = staged.{name}) <> 1'
+        )
+    return '\nUNION ALL\n'.join(checks) + '\nORDER BY 1, 2'
+
+def effective(dataset: str, name: str, columns: list) -> str:
+    """Returns the SQL expression of the value a staged row leaves in a column once written."""
+    default = DATASETS[dataset].get('defaults', {}).get(name, 'NULL')
+    kept = f'CASE WHEN target.id IS NULL THEN {default} ELSE target.{name} END'
+    if name not in columns:
+        return kept
+    given = typed(dataset, name) if default == 'NULL' else f'coalesce({typed(dataset, name)}, {default})'
+    return f"CASE WHEN '{name}' = ANY(staged.missing) THEN {kept} ELSE {given} END"
+
+def rules_sql(dataset: str, columns: list) -> str | None:
+    """
+    Builds a query of (row, message) pairs for staged rows breaking the cross-field rules of a dataset.
+
+    Rules are checked on the values rows leave once written, so columns a
+    file or a row does not have keep the values of the matched rows, or get
+    their defaults in new rows. Staged values must have passed validation_sql.
+    Keys of datasets with rules are plain columns.
+
+    Returns:
+        str: the query or None if the dataset has no rules
+    """
+    spec = DATASETS[dataset]
+    if not spec.get('rules'):
+        return None
+    values = [
+        f'{effective(dataset, name, columns)} AS {name}'
+        for name in spec['columns'] if name not in spec.get('references', {})
+    ]
+    matches = ' AND '.join(f'target.{key} = staged.{key}' for key in spec['keys'])
+    checks = [f"SELECT row, '{message}' FROM effective WHERE NOT ({condition})" for condition, message in spec['rules']]
+    return (
+        f"WITH effective AS (SELECT staged.row, {', '.join(values)} "
+        f"FROM {STAGING_TABLE} AS staged LEFT JOIN {spec['model']._meta.db_table} AS target ON {matches})\n"
+        + '\nUNION\n'.join(checks) + '\nORDER BY 1, 2'
+    )
+
+def upsert_sql(dataset: str, columns: list) -> str:
+    """
+    Builds a statement which writes the valid staged rows and returns the ids of written rows.
+
+    Rows are matched by their natural keys, with referenced names resolved to
+    ids. The last of staged rows with the same key wins. Existing rows are
+    updated only when a given column changes and keep the values of columns
+    a row leaves out, listed in its `missing` array. New rows get the
+    defaults of the columns the file or the row does not have.
+    """
+    spec = DATASETS[dataset]
+    model = spec['model']
+    table = model._meta.db_table
+    references = spec.get('references', {})
+    defaults = spec.get('defaults', {})
+    values, joins = [], []
+    for name in columns:
+        if name in references:
+            ref_table, ref_column = references[name]
+            joins.append(f'JOIN states.{ref_table} AS {name} ON {name}.{ref_column} = staged.{name}')
+            values.append(f'{name}.id AS {name}_id')
+        elif name in defaults:
+            values.append(f'coalesce({typed(dataset, name)}, {defaults[name]}) AS {name}')
+        else:
+            values.append(f'{typed(dataset, name)} AS {name}')
+    targets = {name: f'{name}_id' if name in references else name for name in columns}
+    keys = [targets[key] for key in spec['keys']]
+    fields = {field.column for field in model._meta.concrete_fields}
+    matches = ' AND '.join(f'target.{key} = source.{key}' for key in keys)
+    changed = [targets[name] for name in columns if name not in spec['keys']]
+    timestamps = [name for name in ('created', 'modified') if name in fields]
+    inserted = [*timestamps, *targets.values(), *(name for name in defaults if name not in targets)]
+    inserted_values = [
+        *('now()' for _ in timestamps),
+        *(f'source.{column}' for column in targets.values()),
+        *(defaults[name] for name in defaults if name not in targets),
+    ]
+    statements = [
+        f'''
+        WITH source AS (
+            SELECT DISTINCT ON ({', '.join(keys)}) * FROM (
+                SELECT staged.row, staged.id, staged.missing, {', '.join(values)}
+                FROM {STAGING_TABLE} AS staged {' '.join(joins)}
+            ) AS rows ORDER BY {', '.join(keys)}, row DESC
+        )''',
+    ]
+    if changed:
+        given = {
+            targets[name]: f"CASE WHEN '{name}' = ANY(source.missing) THEN target.{targets[name]} "
+            f'ELSE source.{targets[name]} END'
+            for name in columns if name not in spec['keys']
+        }
+        assignments = [f'{column} = {given[column]}' for column in changed]
+        if 'modified' in fields:
+            assignments.append('modified = now()')
+        statements.append(f'''
+        , updated AS (
+            UPDATE {table} AS target SET {', '.join(assignments)}
+            FROM source WHERE {matches}
+            AND ({', '.join(f'target.{column}' for column in changed)})
+                IS DISTINCT FROM ({', '.join(given[column] for column in changed)})
+            RETURNING target.id
+        )''')
+    statements.append(f'''
+        , inserted AS (
+            INSERT INTO {table} AS target (id, {', '.join(inserted)})
+            SELECT source.id, {', '.join(inserted_values)} FROM source
+            WHERE NOT EXISTS (SELECT FROM {table} AS target WHERE {matches})
+            RETURNING target.id
+        )''')
+    statements.append('SELECT id FROM inserted')
+    if changed:
+        statements.append('UNION ALL SELECT id FROM updated')
+    return '\n'.join(statements)
+
+def import_batch(dataset: str, columns: list, rows: list, first: int) -> tuple[list, list]:
+    """
+    Writes a batch of rows of a dataset in the current transaction.
+
+    Rows are copied into a temporary staging table along with the names of
+    the columns each one leaves out, so that those keep their values. The
+    invalid rows and those breaking cross-field rules are reported and
+    dropped, and the rest are upserted in one statement. The target table is locked against
+    concurrent writers between checking rules, matching and inserting keys,
+    as natural keys have no unique constraints.
+
+    Args:
+        dataset (str): name of the dataset
+        columns (list): columns of the rows
+        rows (list): row dicts
+        first (int): number of the first row in the file
+
+    Returns:
+        tuple: ids of written rows, and (row, message) pairs of rejected rows
+    """
+    model = DATASETS[dataset]['model']
+    derived = derived_columns(dataset, columns)
+    source = DATASETS[dataset].get('derived', (None,))[0]
+    staged = [*columns, *derived]
+    buffer = io.StringIO()
+    for number, row in enumerate(rows, first):
+        values = [row.get(name) for name in columns]
+        missing = [name for name in columns if name not in row]
+        if derived:
+            values.extend(derive(model, source, row, derived))
+            if source in missing:
+                missing.extend(derived)
+        line = [str(number), str(uuid7()), f"{{{','.join(missing)}}}", *map(copy_value, values)]
+        buffer.write('\t'.join(line) + '\n')
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {STAGING_TABLE} '
+            f"(row bigint, id uuid, missing text[], {', '.join(f'{name} text' for name in staged)}) ON COMMIT DROP"
+        )
+        cursor.copy_expert(f"COPY {STAGING_TABLE} (row, id, missing, {', '.join(staged)}) FROM STDIN", buffer)
+        cursor.execute(validation_sql(dataset, columns))
+        errors = cursor.fetchall()
+        if errors:
+            cursor.execute(f'DELETE FROM {STAGING_TABLE} WHERE row = ANY(%s)', [[row for row, _ in errors]])
+        cursor.execute(f'LOCK TABLE {model._meta.db_table} IN SHARE ROW EXCLUSIVE MODE')
+        rules = rules_sql(dataset, columns)
+        if rules:
+            cursor.execute(rules)
+            broken = cursor.fetchall()
+            if broken:
+                cursor.execute(f'DELETE FROM {STAGING_TABLE} WHERE row = ANY(%s)', [[row for row, _ in broken]])
+                errors = sorted([*errors, *broken])
+        cursor.execute(upsert_sql(dataset, staged))
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f'DROP TABLE {STAGING_TABLE}')
+    if ids:
+        invalidate(model)
+        if model is Feast:
+            bulk_saved.send(sender=model, instances=list(model.objects.filter(id__in=ids)))
+    return ids, errors
+
+def get_source(dataset: str, path: Path) -> str:
+    """Identifies a file by its dataset, path, size and modification time."""
+    stat = path.stat()
+    return sha1(f'{dataset}|{path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}'.encode()).hexdigest()
+
+def import_file(dataset: str, path: Path, fmt: str = None, batch_size: int = BATCH_SIZE, restart: bool = False):
+    """
+    Imports a CSV or JSON Lines file, plain or gzipped, into a dataset batch by batch.
+
+    Every batch is written in its own transaction together with the progress
+    of the import, so a rerun of an interrupted import skips the written rows.
+
+    Raises:
+        ValueError: unknown format, columns or malformed lines
+
+    Yields:
+        tuple: progress after each batch and the (row, message) pairs rejected in it
+    """
+    fmt = fmt or detect_format(path)
+    progress, _ = CatalogImport.objects.get_or_create(
+        source=get_source(dataset, path), defaults={'dataset': dataset, 'path': str(path)},
+    )
+    if restart:
+        progress.rows = progress.written = progress.rejected = 0
+        progress.finished = None
+        progress.save()
+    if progress.finished:
+        return
+    with open_text(path) as file:
+        rows = read_rows(file, fmt)
+        for _ in islice(rows, progress.rows):
+            pass
+        while batch := list(islice(rows, batch_size)):
+            columns = check_columns(dataset, {name for row in batch for name in row})
+            with transaction.atomic():
+                ids, errors = import_batch(dataset, columns, batch, progress.rows + 1)
+                progress.rows += len(batch)
+                progress.written += len(ids)
+                progress.rejected += len({row for row, _ in errors})
+                progress.save()
+            yield progress, errors
+    progress.finished = timezone.now()
+    progress.save()
+    yield progress, []
@@ -0,0 +1,260 @@
+"""Module for background jobs queued in Postgres."""
+
+import inspect
+import select
+from datetime import timedelta
+from pathlib import Path
+from uuid import UUID
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from .export import CONTENT_TYPES, DATASETS as EXPORT_DATASETS, export_stream
+from .ingest import DATASETS as IMPORT_DATASETS, FORMATS, import_file
+from .models import Country, Job, JobStatus, get_datetime
+from .rollups import reconcile
+
+CHANNEL = 'myapp_jobs'
+MAX_ATTEMPTS = 3
+BACKOFF = timedelta(seconds=10)
+MAX_BACKOFF = timedelta(hours=1)
+# First key of the transaction-level advisory locks which serialize claims of a job type.
+TYPE_LOCK = 7301
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+JOB_TYPES = {}
+
+RESCUE_SQL = f'''
+    UPDATE states.job SET status = '{JobStatus.QUEUED}', run_at = now()
+    WHERE status = '{JobStatus.RUNNING}' AND NOT EXISTS (
+        SELECT FROM pg_locks WHERE locktype = 'advisory' AND objsubid = 1 AND granted
+        AND classid::bigint = job.id >> 32 AND objid::bigint = job.id & 4294967295
+    )
+'''
+
+
+def job_type(name: str, concurrency: int = 1, max_attempts: int = MAX_ATTEMPTS, validate=None):
+    """
+    Registers a function as the handler of a job type.
+
+    The function is called with the job arguments as keyword arguments and
+    returns a JSON serializable result. At most `concurrency` jobs of the type
+    run at once across all workers. Arguments are checked against the
+    signature of the function when the job is queued, and by `validate`, a
+    function of the arguments raising ValueError, when it is given.
+    """
+    def register(function):
+        """Adds the function to JOB_TYPES."""
+        JOB_TYPES[name] = (function, concurrency, max_attempts, validate)
+        return function
+    return register
+
+def check_choice(args: dict, name: str, choices) -> None:
+    """Checks an argument, when given, is one of the choices."""
+    if name not in args:
+        return
+    try:
+        valid = args[name] in choices
+    except TypeError:
+        valid = False
+    if not valid:
+        raise ValueError(f"{name} must be one of {', '.join(map(str, choices))}.")
+
+def check_args(name: str, args: dict) -> None:
+    """
+    Checks the arguments of a job of a known type.
+
+    Raises:
+        ValueError: arguments do not match the handler or are invalid
+    """
+    function, _, _, validate = JOB_TYPES[name]
+    try:
+        inspect.signature(function).bind(**args)
+    except TypeError as error:
+        raise ValueError(f'Invalid arguments of {name}: {error}.') from error
+    if validate is not None:
+        try:
+            validate(args)
+        except TypeError as error:
+            raise ValueError(f'Invalid arguments of {name}: {error}.') from error
+
+def enqueue(name: str, args: dict = None, run_at=None) -> Job:
+    """
+    Queues a job and wakes listening workers once the transaction commits.
+
+    Raises:
+        ValueError: unknown job type or invalid arguments
+    """
+    if name not in JOB_TYPES:
+        raise ValueError(f"Unknown job type {name}, expected one of {', '.join(JOB_TYPES)}.")
+    args = args or {}
+    check_args(name, args)
+    with transaction.atomic(), connection.cursor() as cursor:
+        job = Job.objects.create(type=name, args=args, run_at=run_at or get_datetime())
+        cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, name])
+    return job
+
+def backoff(attempts: int) -> timedelta:
+    """Returns the delay before the next attempt, doubled after every failed one."""
+    return min(BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF)
+
+def ready_jobs(types=None):
+    """Returns the queued jobs whose time has come, of the given types if any."""
+    jobs = Job.objects.filter(status=JobStatus.QUEUED, run_at__lte=get_datetime())
+    return jobs if types is None else jobs.filter(type__in=types)
+
+def claim(types=None) -> Job | None:
+    """
+    Takes the oldest ready job of a type below its concurrency limit and marks it running.
+
+    Claims of one type are serialized by a transaction-level advisory lock, so
+    two workers never both see a free slot. The job is locked with SKIP LOCKED
+    and then held by a session-level advisory lock of the worker until it
+    finishes. Running jobs whose lock is gone, because their worker died, are
+    queued again first.
+
+    Returns:
+        Job: the claimed job or None if no job can run now
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(RESCUE_SQL)
+        jobs = ready_jobs(types)
+        for name in jobs.values('type').annotate(first=Min('id')).order_by('first').values_list('type', flat=True):
+            _, concurrency, max_attempts, _ = JOB_TYPES.get(name, (None, 1, 1, None))
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, hashtext(%s))', [TYPE_LOCK, name])
+            if Job.objects.filter(type=name, status=JobStatus.RUNNING).count() >= concurrency:
+                continue
+            job = jobs.filter(type=name).select_for_update(skip_locked=True).order_by('run_at', 'id').first()
+            if job is None:
+                continue
+            if job.attempts >= max_attempts:
+                job.status, job.finished = JobStatus.FAILED, get_datetime()
+                job.error = job.error or 'The worker running the job stopped.'
+                job.save(update_fields=('status', 'finished', 'error'))
+                continue
+            cursor.execute('SELECT pg_advisory_lock(%s)', [job.pk])
+            job.status, job.started = JobStatus.RUNNING, get_datetime()
+            job.attempts += 1
+            job.save(update_fields=('status', 'started', 'attempts'))
+            return job
+    return None
+
+def run(job: Job) -> Job:
+    """
+    Runs a claimed job and stores its result.
+
+    A failed job is queued again after a backoff until it has used up the
+    attempts of its type, and then marked failed with the error. Workers are
+    notified that the job freed its slot of the type.
+    """
+    function, _, max_attempts, _ = JOB_TYPES.get(job.type, (None, 1, 1, None))
+    try:
+        if function is None:
+            raise LookupError(f'Unknown job type {job.type}.')
+        job.result = function(**job.args)
+    except Exception as error:
+        job.error = f'{type(error).__name__}: {error}'
+        if job.attempts < max_attempts:
+            job.status, job.run_at = JobStatus.QUEUED, get_datetime() + backoff(job.attempts)
+        else:
+            job.status, job.finished = JobStatus.FAILED, get_datetime()
+    else:
+        job.status, job.finished, job.error = JobStatus.DONE, get_datetime(), ''
+    job.save(update_fields=('status', 'run_at', 'finished', 'result', 'error'))
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_unlock(%s)', [job.pk])
+        cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, job.type])
+    return job
+
+def listen() -> None:
+    """Subscribes the database connection to notifications about queued jobs."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'LISTEN {CHANNEL}')
+
+def blocked_types() -> list:
+    """Returns the job types running as many jobs as their concurrency allows."""
+    running = Job.objects.filter(status=JobStatus.RUNNING).values('type').annotate(running=Count('id'))
+    return [
+        name for name, count in running.values_list('type', 'running')
+        if count >= JOB_TYPES.get(name, (None, 1))[1]
+    ]
+
+def wait(timeout: float, types=None) -> None:
+    """
+    Waits for a notification, the next delayed job or the timeout, whichever is first.
+
+    Jobs of types at their concurrency limit are left out of the next run
+    time, as they can not start before a running job finishes and notifies.
+    """
+    next_run = Job.objects.filter(status=JobStatus.QUEUED).exclude(type__in=blocked_types())
+    if types is not None:
+        next_run = next_run.filter(type__in=types)
+    next_run = next_run.aggregate(first=Min('run_at'))['first']
+    if next_run is not None:
+        timeout = max(min(timeout, (next_run - get_datetime()).total_seconds()), 0)
+    database = connection.connection
+    if select.select([database], [], [], timeout)[0]:
+        database.poll()
+        database.notifies.clear()
+
+
+def check_country(args: dict) -> None:
+    """Checks the id of a country to delete."""
+    try:
+        UUID(str(args['id']))
+    except ValueError as error:
+        raise ValueError('id must be a UUID.') from error
+
+def check_import(args: dict) -> None:
+    """Checks the dataset, format and file of an import."""
+    check_choice(args, 'dataset', IMPORT_DATASETS)
+    check_choice(args, 'format', {*FORMATS.values(), None})
+    if not isinstance(args['path'], str) or not Path(args['path']).is_file():
+        raise ValueError(f"{args['path']} is not a file.")
+
+def check_export(args: dict) -> None:
+    """Checks the dataset, format and compression of an export."""
+    check_choice(args, 'dataset', EXPORT_DATASETS)
+    check_choice(args, 'format', CONTENT_TYPES)
+    check_choice(args, 'gzip', (True, False))
+
+
+@job_type('delete_country', concurrency=2, validate=check_country)
+def delete_country(id: str) -> dict:
+    """Deletes a country with its cities and feast links."""
+    with transaction.atomic():
+        deleted, _ = Country.objects.filter(pk=id).delete()
+    return {'deleted': deleted}
+
+@job_type('reconcile_rollups')
+def reconcile_rollups() -> dict:
+    """Fixes drifted country rollups."""
+    return {'fixed': [str(country_id) for country_id in reconcile()]}
+
+@job_type('import_catalog', validate=check_import)
+def import_catalog(dataset: str, path: str, format: str = None, restart: bool = False) -> dict:
+    """Imports a catalog file, resuming after the batches written by earlier attempts."""
+    progress = None
+    for progress, _ in import_file(dataset, Path(path), format, restart=restart):
+        pass
+    if progress is None:
+        return {'rows': 0, 'written': 0, 'rejected': 0}
+    return {'rows': progress.rows, 'written': progress.written, 'rejected': progress.rejected}
+
+@job_type('export', concurrency=2, validate=check_export)
+def export(dataset: str, format: str = 'ndjson', gzip: bool = False) -> dict:
+    """Writes a dataset export to JOB_EXPORT_DIR under a temporary name, which is renamed when complete."""
+    directory = Path(settings.JOB_EXPORT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{dataset}-{get_datetime():%Y%m%dT%H%M%S%f}.{format}{'.gz' if gzip else ''}"
+    partial = directory / f'.{name}.part'
+    stream = export_stream(dataset, format, gzip)
+    try:
+        with partial.open('wb') as file:
+            for chunk in stream:
+                file.write(chunk)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    partial.rename(directory / name)
+    return {'path': str(directory / name), 'size': (directory / name).stat().st_size}
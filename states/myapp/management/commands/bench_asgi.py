@@ -0,0 +1,90 @@
+"""Module for the ASGI against WSGI read path benchmark command."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client as TestClient
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+from myapp.models import Country, City
+
+BENCH_NAME = 'bench_asgi'
+DUMMY_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    """
+    Compares requests per second of the async city API with the sync viewset.
+
+    Both paths read the same keyset pages of flat rows. The sync CityViewSet,
+    the existing read path, is driven through the WSGI handler by a thread
+    pool, and the async views through the ASGI handler by as many concurrent
+    tasks of one event loop. Caches are replaced by a dummy backend, so no
+    response is served from the cache and every request reads the database.
+    The sync path still runs its conditional request checks. Sample rows and
+    the benchmark user are deleted at the end.
+    """
+
+    help = 'Benchmarks the async read API under ASGI against the sync viewset under WSGI.'
+
+    def add_arguments(self, parser):
+        """Adds the command line arguments."""
+        parser.add_argument('--rows', type=int, default=1000, help='number of sample cities')
+        parser.add_argument('--requests', type=int, default=1000, help='number of requests per path')
+        parser.add_argument('--concurrency', type=int, default=50, help='concurrent clients')
+        parser.add_argument('--page-size', type=int, default=100, help='rows per response')
+
+    def handle(self, *args, **options):
+        """Fills sample data, runs both paths and prints requests per second."""
+        country = Country.objects.create(name=BENCH_NAME)
+        City.objects.bulk_create(
+            City(country=country, name=f'{BENCH_NAME} {index}') for index in range(options['rows'])
+        )
+        user = User.objects.create_user(username=BENCH_NAME)
+        auth = f'Token {Token.objects.create(user=user).key}'
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], CACHES=DUMMY_CACHES):
+                params = {'page_size': options['page_size']}
+                wsgi = self.run_wsgi(auth, params, options['requests'], options['concurrency'])
+                asgi = asyncio.run(self.run_asgi(auth, params, options['requests'], options['concurrency']))
+        finally:
+            country.delete()
+            user.delete()
+        self.stdout.write(
+            f"{options['requests']} requests, concurrency {options['concurrency']}: "
+            f"wsgi {options['requests'] / wsgi:.0f} req/s, asgi {options['requests'] / asgi:.0f} req/s"
+        )
+
+    @staticmethod
+    def run_wsgi(auth: str, params: dict, requests: int, concurrency: int) -> float:
+        """Reads flat city pages from the sync viewset through the WSGI handler and returns the wall time."""
+        def read(_):
+            response = TestClient().get('/api/cities/', {**params, 'flat': 1}, HTTP_AUTHORIZATION=auth)
+            connections.close_all()
+            return response.status_code
+
+        start = perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            statuses = set(executor.map(read, range(requests)))
+        assert statuses == {200}, statuses
+        return perf_counter() - start
+
+    @staticmethod
+    async def run_asgi(auth: str, params: dict, requests: int, concurrency: int) -> float:
+        """Reads city pages through the ASGI handler with concurrent tasks and returns the wall time."""
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def read():
+            async with semaphore:
+                response = await client.get('/api/async/cities/', params, AUTHORIZATION=auth)
+                return response.status_code
+
+        start = perf_counter()
+        statuses = set(await asyncio.gather(*(read() for _ in range(requests))))
+        assert statuses == {200}, statuses
+        return perf_counter() - start
@@ -0,0 +1,86 @@
+"""Module for the serializers benchmark command."""
+
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from myapp.models import Country, Feast, City, CountryToFeast
+from myapp.serializers import (
+    CitySerializer, FeastSerializer, CityFlatSerializer, FeastFlatSerializer,
+)
+
+
+class Command(BaseCommand):
+    """
+    Compares list serialization throughput of hyperlinked and flat serializers.
+
+    Sample rows are written inside a transaction which is rolled back at the end,
+    so the command leaves the database unchanged.
+    """
+
+    help = 'Benchmarks hyperlinked against flat serializers on large list responses.'
+
+    def add_arguments(self, parser):
+        """Adds the command line arguments."""
+        parser.add_argument('--rows', type=int, default=20000, help='number of cities to serialize')
+        parser.add_argument('--repeat', type=int, default=3, help='runs per serializer, best is reported')
+
+    def handle(self, *args, **options):
+        """Fills sample data, runs both serializers and prints rows per second."""
+        request = Request(APIRequestFactory().get('/api/', HTTP_HOST='localhost'))
+        with transaction.atomic():
+            self.fill(options['rows'])
+            cases = (
+                ('city', City, CitySerializer, CityFlatSerializer),
+                ('feast', Feast, FeastSerializer, FeastFlatSerializer),
+            )
+            for name, model, serializer, flat_serializer in cases:
+                rows = model.objects.count()
+                hyperlinked = self.measure(
+                    lambda: serializer(model.objects.all(), many=True, context={'request': request}).data,
+                    options['repeat'],
+                )
+                flat = self.measure(
+                    lambda: flat_serializer(flat_serializer.get_values(model.objects.all()), many=True).data,
+                    options['repeat'],
+                )
+                self.stdout.write(
+                    f'{name}: {rows} rows, hyperlinked {rows / hyperlinked:.0f} rows/s, '
+                    f'flat {rows / flat:.0f} rows/s, x{hyperlinked / flat:.1f}'
+                )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def fill(rows: int) -> None:
+        """Creates sample countries, cities and feasts linked to three countries each."""
+        countries = Country.objects.bulk_create(
+            Country(name=f'country {index}', area_country=index) for index in range(100)
+        )
+        City.objects.bulk_create(
+            (
+                City(country=countries[index % 100], name=f'city {index}', population=index)
+                for index in range(rows)
+            ),
+            batch_size=5000,
+        )
+        feasts = Feast.objects.bulk_create(
+            Feast(title=f'feast {index}', description='description') for index in range(rows // 10)
+        )
+        CountryToFeast.objects.bulk_create(
+            (
+                CountryToFeast(country=countries[(index + shift) % 100], feast=feast)
+                for index, feast in enumerate(feasts) for shift in range(3)
+            ),
+            batch_size=5000,
+        )
+
+    @staticmethod
+    def measure(run, repeat: int) -> float:
+        """Returns the best wall time of several runs in seconds."""
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            run()
+            timings.append(perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,70 @@
+"""Module for the primary key benchmark command."""
+
+import io
+from time import perf_counter
+from uuid import uuid4
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from myapp.models import uuid7
+
+GENERATORS = {'uuid4': uuid4, 'uuid7': uuid7}
+INDEXES = ('bench_city_pkey', 'bench_city_country_idx')
+
+
+class Command(BaseCommand):
+    """
+    Compares loading cities with random and time-ordered primary keys.
+
+    Every generator loads the same number of cities in batches into fresh
+    temporary tables shaped like country and city, with a primary key and an
+    index on the country reference, and reports rows per second and index
+    sizes. Countries are created first with keys of the same generator. The
+    tables are dropped with the rolled back transaction.
+    """
+
+    help = 'Benchmarks city loads and index sizes with uuid4 against uuid7 primary keys.'
+
+    def add_arguments(self, parser):
+        """Adds the command line arguments."""
+        parser.add_argument('--rows', type=int, default=1000000, help='number of cities to load')
+        parser.add_argument('--countries', type=int, default=200, help='number of countries cities refer to')
+        parser.add_argument('--batch-size', type=int, default=10000, help='cities per COPY statement')
+
+    def handle(self, *args, **options):
+        """Loads cities with every generator and prints throughput and index sizes."""
+        for name, generator in GENERATORS.items():
+            with transaction.atomic(), connection.cursor() as cursor:
+                elapsed = self.load(cursor, generator, options['rows'], options['countries'], options['batch_size'])
+                cursor.execute('SELECT pg_relation_size(%s::regclass), pg_relation_size(%s::regclass)', INDEXES)
+                primary, country = cursor.fetchone()
+                self.stdout.write(
+                    f"{name}: {options['rows'] / elapsed:.0f} rows/s, "
+                    f'primary key {primary / 2 ** 20:.1f} MiB, country index {country / 2 ** 20:.1f} MiB'
+                )
+                transaction.set_rollback(True)
+
+    @staticmethod
+    def load(cursor, generator, rows: int, countries: int, batch_size: int) -> float:
+        """Creates the tables, loads countries and cities and returns the wall time of the city load in seconds."""
+        cursor.execute('CREATE TEMPORARY TABLE bench_country (id uuid PRIMARY KEY, name text NOT NULL) ON COMMIT DROP')
+        cursor.execute(
+            'CREATE TEMPORARY TABLE bench_city (id uuid CONSTRAINT bench_city_pkey PRIMARY KEY, '
+            'country_id uuid NOT NULL REFERENCES bench_country, name text NOT NULL, population integer) '
+            'ON COMMIT DROP'
+        )
+        cursor.execute('CREATE INDEX bench_city_country_idx ON bench_city (country_id)')
+        country_ids = [generator() for _ in range(countries)]
+        cursor.copy_expert(
+            'COPY bench_country (id, name) FROM STDIN',
+            io.StringIO(''.join(f'{id_}\tcountry {index}\n' for index, id_ in enumerate(country_ids))),
+        )
+        start = perf_counter()
+        for first in range(0, rows, batch_size):
+            lines = (
+                f'{generator()}\t{country_ids[index % countries]}\tcity {index}\t{index}\n'
+                for index in range(first, min(first + batch_size, rows))
+            )
+            cursor.copy_expert(
+                'COPY bench_city (id, country_id, name, population) FROM STDIN', io.StringIO(''.join(lines)),
+            )
+        return perf_counter() - start
@@ -0,0 +1,50 @@
+"""Module for the outbox consumer command."""
+
+from time import sleep
+from django.core.management.base import BaseCommand, CommandError
+from myapp.outbox import BATCH_SIZE, consume, get_handlers
+
+
+class Command(BaseCommand):
+    """
+    Drains the outbox of catalog changes through the configured handlers.
+
+    Several consumers can run at once: each locks its own batch with
+    FOR UPDATE SKIP LOCKED. Without --once the command polls for new events
+    until it is interrupted.
+    """
+
+    help = 'Passes outbox events to OUTBOX_HANDLERS in batches and deletes the handled ones.'
+
+    def add_arguments(self, parser):
+        """Adds the command line arguments."""
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='events per transaction')
+        parser.add_argument('--once', action='store_true', help='exit when the outbox is drained')
+        parser.add_argument('--interval', type=float, default=1.0, help='seconds to wait when the outbox is empty')
+        parser.add_argument(
+            '--handler', action='append', dest='handlers', help='dotted path of a handler instead of OUTBOX_HANDLERS',
+        )
+
+    def handle(self, *args, **options):
+        """Consumes batches and prints their results with -v 2 and the totals at the end."""
+        if options['batch_size'] < 1:
+            raise CommandError('The batch size must be positive.')
+        try:
+            handlers = get_handlers(options['handlers'])
+        except ImportError as error:
+            raise CommandError(str(error)) from error
+        handled = failed = 0
+        try:
+            while True:
+                done, errors = consume(handlers, options['batch_size'])
+                handled, failed = handled + done, failed + errors
+                if options['verbosity'] > 1 and (done or errors):
+                    self.stdout.write(f'Handled {done} events, {errors} failed.')
+                if done:
+                    continue
+                if options['once'] and not errors:
+                    break
+                sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f'Handled {handled} events, {failed} failed.')
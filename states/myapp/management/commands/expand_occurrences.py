@@ -0,0 +1,27 @@
+"""Module for the feast occurrences expansion command."""
+
+from django.core.management.base import BaseCommand
+from myapp.recurrence import BATCH_SIZE, HORIZON_DAYS, extend_occurrences, get_window
+
+
+class Command(BaseCommand):
+    """
+    Moves the rolling horizon of recurring feast occurrences forward.
+
+    Meant to run daily from cron: each run expands only the days after the last
+    stored occurrence of every recurring feast. Changed feasts are expanded on
+    save, so the command never rewrites existing occurrences.
+    """
+
+    help = 'Expands recurring feasts into occurrences up to the horizon.'
+
+    def add_arguments(self, parser):
+        """Adds the command line arguments."""
+        parser.add_argument('--days', type=int, default=HORIZON_DAYS, help='horizon in days from today')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='feasts per batch')
+
+    def handle(self, *args, **options):
+        """Expands occurrences and prints the window and the number of new rows."""
+        start, end = get_window(days=options['days'])
+        created = extend_occurrences((start, end), options['batch_size'])
+        self.stdout.write(f'Expanded {created} occurrences from {start} to {end}.')
@@ -0,0 +1,58 @@
+"""Module for the catalog import command."""
+
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from myapp.ingest import BATCH_SIZE, DATASETS, FORMATS, import_file
+
+
+class Command(BaseCommand):
+    """
+    Imports countries, feasts, cities or their links from a CSV or JSON Lines file.
+
+    Rows are matched by natural keys: countries by name, feasts by title,
+    cities by name and country name, and links by country name and feast
+    title. Existing rows are updated and new rows are created. Invalid rows
+    are reported and skipped. An interrupted import resumes after the last
+    written batch when it is run again on the same unchanged file.
+    """
+
+    help = 'Imports a CSV or JSON Lines file, optionally gzipped, into a catalog dataset.'
+
+    def add_arguments(self, parser):
+        """Adds the dataset, the file and the import options."""
+        parser.add_argument('dataset', choices=DATASETS)
+        parser.add_argument('path', type=Path)
+        parser.add_argument(
+            '--format', choices=sorted(set(FORMATS.values())), help='Format of the file, by default by its suffix.',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows written per transaction.')
+        parser.add_argument('--restart', action='store_true', help='Import the file from the start again.')
+
+    def handle(self, *args, **options):
+        """Imports the file and prints the progress after each batch, and rejected rows with -v 2."""
+        path = options['path']
+        if not path.is_file():
+            raise CommandError(f'{path} is not a file.')
+        if options['batch_size'] < 1:
+            raise CommandError('The batch size must be positive.')
+        progress = None
+        try:
+            for progress, errors in import_file(
+                options['dataset'], path, options['format'], options['batch_size'], options['restart'],
+            ):
+                if options['verbosity'] > 1:
+                    for row, message in errors:
+                        self.stderr.write(f'Row {row}: {message}')
+                if options['verbosity'] > 0 and not progress.finished:
+                    self.stdout.write(
+                        f'{progress.rows} rows read, {progress.written} written, {progress.rejected} rejected.'
+                    )
+        except ValueError as error:
+            raise CommandError(str(error)) from error
+        if progress is None:
+            self.stdout.write(f'{path} is already imported, pass --restart to import it again.')
+            return
+        self.stdout.write(
+            f'Imported {progress.rows} rows of {options["dataset"]}: '
+            f'{progress.written} written, {progress.rejected} rejected.'
+        )
@@ -0,0 +1,24 @@
+"""Module for the country rollups reconcile command."""
+
+from django.core.management.base import BaseCommand
+from myapp.rollups import reconcile
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the city and feast rollups of every country and fixes drift.
+
+    Rollups are kept by database triggers, so the command normally fixes
+    nothing. It is meant for periodic checks and for use after restores or
+    writes made with the triggers disabled.
+    """
+
+    help = 'Recomputes country rollups and fixes the wrong ones.'
+
+    def handle(self, *args, **options):
+        """Reconciles rollups and prints the number of fixed countries, and their ids with -v 2."""
+        fixed = reconcile()
+        if options['verbosity'] > 1:
+            for country_id in fixed:
+                self.stdout.write(str(country_id))
+        self.stdout.write(f'Fixed rollups of {len(fixed)} countries.')
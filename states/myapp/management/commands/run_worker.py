@@ -0,0 +1,41 @@
+"""Module for the background job worker command."""
+
+from django.core.management.base import BaseCommand
+from myapp.jobs import JOB_TYPES, claim, listen, ready_jobs, run, wait
+
+
+class Command(BaseCommand):
+    """
+    Runs queued background jobs one at a time.
+
+    Start several workers to run jobs in parallel, up to the concurrency
+    limit of every job type, and pass --type to dedicate workers to some
+    types. Idle workers sleep until a job is queued, as enqueue notifies
+    them over LISTEN/NOTIFY.
+    """
+
+    help = 'Runs background jobs from the Postgres job queue.'
+
+    def add_arguments(self, parser):
+        """Adds the command line arguments."""
+        parser.add_argument('--type', action='append', dest='types', choices=JOB_TYPES, help='job type to run')
+        parser.add_argument('--once', action='store_true', help='exit when no job is ready')
+        parser.add_argument('--interval', type=float, default=30.0, help='longest wait between queue checks in seconds')
+
+    def handle(self, *args, **options):
+        """Claims and runs jobs, printing every finished one, until interrupted."""
+        types = options['types']
+        listen()
+        try:
+            while True:
+                job = claim(types)
+                if job is not None:
+                    job = run(job)
+                    if options['verbosity'] > 0:
+                        self.stdout.write(f"{job}{f' ({job.error})' if job.error else ''}")
+                    continue
+                if options['once'] and not ready_jobs(types).exists():
+                    break
+                wait(options['interval'], types)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,25 @@
+# Generated by Django 4.1.7 on 2026-10-17 21:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0010_alter_country_population'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(fields=['created', 'id'], name='city_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['created', 'id'], name='country_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feast',
+            index=models.Index(fields=['created', 'id'], name='feast_created_id_idx'),
+        ),
+    ]
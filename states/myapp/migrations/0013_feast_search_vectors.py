@@ -0,0 +1,37 @@
+# Generated by Django 4.1.7 on 2026-10-17 22:20
+
+from django.db import migrations
+
+FEAST_TABLE = '"states"."feast"'
+SEARCH_CONFIGS = {'en': 'english', 'ru': 'russian'}
+
+
+def vector_sql(config: str) -> str:
+    """Returns the expression of a weighted title and description vector."""
+    return (
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce(description, '')), 'B')"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0012_trigram_indexes'),
+    ]
+
+    operations = [
+        operation
+        for language, config in SEARCH_CONFIGS.items()
+        for operation in (
+            migrations.RunSQL(
+                f'ALTER TABLE {FEAST_TABLE} ADD COLUMN search_{language} tsvector '
+                f'GENERATED ALWAYS AS ({vector_sql(config)}) STORED',
+                f'ALTER TABLE {FEAST_TABLE} DROP COLUMN search_{language}',
+            ),
+            migrations.RunSQL(
+                f'CREATE INDEX feast_search_{language}_idx ON {FEAST_TABLE} USING gin (search_{language})',
+                f'DROP INDEX "states".feast_search_{language}_idx',
+            ),
+        )
+    ]
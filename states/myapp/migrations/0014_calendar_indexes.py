@@ -0,0 +1,21 @@
+# Generated by Django 4.1.7 on 2026-10-17 22:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0013_feast_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='countrytofeast',
+            index=models.Index(fields=['feast', 'country'], name='country_to_feast_feast_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feast',
+            index=models.Index(fields=['date_of_feast', 'id'], name='feast_date_id_idx'),
+        ),
+    ]
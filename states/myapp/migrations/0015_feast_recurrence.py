@@ -0,0 +1,60 @@
+# Generated by Django 4.1.7 on 2026-10-17 22:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0014_calendar_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feast',
+            name='recurrence',
+            field=models.CharField(blank=True, choices=[('', 'once'), ('yearly', 'every year on the same day'), ('weekday', 'every year on a weekday of a month')], default='', max_length=16, verbose_name='recurrence'),
+        ),
+        migrations.AddField(
+            model_name='feast',
+            name='recurrence_month',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(1, 'January'), (2, 'February'), (3, 'March'), (4, 'April'), (5, 'May'), (6, 'June'), (7, 'July'), (8, 'August'), (9, 'September'), (10, 'October'), (11, 'November'), (12, 'December')], null=True, verbose_name='recurrence month'),
+        ),
+        migrations.AddField(
+            model_name='feast',
+            name='recurrence_week',
+            field=models.SmallIntegerField(blank=True, choices=[(1, 'first'), (2, 'second'), (3, 'third'), (4, 'fourth'), (-1, 'last')], null=True, verbose_name='recurrence week'),
+        ),
+        migrations.AddField(
+            model_name='feast',
+            name='recurrence_weekday',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], null=True, verbose_name='recurrence weekday'),
+        ),
+        migrations.CreateModel(
+            name='FeastOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='date')),
+                ('feast', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='myapp.feast', verbose_name='feast')),
+            ],
+            options={
+                'verbose_name': 'feast occurrence',
+                'verbose_name_plural': 'feast occurrences',
+                'db_table': '"states"."feast_occurrence"',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feastoccurrence',
+            index=models.Index(fields=['date', 'feast'], name='feast_occurrence_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feastoccurrence',
+            constraint=models.UniqueConstraint(fields=('feast', 'date'), name='feast_occurrence_feast_date_uniq'),
+        ),
+        migrations.RunSQL(
+            'INSERT INTO "states"."feast_occurrence" (feast_id, date) '
+            'SELECT id, date_of_feast FROM "states"."feast" WHERE date_of_feast IS NOT NULL',
+            migrations.RunSQL.noop,
+        ),
+    ]
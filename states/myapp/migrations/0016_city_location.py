@@ -0,0 +1,52 @@
+# Generated by Django 4.1.7 on 2026-10-17 22:21
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import CreateExtension
+from django.db import migrations, models
+import myapp.geo
+
+BATCH_SIZE = 2000
+
+
+def locate_cities(apps, schema_editor):
+    """Parses the coordinates text of existing cities into latitude and longitude."""
+    city_model = apps.get_model('myapp', 'City')
+    batch = []
+    cities = city_model.objects.exclude(coordinates=None).only('id', 'coordinates')
+    for city in cities.iterator(chunk_size=BATCH_SIZE):
+        point = myapp.geo.parse_coordinates(city.coordinates)
+        if point is None:
+            continue
+        city.latitude, city.longitude = point
+        batch.append(city)
+        if len(batch) >= BATCH_SIZE:
+            city_model.objects.bulk_update(batch, ('latitude', 'longitude'))
+            batch = []
+    city_model.objects.bulk_update(batch, ('latitude', 'longitude'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0015_feast_recurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='latitude'),
+        ),
+        migrations.AddField(
+            model_name='city',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='longitude'),
+        ),
+        migrations.RunPython(locate_cities, migrations.RunPython.noop),
+        CreateExtension('cube'),
+        CreateExtension('earthdistance'),
+        migrations.AddIndex(
+            model_name='city',
+            index=django.contrib.postgres.indexes.GistIndex(myapp.geo.LlToEarth(models.F('latitude'), models.F('longitude')), condition=models.Q(('latitude__isnull', False), ('longitude__isnull', False)), name='city_location_idx'),
+        ),
+    ]
@@ -0,0 +1,128 @@
+# Generated by Django 4.1.7 on 2026-10-17 22:43
+
+from django.db import migrations, models
+import myapp.geo
+
+BATCH_SIZE = 2000
+CELL_COLUMNS = '''
+    left(quadkey, 8) AS cell, count(*) AS count, sum(latitude) AS latitude_sum,
+    sum(longitude) AS longitude_sum, coalesce(sum(population), 0) AS population
+'''
+NEGATED_COLUMNS = '''
+    left(quadkey, 8) AS cell, -count(*) AS count, -sum(latitude) AS latitude_sum,
+    -sum(longitude) AS longitude_sum, -coalesce(sum(population), 0) AS population
+'''
+ADD_CELLS = '''
+    INSERT INTO states.city_cell AS city_cell (cell, count, latitude_sum, longitude_sum, population)
+    SELECT * FROM changes
+    ON CONFLICT (cell) DO UPDATE SET
+        count = city_cell.count + excluded.count,
+        latitude_sum = city_cell.latitude_sum + excluded.latitude_sum,
+        longitude_sum = city_cell.longitude_sum + excluded.longitude_sum,
+        population = city_cell.population + excluded.population;
+'''
+
+
+def index_cities(apps, schema_editor):
+    """Computes quadkeys of located cities."""
+    city_model = apps.get_model('myapp', 'City')
+    batch = []
+    cities = city_model.objects.exclude(latitude=None).exclude(longitude=None).only('id', 'latitude', 'longitude')
+    for city in cities.iterator(chunk_size=BATCH_SIZE):
+        city.quadkey = myapp.geo.quadkey(city.latitude, city.longitude)
+        batch.append(city)
+        if len(batch) >= BATCH_SIZE:
+            city_model.objects.bulk_update(batch, ('quadkey',))
+            batch = []
+    city_model.objects.bulk_update(batch, ('quadkey',))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0016_city_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='quadkey',
+            field=models.CharField(blank=True, db_collation='C', editable=False, max_length=18, null=True, verbose_name='quadkey'),
+        ),
+        migrations.RunPython(index_cities, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(condition=models.Q(('latitude__isnull', False), ('longitude__isnull', False)), fields=['quadkey'], include=('latitude', 'longitude', 'population'), name='city_quadkey_idx'),
+        ),
+        migrations.CreateModel(
+            name='CityCell',
+            fields=[
+                ('cell', models.CharField(db_collation='C', max_length=8, primary_key=True, serialize=False, verbose_name='cell')),
+                ('count', models.IntegerField(default=0, verbose_name='count')),
+                ('latitude_sum', models.FloatField(default=0, verbose_name='latitude sum')),
+                ('longitude_sum', models.FloatField(default=0, verbose_name='longitude sum')),
+                ('population', models.BigIntegerField(default=0, verbose_name='population')),
+            ],
+            options={
+                'verbose_name': 'city cell',
+                'verbose_name_plural': 'city cells',
+                'db_table': '"states"."city_cell"',
+            },
+        ),
+        migrations.RunSQL(
+            sql=[
+                f'''
+                CREATE FUNCTION states.city_cell_update() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF TG_OP = 'INSERT' THEN
+                        WITH changes AS (
+                            SELECT {CELL_COLUMNS} FROM new_rows WHERE quadkey IS NOT NULL GROUP BY 1
+                        ) {ADD_CELLS}
+                    ELSIF TG_OP = 'DELETE' THEN
+                        WITH changes AS (
+                            SELECT {NEGATED_COLUMNS} FROM old_rows WHERE quadkey IS NOT NULL GROUP BY 1
+                        ) {ADD_CELLS}
+                    ELSE
+                        WITH deltas AS (
+                            SELECT {CELL_COLUMNS} FROM new_rows WHERE quadkey IS NOT NULL GROUP BY 1
+                            UNION ALL
+                            SELECT {NEGATED_COLUMNS} FROM old_rows WHERE quadkey IS NOT NULL GROUP BY 1
+                        ), changes AS (
+                            SELECT cell, sum(count), sum(latitude_sum), sum(longitude_sum), sum(population)
+                            FROM deltas GROUP BY cell
+                            HAVING sum(count) <> 0 OR sum(latitude_sum) <> 0
+                                OR sum(longitude_sum) <> 0 OR sum(population) <> 0
+                        ) {ADD_CELLS}
+                    END IF;
+                    RETURN NULL;
+                END
+                $$;
+                ''',
+                '''
+                CREATE TRIGGER city_cell_insert AFTER INSERT ON states.city
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION states.city_cell_update();
+                ''',
+                '''
+                CREATE TRIGGER city_cell_update AFTER UPDATE ON states.city
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION states.city_cell_update();
+                ''',
+                '''
+                CREATE TRIGGER city_cell_delete AFTER DELETE ON states.city
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION states.city_cell_update();
+                ''',
+                f'''
+                INSERT INTO states.city_cell (cell, count, latitude_sum, longitude_sum, population)
+                SELECT {CELL_COLUMNS} FROM states.city WHERE quadkey IS NOT NULL GROUP BY 1;
+                ''',
+            ],
+            reverse_sql=[
+                'DROP TRIGGER city_cell_delete ON states.city;',
+                'DROP TRIGGER city_cell_update ON states.city;',
+                'DROP TRIGGER city_cell_insert ON states.city;',
+                'DROP FUNCTION states.city_cell_update();',
+            ],
+        ),
+    ]
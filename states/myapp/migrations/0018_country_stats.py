@@ -0,0 +1,164 @@
+# Generated by Django 4.1.7 on 2026-10-17 22:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+CITY_ROLLUPS = {
+    'city_count': 'count(*)',
+    'city_population': 'coalesce(sum(population), 0)',
+    'city_area': 'coalesce(sum(area_city), 0)',
+}
+FEAST_ROLLUPS = {
+    'feast_count': 'count(*)',
+}
+
+
+def rollup_function(table: str, rollups: dict) -> str:
+    """
+    Builds the statement trigger function adding the changes of a table to country rollups.
+
+    Inserted rows are added and deleted rows subtracted per country. Updates
+    do both, so only countries whose totals actually change are written.
+    """
+    added = ', '.join(f'{value} AS {name}' for name, value in rollups.items())
+    subtracted = ', '.join(f'-{value} AS {name}' for name, value in rollups.items())
+    summed = ', '.join(f'sum({name}) AS {name}' for name in rollups)
+    changed = ' OR '.join(f'sum({name}) <> 0' for name in rollups)
+    apply = f'''
+        UPDATE states.country_stats AS stats SET
+            {', '.join(f'{name} = stats.{name} + changes.{name}' for name in rollups)},
+            updated = now()
+        FROM changes WHERE stats.country_id = changes.country_id;
+    '''
+    return f'''
+        CREATE FUNCTION states.{table}_rollup_update() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                WITH changes AS (
+                    SELECT country_id, {added} FROM new_rows WHERE country_id IS NOT NULL GROUP BY 1
+                ) {apply}
+            ELSIF TG_OP = 'DELETE' THEN
+                WITH changes AS (
+                    SELECT country_id, {subtracted} FROM old_rows WHERE country_id IS NOT NULL GROUP BY 1
+                ) {apply}
+            ELSE
+                WITH deltas AS (
+                    SELECT country_id, {added} FROM new_rows WHERE country_id IS NOT NULL GROUP BY 1
+                    UNION ALL
+                    SELECT country_id, {subtracted} FROM old_rows WHERE country_id IS NOT NULL GROUP BY 1
+                ), changes AS (
+                    SELECT country_id, {summed} FROM deltas GROUP BY 1 HAVING {changed}
+                ) {apply}
+            END IF;
+            RETURN NULL;
+        END
+        $$;
+    '''
+
+def rollup_triggers(table: str) -> list:
+    """Builds the insert, update and delete statement triggers of a table."""
+    return [
+        f'''
+        CREATE TRIGGER {table}_rollup_{event.lower()} AFTER {event} ON states.{table}
+        REFERENCING {tables}
+        FOR EACH STATEMENT EXECUTE FUNCTION states.{table}_rollup_update();
+        '''
+        for event, tables in (
+            ('INSERT', 'NEW TABLE AS new_rows'),
+            ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+            ('DELETE', 'OLD TABLE AS old_rows'),
+        )
+    ]
+
+def drop_rollups(table: str) -> list:
+    """Drops the triggers and the function of a table."""
+    return [
+        *(f'DROP TRIGGER {table}_rollup_{event} ON states.{table};' for event in ('insert', 'update', 'delete')),
+        f'DROP FUNCTION states.{table}_rollup_update();',
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0017_city_tiles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CountryStats',
+            fields=[
+                ('country', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='myapp.country', verbose_name='country')),
+                ('city_count', models.IntegerField(default=0, verbose_name='city count')),
+                ('city_population', models.BigIntegerField(default=0, verbose_name='city population')),
+                ('city_area', models.BigIntegerField(default=0, verbose_name='city area')),
+                ('feast_count', models.IntegerField(default=0, verbose_name='feast count')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='updated')),
+            ],
+            options={
+                'verbose_name': 'country statistics',
+                'verbose_name_plural': 'country statistics',
+                'db_table': '"states"."country_stats"',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='countrystats',
+            index=models.Index(fields=['city_count', 'country'], name='stats_city_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='countrystats',
+            index=models.Index(fields=['city_population', 'country'], name='stats_city_population_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='countrystats',
+            index=models.Index(fields=['city_area', 'country'], name='stats_city_area_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='countrystats',
+            index=models.Index(fields=['feast_count', 'country'], name='stats_feast_count_idx'),
+        ),
+        migrations.RunSQL(
+            sql=[
+                '''
+                CREATE FUNCTION states.country_stats_create() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    INSERT INTO states.country_stats (country_id, city_count, city_population, city_area, feast_count, updated)
+                    SELECT id, 0, 0, 0, 0, now() FROM new_rows
+                    ON CONFLICT (country_id) DO NOTHING;
+                    RETURN NULL;
+                END
+                $$;
+                ''',
+                '''
+                CREATE TRIGGER country_stats_create AFTER INSERT ON states.country
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION states.country_stats_create();
+                ''',
+                rollup_function('city', CITY_ROLLUPS),
+                *rollup_triggers('city'),
+                rollup_function('country_to_feast', FEAST_ROLLUPS),
+                *rollup_triggers('country_to_feast'),
+                '''
+                INSERT INTO states.country_stats (country_id, city_count, city_population, city_area, feast_count, updated)
+                SELECT
+                    country.id, coalesce(cities.city_count, 0), coalesce(cities.city_population, 0),
+                    coalesce(cities.city_area, 0), coalesce(feasts.feast_count, 0), now()
+                FROM states.country
+                LEFT JOIN (
+                    SELECT country_id, count(*) AS city_count, sum(population) AS city_population,
+                        sum(area_city) AS city_area
+                    FROM states.city GROUP BY 1
+                ) cities ON cities.country_id = country.id
+                LEFT JOIN (
+                    SELECT country_id, count(*) AS feast_count FROM states.country_to_feast GROUP BY 1
+                ) feasts ON feasts.country_id = country.id;
+                ''',
+            ],
+            reverse_sql=[
+                *drop_rollups('country_to_feast'),
+                *drop_rollups('city'),
+                'DROP TRIGGER country_stats_create ON states.country;',
+                'DROP FUNCTION states.country_stats_create();',
+            ],
+        ),
+    ]
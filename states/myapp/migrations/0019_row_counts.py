@@ -0,0 +1,94 @@
+# Generated by Django 4.1.7 on 2026-10-17 22:55
+
+from django.db import migrations, models
+
+COUNTED_TABLES = ('country', 'feast', 'city')
+SLOTS = 16
+
+
+def count_triggers(table: str) -> list:
+    """Builds the statement triggers counting inserted, deleted and truncated rows of a table."""
+    return [
+        f'''
+        CREATE TRIGGER {table}_count_insert AFTER INSERT ON states.{table}
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION states.row_count_update();
+        ''',
+        f'''
+        CREATE TRIGGER {table}_count_delete AFTER DELETE ON states.{table}
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION states.row_count_update();
+        ''',
+        f'''
+        CREATE TRIGGER {table}_count_truncate AFTER TRUNCATE ON states.{table}
+        FOR EACH STATEMENT EXECUTE FUNCTION states.row_count_update();
+        ''',
+        f'''
+        INSERT INTO states.row_count ("table", slot, count)
+        SELECT 'states.{table}', 0, count(*) FROM states.{table};
+        ''',
+    ]
+
+def drop_count_triggers(table: str) -> list:
+    """Drops the counting triggers of a table."""
+    return [f'DROP TRIGGER {table}_count_{event} ON states.{table};' for event in ('insert', 'delete', 'truncate')]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0018_country_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RowCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=127, verbose_name='table')),
+                ('slot', models.SmallIntegerField(verbose_name='slot')),
+                ('count', models.BigIntegerField(default=0, verbose_name='count')),
+            ],
+            options={
+                'verbose_name': 'row count',
+                'verbose_name_plural': 'row counts',
+                'db_table': '"states"."row_count"',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rowcount',
+            constraint=models.UniqueConstraint(fields=('table', 'slot'), name='row_count_table_slot_key'),
+        ),
+        migrations.RunSQL(
+            sql=[
+                f'''
+                CREATE FUNCTION states.row_count_update() RETURNS trigger LANGUAGE plpgsql AS $$
+                DECLARE
+                    name text := TG_TABLE_SCHEMA || '.' || TG_TABLE_NAME;
+                    delta bigint;
+                BEGIN
+                    IF TG_OP = 'TRUNCATE' THEN
+                        DELETE FROM states.row_count WHERE "table" = name;
+                        RETURN NULL;
+                    ELSIF TG_OP = 'INSERT' THEN
+                        SELECT count(*) INTO delta FROM new_rows;
+                    ELSE
+                        SELECT -count(*) INTO delta FROM old_rows;
+                    END IF;
+                    IF delta <> 0 THEN
+                        INSERT INTO states.row_count AS counter ("table", slot, count)
+                        VALUES (name, pg_backend_pid() % {SLOTS}, delta)
+                        ON CONFLICT ("table", slot) DO UPDATE SET count = counter.count + excluded.count;
+                    END IF;
+                    RETURN NULL;
+                END
+                $$;
+                ''',
+                *(sql for table in COUNTED_TABLES for sql in count_triggers(table)),
+            ],
+            reverse_sql=[
+                *(sql for table in COUNTED_TABLES for sql in drop_count_triggers(table)),
+                'DROP FUNCTION states.row_count_update();',
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.1.7 on 2026-10-17 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0019_row_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=40, unique=True, verbose_name='source')),
+                ('dataset', models.CharField(max_length=32, verbose_name='dataset')),
+                ('path', models.TextField(verbose_name='path')),
+                ('rows', models.BigIntegerField(default=0, verbose_name='rows')),
+                ('written', models.BigIntegerField(default=0, verbose_name='written')),
+                ('rejected', models.BigIntegerField(default=0, verbose_name='rejected')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='finished')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='updated')),
+            ],
+            options={
+                'verbose_name': 'catalog import',
+                'verbose_name_plural': 'catalog imports',
+                'db_table': '"states"."catalog_import"',
+            },
+        ),
+    ]
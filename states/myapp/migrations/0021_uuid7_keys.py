@@ -0,0 +1,39 @@
+# Generated by Django 4.1.7 on 2026-10-17 23:09
+
+from django.db import migrations, models
+import myapp.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0020_catalog_import'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='city',
+            name='id',
+            field=models.UUIDField(blank=True, default=myapp.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='country',
+            name='id',
+            field=models.UUIDField(blank=True, default=myapp.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='countryclient',
+            name='id',
+            field=models.UUIDField(blank=True, default=myapp.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='countrytofeast',
+            name='id',
+            field=models.UUIDField(blank=True, default=myapp.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='feast',
+            name='id',
+            field=models.UUIDField(blank=True, default=myapp.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
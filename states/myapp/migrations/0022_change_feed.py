@@ -0,0 +1,102 @@
+# Generated by Django 4.1.7 on 2026-10-17 23:12
+
+from django.db import migrations, models
+import myapp.models
+
+TABLES = ('country', 'feast', 'city', 'country_to_feast')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0021_uuid7_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=127, verbose_name='table')),
+                ('row_id', models.UUIDField(verbose_name='row id')),
+                ('deleted', models.DateTimeField(verbose_name='deleted')),
+            ],
+            options={
+                'verbose_name': 'tombstone',
+                'verbose_name_plural': 'tombstones',
+                'db_table': '"states"."tombstone"',
+            },
+        ),
+        migrations.AddField(
+            model_name='countrytofeast',
+            name='modified',
+            field=models.DateTimeField(blank=True, default=myapp.models.get_datetime, null=True, validators=[myapp.models.check_modified], verbose_name='modified'),
+        ),
+        migrations.RunSQL(
+            sql=[
+                'UPDATE states.country_to_feast SET modified = coalesce(created, now());',
+                *(
+                    f'UPDATE states.{table} SET modified = coalesce(created, now()) WHERE modified IS NULL;'
+                    for table in TABLES[:3]
+                ),
+                '''
+                CREATE FUNCTION states.touch_modified() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    NEW.modified := clock_timestamp();
+                    RETURN NEW;
+                END
+                $$;
+                ''',
+                '''
+                CREATE FUNCTION states.tombstone_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    INSERT INTO states.tombstone ("table", row_id, deleted)
+                    SELECT TG_TABLE_SCHEMA || '.' || TG_TABLE_NAME, id, clock_timestamp() FROM old_rows;
+                    RETURN NULL;
+                END
+                $$;
+                ''',
+                *(
+                    f'''
+                    CREATE TRIGGER {table}_touch_modified BEFORE INSERT OR UPDATE ON states.{table}
+                    FOR EACH ROW EXECUTE FUNCTION states.touch_modified();
+                    '''
+                    for table in TABLES
+                ),
+                *(
+                    f'''
+                    CREATE TRIGGER {table}_tombstone AFTER DELETE ON states.{table}
+                    REFERENCING OLD TABLE AS old_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION states.tombstone_insert();
+                    '''
+                    for table in TABLES
+                ),
+            ],
+            reverse_sql=[
+                *(f'DROP TRIGGER {table}_tombstone ON states.{table};' for table in TABLES),
+                *(f'DROP TRIGGER {table}_touch_modified ON states.{table};' for table in TABLES),
+                'DROP FUNCTION states.tombstone_insert();',
+                'DROP FUNCTION states.touch_modified();',
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(fields=['modified', 'id'], name='city_modified_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['modified', 'id'], name='country_modified_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='countrytofeast',
+            index=models.Index(fields=['modified', 'id'], name='country_to_feast_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feast',
+            index=models.Index(fields=['modified', 'id'], name='feast_modified_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['table', 'deleted', 'row_id'], name='tombstone_table_deleted_idx'),
+        ),
+    ]
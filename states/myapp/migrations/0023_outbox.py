@@ -0,0 +1,75 @@
+# Generated by Django 4.1.7 on 2026-10-17 23:14
+
+from django.db import migrations, models
+
+TABLES = ('country', 'feast', 'city', 'country_to_feast', 'country_client')
+TRIGGERS = (
+    ('insert', 'INSERT', 'NEW TABLE AS new_rows'),
+    ('update', 'UPDATE', 'NEW TABLE AS new_rows'),
+    ('delete', 'DELETE', 'OLD TABLE AS old_rows'),
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0022_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=127, verbose_name='table')),
+                ('operation', models.CharField(max_length=6, verbose_name='operation')),
+                ('row_id', models.UUIDField(verbose_name='row id')),
+                ('payload', models.JSONField(verbose_name='payload')),
+                ('created', models.DateTimeField(verbose_name='created')),
+                ('attempts', models.SmallIntegerField(default=0, verbose_name='attempts')),
+                ('error', models.TextField(blank=True, default='', verbose_name='error')),
+            ],
+            options={
+                'verbose_name': 'outbox event',
+                'verbose_name_plural': 'outbox events',
+                'db_table': '"states"."outbox"',
+            },
+        ),
+        migrations.RunSQL(
+            sql=[
+                '''
+                CREATE FUNCTION states.outbox_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF TG_OP = 'DELETE' THEN
+                        INSERT INTO states.outbox ("table", operation, row_id, payload, created, attempts, error)
+                        SELECT TG_TABLE_SCHEMA || '.' || TG_TABLE_NAME, 'delete', changed.id, to_jsonb(changed),
+                            clock_timestamp(), 0, ''
+                        FROM old_rows AS changed;
+                    ELSE
+                        INSERT INTO states.outbox ("table", operation, row_id, payload, created, attempts, error)
+                        SELECT TG_TABLE_SCHEMA || '.' || TG_TABLE_NAME, lower(TG_OP), changed.id, to_jsonb(changed),
+                            clock_timestamp(), 0, ''
+                        FROM new_rows AS changed;
+                    END IF;
+                    RETURN NULL;
+                END
+                $$;
+                ''',
+                *(
+                    f'''
+                    CREATE TRIGGER {table}_outbox_{name} AFTER {operation} ON states.{table}
+                    REFERENCING {transition}
+                    FOR EACH STATEMENT EXECUTE FUNCTION states.outbox_insert();
+                    '''
+                    for table in TABLES for name, operation, transition in TRIGGERS
+                ),
+            ],
+            reverse_sql=[
+                *(
+                    f'DROP TRIGGER {table}_outbox_{name} ON states.{table};'
+                    for table in TABLES for name, _, _ in TRIGGERS
+                ),
+                'DROP FUNCTION states.outbox_insert();',
+            ],
+        ),
+    ]
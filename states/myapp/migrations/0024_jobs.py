@@ -0,0 +1,43 @@
+# Generated by Django 4.1.7 on 2026-10-17 23:17
+
+from django.db import migrations, models
+import myapp.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0023_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(max_length=64, verbose_name='type')),
+                ('args', models.JSONField(blank=True, default=dict, verbose_name='arguments')),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')], default='queued', max_length=8, verbose_name='status')),
+                ('attempts', models.SmallIntegerField(default=0, verbose_name='attempts')),
+                ('run_at', models.DateTimeField(default=myapp.models.get_datetime, verbose_name='run at')),
+                ('created', models.DateTimeField(default=myapp.models.get_datetime, verbose_name='created')),
+                ('started', models.DateTimeField(blank=True, null=True, verbose_name='started')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='finished')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='result')),
+                ('error', models.TextField(blank=True, default='', verbose_name='error')),
+            ],
+            options={
+                'verbose_name': 'job',
+                'verbose_name_plural': 'jobs',
+                'db_table': '"states"."job"',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('status', 'queued')), fields=['type', 'run_at', 'id'], name='job_queued_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('status', 'running')), fields=['type'], name='job_running_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.7 on 2026-10-18 10:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0024_jobs'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'UPDATE states.country_to_feast SET modified = coalesce(created, now()) WHERE modified IS NULL',
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,17 +1,36 @@
 """Module for models."""
 
+from os import urandom
+from time import time_ns
 from typing import Any
-from uuid import uuid4
+from uuid import UUID
 from datetime import datetime, timezone
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils.dates import MONTHS, WEEKDAYS
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 from django.conf.global_settings import AUTH_USER_MODEL
+from .geo import LOCATED, MAX_ZOOM, SUMMARY_ZOOM, city_location, parse_coordinates, quadkey
+
+def uuid7() -> UUID:
+    """
+    Returns a time-ordered UUID of version 7.
+
+    The first 48 bits are the Unix time in milliseconds and the remaining bits
+    besides the version and variant are random, so new keys land on the right
+    edge of primary key indexes instead of random pages.
+    """
+    value = (time_ns() // 1_000_000) << 80 | int.from_bytes(urandom(10), 'big')
+    value = value & ~(0xf << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return UUID(int=value)
 
 class UUIDMixin(models.Model):
     """Class which adds id field."""
 
-    id = models.UUIDField(primary_key=True, blank=True, editable=False, default=uuid4)
+    id = models.UUIDField(primary_key=True, blank=True, editable=False, default=uuid7)
 
     class Meta:
         """Inner class metadata for abstract base classes."""
@@ -75,7 +94,12 @@ class CreatedMixin(models.Model):
         abstract = True
 
 class ModifiedMixin(models.Model):
-    """Class that adds a last updated date and time field."""
+    """
+    Class that adds a last updated date and time field.
+
+    Database triggers set it to the database clock on every insert and update,
+    including writes which skip save, so change feeds can rely on it.
+    """
 
     modified = models.DateTimeField(
         _('modified'),
@@ -86,6 +110,14 @@ class ModifiedMixin(models.Model):
         ]
     )
 
+    def save(self, *args, **kwargs) -> None:
+        """Bumps the modification time when an existing object is saved."""
+        if not self._state.adding:
+            self.modified = get_datetime()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'modified'}
+        return super().save(*args, **kwargs)
+
     class Meta:
         """Inner class metadata for abstract base classes."""
 
@@ -128,9 +160,61 @@ class Country(UUIDMixin, CreatedMixin, ModifiedMixin):
         """Inner class metadata for abstract base classes."""
 
         db_table = '"states"."country"'
+        indexes = (
+            models.Index(fields=('created', 'id'), name='country_created_id_idx'),
+            models.Index(fields=('modified', 'id'), name='country_modified_id_idx'),
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='country_name_trgm_idx'),
+        )
         verbose_name = _('country')
         verbose_name_plural = _('countries')
 
+ROLLUP_FIELDS = ('city_count', 'city_population', 'city_area', 'feast_count')
+
+class CountryStats(models.Model):
+    """
+    Module for rollups of the cities and feasts of a country.
+
+    Rows are created with their countries and kept up to date by database
+    triggers on city and country_to_feast in the writing transaction.
+    """
+
+    country = models.OneToOneField(
+        Country,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name=_('country'),
+    )
+    city_count = models.IntegerField(_('city count'), default=0)
+    city_population = models.BigIntegerField(_('city population'), default=0)
+    city_area = models.BigIntegerField(_('city area'), default=0)
+    feast_count = models.IntegerField(_('feast count'), default=0)
+    updated = models.DateTimeField(_('updated'), auto_now=True)
+
+    def __str__(self) -> str:
+        """Returns a string representation of the object."""
+
+        return f'{self.country_id}: {self.city_count} cities, {self.feast_count} feasts'
+
+    class Meta:
+        """Inner class metadata for abstract base classes."""
+
+        db_table = '"states"."country_stats"'
+        indexes = tuple(
+            models.Index(fields=(name, 'country'), name=f'stats_{name}_idx') for name in ROLLUP_FIELDS
+        )
+        verbose_name = _('country statistics')
+        verbose_name_plural = _('country statistics')
+
+
+class Recurrence(models.TextChoices):
+    """Rules a feast repeats by."""
+
+    NONE = '', _('once')
+    YEARLY = 'yearly', _('every year on the same day')
+    WEEKDAY = 'weekday', _('every year on a weekday of a month')
+
+RECURRENCE_WEEKS = ((1, _('first')), (2, _('second')), (3, _('third')), (4, _('fourth')), (-1, _('last')))
 
 class Feast(UUIDMixin, CreatedMixin, ModifiedMixin):
     """Module for feast."""
@@ -138,6 +222,22 @@ class Feast(UUIDMixin, CreatedMixin, ModifiedMixin):
     title = models.TextField(_('title'), null=False, blank=False)
     date_of_feast = models.DateField(_('date of feast'), null=True, blank=True)
     description = models.TextField(_('description'), null=True, blank=True)
+    recurrence = models.CharField(
+        _('recurrence'),
+        max_length=16,
+        choices=Recurrence.choices,
+        default=Recurrence.NONE,
+        blank=True,
+    )
+    recurrence_month = models.PositiveSmallIntegerField(
+        _('recurrence month'), null=True, blank=True, choices=MONTHS.items(),
+    )
+    recurrence_weekday = models.PositiveSmallIntegerField(
+        _('recurrence weekday'), null=True, blank=True, choices=WEEKDAYS.items(),
+    )
+    recurrence_week = models.SmallIntegerField(
+        _('recurrence week'), null=True, blank=True, choices=RECURRENCE_WEEKS,
+    )
 
     countries = models.ManyToManyField(
         Country,
@@ -149,13 +249,68 @@ class Feast(UUIDMixin, CreatedMixin, ModifiedMixin):
 
         return f'{self.title}'
 
+    def clean(self) -> None:
+        """
+        Checks that the recurrence rule has the fields it repeats by.
+
+        Yearly feasts repeat on the day and month of date_of_feast, weekday feasts
+        on the recurrence_week-th recurrence_weekday of recurrence_month.
+        """
+        if self.recurrence == Recurrence.YEARLY and self.date_of_feast is None:
+            raise ValidationError({'date_of_feast': _('Yearly feasts need a date to repeat.')})
+        if self.recurrence == Recurrence.WEEKDAY:
+            missing = {
+                name: _('Weekday feasts need a month, a weekday and a week.')
+                for name in ('recurrence_month', 'recurrence_weekday', 'recurrence_week')
+                if getattr(self, name) is None
+            }
+            if missing:
+                raise ValidationError(missing)
+
     class Meta:
         """Inner class metadata for abstract base classes."""
 
         db_table = '"states"."feast"'
+        indexes = (
+            models.Index(fields=('created', 'id'), name='feast_created_id_idx'),
+            models.Index(fields=('modified', 'id'), name='feast_modified_id_idx'),
+            models.Index(fields=('date_of_feast', 'id'), name='feast_date_id_idx'),
+        )
         verbose_name = _('feast')
         verbose_name_plural = _('feasts')
 
+class FeastOccurrence(models.Model):
+    """Module for a day a feast is celebrated on, expanded from its recurrence rule."""
+
+    feast = models.ForeignKey(
+        Feast,
+        on_delete=models.CASCADE,
+        related_name='occurrences',
+        db_index=False,
+        verbose_name=_('feast'),
+    )
+    date = models.DateField(_('date'))
+
+    def __str__(self) -> str:
+        """Returns a string representation of the object."""
+
+        return f'{self.feast_id}: {self.date}'
+
+    class Meta:
+        """Inner class metadata for abstract base classes."""
+
+        db_table = '"states"."feast_occurrence"'
+        constraints = (
+            models.UniqueConstraint(fields=('feast', 'date'), name='feast_occurrence_feast_date_uniq'),
+        )
+        indexes = (
+            models.Index(fields=('date', 'feast'), name='feast_occurrence_date_idx'),
+        )
+        verbose_name = _('feast occurrence')
+        verbose_name_plural = _('feast occurrences')
+
+LOCATION_FIELDS = ('latitude', 'longitude', 'quadkey')
+
 class City(UUIDMixin, CreatedMixin, ModifiedMixin):
     """Module for city."""
 
@@ -169,6 +324,23 @@ class City(UUIDMixin, CreatedMixin, ModifiedMixin):
     population = models.PositiveIntegerField(_('population'), null=True, blank=True)
     coordinates = models.TextField(_('coordinates'), null=True, blank=True)
     area_city = models.PositiveIntegerField(_('area city'), null=True, blank=True)
+    latitude = models.FloatField(_('latitude'), null=True, blank=True, editable=False)
+    longitude = models.FloatField(_('longitude'), null=True, blank=True, editable=False)
+    quadkey = models.CharField(
+        _('quadkey'), max_length=MAX_ZOOM, null=True, blank=True, editable=False, db_collation='C',
+    )
+
+    def locate(self) -> None:
+        """Sets latitude, longitude and quadkey from the coordinates text or clears them if it is not a point."""
+        self.latitude, self.longitude = parse_coordinates(self.coordinates) or (None, None)
+        self.quadkey = None if self.latitude is None else quadkey(self.latitude, self.longitude)
+
+    def save(self, *args, **kwargs) -> None:
+        """Keeps latitude, longitude and quadkey in sync with the coordinates."""
+        self.locate()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *LOCATION_FIELDS}
+        return super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         """Returns a string representation of the object."""
@@ -179,10 +351,202 @@ class City(UUIDMixin, CreatedMixin, ModifiedMixin):
         """Inner class metadata for abstract base classes."""
 
         db_table = '"states"."city"'
+        indexes = (
+            models.Index(fields=('created', 'id'), name='city_created_id_idx'),
+            models.Index(fields=('modified', 'id'), name='city_modified_id_idx'),
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='city_name_trgm_idx'),
+            GistIndex(city_location(), condition=LOCATED, name='city_location_idx'),
+            models.Index(
+                fields=('quadkey',), include=('latitude', 'longitude', 'population'),
+                condition=LOCATED, name='city_quadkey_idx',
+            ),
+        )
         verbose_name = _('city')
         verbose_name_plural = _('cities')
 
-class CountryToFeast(UUIDMixin, CreatedMixin):
+class RowCount(models.Model):
+    """
+    Module for row counts of catalog tables kept by database triggers.
+
+    Every table has up to SLOTS rows, set by the triggers of migration
+    0019_row_counts, picked by the backend process id, so concurrent writers
+    rarely wait for each other on a counter row. The count of a table is the
+    sum of its slots.
+    """
+
+    table = models.CharField(_('table'), max_length=127)
+    slot = models.SmallIntegerField(_('slot'))
+    count = models.BigIntegerField(_('count'), default=0)
+
+    def __str__(self) -> str:
+        """Returns a string representation of the object."""
+
+        return f'{self.table}[{self.slot}]: {self.count}'
+
+    class Meta:
+        """Inner class metadata for abstract base classes."""
+
+        db_table = '"states"."row_count"'
+        constraints = (
+            models.UniqueConstraint(fields=('table', 'slot'), name='row_count_table_slot_key'),
+        )
+        verbose_name = _('row count')
+        verbose_name_plural = _('row counts')
+
+class Tombstone(models.Model):
+    """
+    Module for a deleted catalog row, recorded by database triggers for change feeds.
+
+    Deletes cascaded by the ORM delete the related rows one table at a time,
+    so they leave tombstones as well.
+    """
+
+    table = models.CharField(_('table'), max_length=127)
+    row_id = models.UUIDField(_('row id'))
+    deleted = models.DateTimeField(_('deleted'))
+
+    def __str__(self) -> str:
+        """Returns a string representation of the object."""
+
+        return f'{self.table}: {self.row_id} at {self.deleted}'
+
+    class Meta:
+        """Inner class metadata for abstract base classes."""
+
+        db_table = '"states"."tombstone"'
+        indexes = (
+            models.Index(fields=('table', 'deleted', 'row_id'), name='tombstone_table_deleted_idx'),
+        )
+        verbose_name = _('tombstone')
+        verbose_name_plural = _('tombstones')
+
+class OutboxEvent(models.Model):
+    """
+    Module for a change of a catalog row, written by database triggers in the writing transaction.
+
+    The payload is the row after an insert or update and before a delete.
+    Consumers delete events once their handlers succeed and count failed
+    attempts otherwise.
+    """
+
+    table = models.CharField(_('table'), max_length=127)
+    operation = models.CharField(_('operation'), max_length=6)
+    row_id = models.UUIDField(_('row id'))
+    payload = models.JSONField(_('payload'))
+    created = models.DateTimeField(_('created'))
+    attempts = models.SmallIntegerField(_('attempts'), default=0)
+    error = models.TextField(_('error'), blank=True, default='')
+
+    def __str__(self) -> str:
+        """Returns a string representation of the object."""
+
+        return f'{self.operation} {self.table}: {self.row_id}'
+
+    class Meta:
+        """Inner class metadata for abstract base classes."""
+
+        db_table = '"states"."outbox"'
+        verbose_name = _('outbox event')
+        verbose_name_plural = _('outbox events')
+
+class JobStatus(models.TextChoices):
+    """States of a background job."""
+
+    QUEUED = 'queued', _('queued')
+    RUNNING = 'running', _('running')
+    DONE = 'done', _('done')
+    FAILED = 'failed', _('failed')
+
+class Job(models.Model):
+    """
+    Module for a background job run by the run_worker command.
+
+    Queued jobs run once run_at has passed. A running job is held by an
+    advisory lock of its worker session, so the jobs of workers which die
+    are queued again.
+    """
+
+    type = models.CharField(_('type'), max_length=64)
+    args = models.JSONField(_('arguments'), default=dict, blank=True)
+    status = models.CharField(_('status'), max_length=8, choices=JobStatus.choices, default=JobStatus.QUEUED)
+    attempts = models.SmallIntegerField(_('attempts'), default=0)
+    run_at = models.DateTimeField(_('run at'), default=get_datetime)
+    created = models.DateTimeField(_('created'), default=get_datetime)
+    started = models.DateTimeField(_('started'), null=True, blank=True)
+    finished = models.DateTimeField(_('finished'), null=True, blank=True)
+    result = models.JSONField(_('result'), null=True, blank=True)
+    error = models.TextField(_('error'), blank=True, default='')
+
+    def __str__(self) -> str:
+        """Returns a string representation of the object."""
+
+        return f'{self.type} #{self.pk}: {self.status}'
+
+    class Meta:
+        """Inner class metadata for abstract base classes."""
+
+        db_table = '"states"."job"'
+        indexes = (
+            models.Index(
+                fields=('type', 'run_at', 'id'), condition=models.Q(status='queued'), name='job_queued_idx',
+            ),
+            models.Index(fields=('type',), condition=models.Q(status='running'), name='job_running_idx'),
+        )
+        verbose_name = _('job')
+        verbose_name_plural = _('jobs')
+
+class CatalogImport(models.Model):
+    """
+    Module for the progress of a catalog file import.
+
+    A file is identified by its dataset, path, size and modification time.
+    Rows are counted in the transaction that writes them, so an interrupted
+    import resumes after the last written batch.
+    """
+
+    source = models.CharField(_('source'), max_length=40, unique=True)
+    dataset = models.CharField(_('dataset'), max_length=32)
+    path = models.TextField(_('path'))
+    rows = models.BigIntegerField(_('rows'), default=0)
+    written = models.BigIntegerField(_('written'), default=0)
+    rejected = models.BigIntegerField(_('rejected'), default=0)
+    finished = models.DateTimeField(_('finished'), null=True, blank=True)
+    updated = models.DateTimeField(_('updated'), auto_now=True)
+
+    def __str__(self) -> str:
+        """Returns a string representation of the object."""
+
+        return f'{self.dataset} from {self.path}: {self.rows} rows'
+
+    class Meta:
+        """Inner class metadata for abstract base classes."""
+
+        db_table = '"states"."catalog_import"'
+        verbose_name = _('catalog import')
+        verbose_name_plural = _('catalog imports')
+
+class CityCell(models.Model):
+    """Module for totals of located cities in a quadkey cell, kept by database triggers on city."""
+
+    cell = models.CharField(_('cell'), max_length=SUMMARY_ZOOM, primary_key=True, db_collation='C')
+    count = models.IntegerField(_('count'), default=0)
+    latitude_sum = models.FloatField(_('latitude sum'), default=0)
+    longitude_sum = models.FloatField(_('longitude sum'), default=0)
+    population = models.BigIntegerField(_('population'), default=0)
+
+    def __str__(self) -> str:
+        """Returns a string representation of the object."""
+
+        return f'{self.cell}: {self.count}'
+
+    class Meta:
+        """Inner class metadata for abstract base classes."""
+
+        db_table = '"states"."city_cell"'
+        verbose_name = _('city cell')
+        verbose_name_plural = _('city cells')
+
+class CountryToFeast(UUIDMixin, CreatedMixin, ModifiedMixin):
     """Module for country with feast."""
 
     country = models.ForeignKey(Country, on_delete=models.CASCADE, verbose_name=_('country'))
@@ -200,6 +564,10 @@ class CountryToFeast(UUIDMixin, CreatedMixin):
         unique_together = (
             ('country', 'feast'),
         )
+        indexes = (
+            models.Index(fields=('feast', 'country'), name='country_to_feast_feast_idx'),
+            models.Index(fields=('modified', 'id'), name='country_to_feast_modified_idx'),
+        )
         verbose_name = _('Relationship country feast')
         verbose_name_plural = _('Relationships country feast')
 
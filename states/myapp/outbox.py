@@ -0,0 +1,71 @@
+"""Module for the transactional outbox of catalog changes."""
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+from .caching import invalidate
+from .counters import table_name
+from .models import OutboxEvent
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+
+
+def get_handlers(names=None) -> list:
+    """Imports the handlers named by dotted paths, OUTBOX_HANDLERS by default."""
+    return [import_string(name) for name in (settings.OUTBOX_HANDLERS if names is None else names)]
+
+def invalidate_caches(events: list) -> None:
+    """Drops cached responses of the models changed by events, including writes which skip signals."""
+    models = {table_name(model): model for model in apps.get_app_config('myapp').get_models()}
+    invalidate(*{models[event.table] for event in events if event.table in models})
+
+def handle(handlers: list, events: list) -> None:
+    """Passes events to every handler in a savepoint, so a failure rolls back the writes of all of them."""
+    with transaction.atomic():
+        for handler in handlers:
+            handler(events)
+
+def consume(handlers: list, size: int = BATCH_SIZE) -> tuple[int, int]:
+    """
+    Passes the oldest batch of pending events to every handler and deletes the handled ones.
+
+    Events are locked with FOR UPDATE SKIP LOCKED, so concurrent consumers
+    take different batches and never process an event twice, while a batch
+    of a consumer which dies is unlocked and taken again. Handlers get events
+    of a batch in the order they were written, but batches of concurrent
+    consumers may finish in any order. When a handler fails on a batch, its
+    events are passed again one at a time, so only the failing events are
+    kept with their attempts counted and the error stored, and after
+    MAX_ATTEMPTS failures they are left for inspection.
+
+    Returns:
+        tuple: numbers of handled and failed events
+    """
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(attempts__lt=MAX_ATTEMPTS).order_by('id')[:size]
+        )
+        if not events:
+            return 0, 0
+        try:
+            handle(handlers, events)
+        except Exception:
+            handled, failed = [], 0
+            for event in events:
+                try:
+                    handle(handlers, [event])
+                except Exception as error:
+                    OutboxEvent.objects.filter(pk=event.pk).update(
+                        attempts=F('attempts') + 1, error=f'{type(error).__name__}: {error}',
+                    )
+                    failed += 1
+                else:
+                    handled.append(event)
+        else:
+            handled, failed = events, 0
+        OutboxEvent.objects.filter(id__in=[event.id for event in handled]).delete()
+        return len(handled), failed
@@ -0,0 +1,275 @@
+"""Module for pagination."""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from typing import Any
+from uuid import UUID
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+ORDERING_PARAM = 'ordering'
+DEFAULT_ORDERING = ('created', 'pk')
+KEYSET_PARAMS = frozenset(('after', 'before'))
+
+
+def encode_cursor(value, id_) -> str:
+    """Encode a (value, id) keyset position into an opaque url-safe token."""
+    value = value.isoformat() if hasattr(value, 'isoformat') else value
+    position = {'c': value, 'i': str(id_)}
+    return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_cursor(token: str, field=None) -> tuple:
+    """Decode a token made by encode_cursor.
+
+    Args:
+        token (str): cursor token
+        field (Field): model field of the position value, `created` when not given
+
+    Raises:
+        ValueError: malformed token
+
+    Returns:
+        tuple: value (or None) and id of the last seen row
+    """
+    try:
+        position = json.loads(urlsafe_b64decode(token.encode()))
+        if field is None:
+            value = parse_datetime(position['c']) if position['c'] else None
+        else:
+            value = field.to_python(position['c'])
+        return value, UUID(position['i'])
+    except (BinasciiError, TypeError, KeyError, AttributeError, json.JSONDecodeError, DjangoValidationError) as error:
+        raise ValueError('Invalid cursor.') from error
+
+def row_value(row, field: str) -> Any:
+    """Read a field, possibly of related objects like `stats__city_count`, from an instance or a .values() row."""
+    if isinstance(row, dict):
+        return row[field]
+    for name in field.split('__'):
+        row = getattr(row, name)
+    return row
+
+def lookup_field(model, lookup: str):
+    """Returns the model field a lookup like `stats__city_count` ends at."""
+    *relations, name = lookup.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+def parse_ordering(value: str, fields: dict) -> list:
+    """
+    Converts an `ordering` value like "-city_count" to the lookups of a sortable field.
+
+    The primary key in the same direction breaks ties, so the order is stable
+    and served by indexes on (field, pk).
+
+    Raises:
+        ValueError: the value is not a sortable field
+
+    Returns:
+        list: order_by arguments
+    """
+    name = value.removeprefix('-')
+    if name not in fields:
+        raise ValueError(f"Ordering is possible by {', '.join(fields)}.")
+    prefix = '-' if value.startswith('-') else ''
+    return [f'{prefix}{fields[name]}', f'{prefix}pk']
+
+def keyset_segments(queryset, field: str, cursor=None, descending: bool = False) -> list:
+    """
+    Split a queryset into ordered segments following the cursor position.
+
+    Rows are ordered by (field, pk) in one direction with NULL values last in
+    ascending and first in descending order, as PostgreSQL sorts them. Every
+    segment is a plain range over a (field, pk) index, so reading a page costs
+    the same however far the cursor is from the start.
+    """
+    prefix, start, seen = ('-', 'lte', 'gte') if descending else ('', 'gte', 'lte')
+    dated = queryset.filter(**{f'{field}__isnull': False}).order_by(f'{prefix}{field}', f'{prefix}pk')
+    nulls = queryset.filter(**{f'{field}__isnull': True}).order_by(f'{prefix}pk')
+    if cursor is None:
+        return [nulls, dated] if descending else [dated, nulls]
+    value, id_ = cursor
+    if value is None:
+        nulls = nulls.exclude(**{f'pk__{seen}': id_})
+        return [nulls, dated] if descending else [nulls]
+    dated = dated.filter(**{f'{field}__{start}': value}).exclude(**{field: value, f'pk__{seen}': id_})
+    return [dated] if descending else [dated, nulls]
+
+def keyset_querysets(queryset, cursor=None) -> list:
+    """Split a queryset into segments ordered by ('created', 'id') following the cursor position."""
+    return keyset_segments(queryset, 'created', cursor)
+
+def keyset_page(segments, size: int) -> tuple[list, bool]:
+    """Fetch up to size rows from ordered segments and tell if there are more."""
+    rows = []
+    for segment in segments:
+        rows.extend(segment[:size + 1 - len(rows)])
+        if len(rows) > size:
+            return rows[:size], True
+    return rows, False
+
+def keyset_window(
+    queryset, ordering, size: int, after: str = None, before: str = None, key: str = None,
+) -> tuple[list, str, str]:
+    """
+    Fetch a page of rows around a cursor of a list ordered by (field, pk).
+
+    Rows after the `after` cursor are read forwards, rows before the `before`
+    cursor backwards and reversed. Without cursors the page starts the list.
+
+    Args:
+        queryset (QuerySet): rows to paginate
+        ordering (list): order_by arguments like ['-stats__city_count', '-pk']
+        size (int): number of rows per page
+        after (str): cursor of the row the page follows
+        before (str): cursor of the row the page precedes
+        key (str): name of the ordering value in .values() rows, the lookup by default
+
+    Raises:
+        ValueError: malformed cursor
+
+    Returns:
+        tuple: rows, and cursors of the previous and the next page (None at the ends)
+    """
+    lookup = ordering[0].removeprefix('-')
+    descending = ordering[0].startswith('-')
+    field = lookup_field(queryset.model, lookup)
+    backwards = bool(before) and not after
+    token = before if backwards else after
+    cursor = decode_cursor(token, field) if token else None
+    segments = keyset_segments(queryset, lookup, cursor, descending != backwards)
+    rows, more = keyset_page(segments, size)
+    if backwards:
+        rows.reverse()
+    has_previous, has_next = (more, True) if backwards else (cursor is not None, more)
+    pk = queryset.model._meta.pk.name
+    tokens = [
+        encode_cursor(row_value(row, key or lookup if isinstance(row, dict) else lookup), row_value(row, pk))
+        for row in (rows[:1] + rows[-1:])
+    ] if rows else [None, None]
+    return rows, tokens[0] if has_previous else None, tokens[-1] if has_next else None
+
+
+class CountedPaginator(Paginator):
+    """Paginator which reads the total number of rows from a counter instead of counting them."""
+
+    def __init__(self, object_list, per_page, *args, counter=None, **kwargs) -> None:
+        """Initializes the paginator with an optional callable returning the number of rows."""
+        super().__init__(object_list, per_page, *args, **kwargs)
+        self.counter = counter
+
+    @cached_property
+    def count(self) -> int:
+        """Returns the number of rows given by the counter."""
+        if self.counter is None:
+            return super().count
+        return self.counter()
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in cursor pagination over the ('created', 'id') index.
+
+    Responses are paginated only when a client passes `cursor` or `page_size`,
+    so the unpaginated list stays available to existing clients. Lists sorted
+    by OrderingFilter are paged over their (field, pk) order instead. Querysets
+    already limited by a filter, like ranked search results, are left as is.
+    """
+
+    ordering = ('created', 'id')
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self) -> None:
+        """Initializes the state of a single paginated request."""
+        self.request = None
+        self.next_cursor = None
+
+    def get_page_size(self, request) -> int:
+        """Returns the requested page size capped by max_page_size."""
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Returns a page of rows after the requested cursor or None if not opted in."""
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        if queryset.query.is_sliced:
+            return None
+        self.request = request
+        if queryset.query.order_by:
+            return self.paginate_sorted(queryset, request)
+        cursor = None
+        if params.get(self.cursor_query_param):
+            try:
+                cursor = decode_cursor(params[self.cursor_query_param])
+            except ValueError as error:
+                raise NotFound(str(error)) from error
+        rows, has_next = keyset_page(keyset_querysets(queryset, cursor), self.get_page_size(request))
+        if has_next:
+            last = rows[-1]
+            self.next_cursor = encode_cursor(row_value(last, 'created'), row_value(last, 'id'))
+        return rows
+
+    def paginate_sorted(self, queryset, request) -> list:
+        """Returns a page of a list sorted by the `ordering` parameter after the requested cursor."""
+        try:
+            rows, _, self.next_cursor = keyset_window(
+                queryset, queryset.query.order_by, self.get_page_size(request),
+                after=request.query_params.get(self.cursor_query_param),
+                key=request.query_params.get(ORDERING_PARAM, '').removeprefix('-'),
+            )
+        except ValueError as error:
+            raise NotFound(str(error)) from error
+        return rows
+
+    def get_next_link(self):
+        """Returns the absolute url of the next page or None on the last page."""
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        """Wraps page data with the next link and the raw next cursor token."""
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
+
+
+class OrderingFilter(BaseFilterBackend):
+    """
+    Sorts lists by the `ordering` query parameter over the ordering_fields of the view.
+
+    ordering_fields maps the public names to lookups. KeysetPagination pages
+    sorted lists by the sorting field, and without `cursor` or `page_size`
+    all rows are returned.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        """Returns the sorted queryset for list requests."""
+        value = request.query_params.get(ORDERING_PARAM)
+        if not value or view.action != 'list' or queryset.query.is_sliced:
+            return queryset
+        try:
+            queryset = queryset.order_by(*parse_ordering(value, getattr(view, 'ordering_fields', {})))
+        except ValueError as error:
+            raise ValidationError({ORDERING_PARAM: str(error)}) from error
+        return queryset
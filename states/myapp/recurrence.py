@@ -0,0 +1,134 @@
+"""Module for expanding feast recurrence rules into occurrences."""
+
+from calendar import monthrange
+from datetime import date, timedelta
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from .caching import invalidate
+from .models import Feast, FeastOccurrence, Recurrence
+
+HORIZON_DAYS = 730
+BATCH_SIZE = 1000
+
+INSERT_SQL = '''
+    INSERT INTO states.feast_occurrence (feast_id, date)
+    SELECT * FROM unnest(%s::uuid[], %s::date[])
+    ON CONFLICT DO NOTHING
+'''
+
+
+def get_window(today: date = None, days: int = HORIZON_DAYS) -> tuple[date, date]:
+    """
+    Returns the days recurring feasts are expanded over.
+
+    The window starts on January 1 of the current year, so the whole current
+    calendar year stays queryable, and ends `days` ahead.
+    """
+    today = today or timezone.localdate()
+    return date(today.year, 1, 1), today + timedelta(days=days)
+
+def nth_weekday(year: int, month: int, weekday: int, week: int):
+    """
+    Returns the week-th weekday of a month, counting from the end for negative weeks.
+
+    Returns:
+        date | None: the day or None if the month has no such day
+    """
+    days = monthrange(year, month)[1]
+    if week > 0:
+        day = 1 + (weekday - date(year, month, 1).weekday()) % 7 + (week - 1) * 7
+    else:
+        day = days - (date(year, month, days).weekday() - weekday) % 7 + (week + 1) * 7
+    return date(year, month, day) if 1 <= day <= days else None
+
+def yearly_date(year: int, month: int, day: int) -> date:
+    """Returns the day of a year, moving February 29 to February 28 in common years."""
+    return date(year, month, min(day, monthrange(year, month)[1]))
+
+def occurrence_dates(feast, start: date, end: date) -> list[date]:
+    """
+    Returns the days between start and end, both including, the feast is celebrated on.
+
+    Recurring feasts with a date_of_feast are not celebrated before that date.
+    """
+    origin = Feast._meta.get_field('date_of_feast').to_python(feast.date_of_feast)
+    if feast.recurrence == Recurrence.NONE:
+        return [origin] if origin is not None and start <= origin <= end else []
+    if origin is not None:
+        start = max(start, origin)
+    days = []
+    for year in range(start.year, end.year + 1):
+        if feast.recurrence == Recurrence.YEARLY:
+            day = yearly_date(year, origin.month, origin.day)
+        else:
+            day = nth_weekday(year, feast.recurrence_month, feast.recurrence_weekday, feast.recurrence_week)
+        if day is not None and start <= day <= end:
+            days.append(day)
+    return days
+
+def refresh_occurrences(feasts, window: tuple[date, date] = None) -> int:
+    """
+    Replaces occurrences of changed feasts.
+
+    One-off feasts get their single date whatever the window. Recurring feasts
+    are expanded over the window and keep their occurrences before it.
+
+    Returns:
+        int: number of created occurrences
+    """
+    start, end = window or get_window()
+    feasts = list(feasts)
+    once = {feast.pk for feast in feasts if feast.recurrence == Recurrence.NONE}
+    repeated = {feast.pk for feast in feasts if feast.recurrence != Recurrence.NONE}
+    occurrences = [
+        FeastOccurrence(feast=feast, date=day)
+        for feast in feasts
+        for day in occurrence_dates(feast, date.min if feast.pk in once else start, end)
+    ]
+    with transaction.atomic():
+        FeastOccurrence.objects.filter(Q(feast__in=once) | Q(feast__in=repeated, date__gte=start)).delete()
+        FeastOccurrence.objects.bulk_create(occurrences, batch_size=BATCH_SIZE)
+        invalidate(FeastOccurrence)
+    return len(occurrences)
+
+def insert_occurrences(rows: list[tuple]) -> int:
+    """
+    Inserts (feast id, day) occurrences, skipping existing ones.
+
+    Returns:
+        int: number of inserted occurrences
+    """
+    if not rows:
+        return 0
+    feast_ids, days = zip(*rows)
+    with connection.cursor() as cursor:
+        cursor.execute(INSERT_SQL, [list(feast_ids), list(days)])
+        return cursor.rowcount
+
+def extend_occurrences(window: tuple[date, date] = None, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Expands recurring feasts up to the end of the window.
+
+    Only the days after the last stored occurrence of every feast are
+    expanded, so a daily run inserts just the few days the window moved by.
+    Feasts are read and written in batches of batch_size.
+
+    Returns:
+        int: number of inserted occurrences, existing ones are skipped
+    """
+    start, end = window or get_window()
+    feasts = Feast.objects.exclude(recurrence=Recurrence.NONE).annotate(
+        last_occurrence=Max('occurrences__date'),
+    ).order_by('pk')
+    created, batch = 0, []
+    for feast in feasts.iterator(chunk_size=batch_size):
+        first = start if feast.last_occurrence is None else max(start, feast.last_occurrence + timedelta(days=1))
+        batch.extend((feast.pk, day) for day in occurrence_dates(feast, first, end))
+        if len(batch) >= batch_size:
+            created += insert_occurrences(batch)
+            batch = []
+    created += insert_occurrences(batch)
+    if created:
+        invalidate(FeastOccurrence)
+    return created
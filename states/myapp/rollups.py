@@ -0,0 +1,51 @@
+"""Module for per-country rollups."""
+
+from django.db import connection, transaction
+from .caching import invalidate
+from .models import Country, CountryStats
+
+RECONCILE_SQL = '''
+    INSERT INTO states.country_stats AS stats
+        (country_id, city_count, city_population, city_area, feast_count, updated)
+    SELECT
+        country.id, coalesce(cities.city_count, 0), coalesce(cities.city_population, 0),
+        coalesce(cities.city_area, 0), coalesce(feasts.feast_count, 0), now()
+    FROM states.country
+    LEFT JOIN (
+        SELECT country_id, count(*) AS city_count, sum(population) AS city_population, sum(area_city) AS city_area
+        FROM states.city GROUP BY 1
+    ) cities ON cities.country_id = country.id
+    LEFT JOIN (
+        SELECT country_id, count(*) AS feast_count FROM states.country_to_feast GROUP BY 1
+    ) feasts ON feasts.country_id = country.id
+    ON CONFLICT (country_id) DO UPDATE SET
+        city_count = excluded.city_count,
+        city_population = excluded.city_population,
+        city_area = excluded.city_area,
+        feast_count = excluded.feast_count,
+        updated = excluded.updated
+    WHERE (stats.city_count, stats.city_population, stats.city_area, stats.feast_count)
+        IS DISTINCT FROM (excluded.city_count, excluded.city_population, excluded.city_area, excluded.feast_count)
+    RETURNING stats.country_id
+'''
+
+
+def reconcile() -> list:
+    """
+    Recomputes country rollups from cities and feast links and fixes the drifted ones.
+
+    Triggers keep rollups exact, so drift only comes from writes made with the
+    triggers disabled, like restores of partial dumps. Writes to cities and
+    links are blocked while the totals are recomputed, so no concurrent change
+    is lost between reading and storing them.
+
+    Returns:
+        list: ids of the countries whose rollups were missing or wrong
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('LOCK TABLE states.city, states.country_to_feast IN SHARE MODE')
+        cursor.execute(RECONCILE_SQL)
+        fixed = [row[0] for row in cursor.fetchall()]
+        if fixed:
+            invalidate(Country, CountryStats)
+    return fixed
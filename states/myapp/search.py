@@ -0,0 +1,84 @@
+"""Module for trigram name search and full-text search."""
+
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, SearchVectorField, TrigramSimilarity, TrigramWordSimilarity,
+)
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Upper
+from rest_framework.filters import BaseFilterBackend
+
+SEARCH_PARAM = 'q'
+SEARCH_LIMIT = 100
+SEARCH_CONFIGS = {'en': 'english', 'ru': 'russian'}
+HIGHLIGHT = {'start_sel': '<mark>', 'stop_sel': '</mark>'}
+
+
+def get_search_limit(request) -> int:
+    """Returns the number of matches to return: `page_size` capped by SEARCH_LIMIT."""
+    try:
+        return min(max(int(request.query_params['page_size']), 1), SEARCH_LIMIT)
+    except (KeyError, ValueError):
+        return SEARCH_LIMIT
+
+def search(queryset, query: str, field: str = 'name'):
+    """
+    Filters rows whose field contains the query or is similar to it, best matches first.
+
+    Matching is case-insensitive: substrings match with icontains and misspelled
+    words with the pg_trgm word similarity operator. Both filters run on
+    UPPER(field), the expression of the trigram GIN indexes of the models.
+    Rows are ranked by word similarity and then by similarity of the whole value.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+    return queryset.alias(
+        search_value=Upper(field),
+    ).filter(
+        Q(**{f'{field}__icontains': query}) | Q(search_value__trigram_word_similar=query.upper()),
+    ).annotate(
+        word_similarity=TrigramWordSimilarity(query, field),
+        similarity=TrigramSimilarity(field, query),
+    ).order_by('-word_similarity', '-similarity', 'pk')
+
+def full_text_search(queryset, query: str, language: str):
+    """
+    Filters rows matching a web search style query, most relevant first.
+
+    The query is stemmed with the text search configuration of the language and
+    matched against the generated `search_<language>` column of the table, kept
+    in sync by the database and indexed with GIN. Matches get a rank and title
+    and description snippets with the found words wrapped in <mark> tags.
+    """
+    config = SEARCH_CONFIGS[language]
+    search_query = SearchQuery(query, config=config, search_type='websearch')
+    vector = RawSQL(f'{queryset.model._meta.db_table}.search_{language}', [], output_field=SearchVectorField())
+    return queryset.alias(
+        search_vector=vector,
+    ).filter(
+        search_vector=search_query,
+    ).annotate(
+        rank=SearchRank(F('search_vector'), search_query),
+        title_headline=SearchHeadline('title', search_query, config=config, **HIGHLIGHT),
+        description_headline=SearchHeadline(
+            'description', search_query, config=config, max_fragments=2, **HIGHLIGHT,
+        ),
+    ).order_by('-rank', 'pk')
+
+
+class TrigramSearchFilter(BaseFilterBackend):
+    """
+    Searches lists by the `q` query parameter on the search_field of the view.
+
+    Ranked results are not keyset-paginated: a search returns the best
+    `page_size` matches, at most SEARCH_LIMIT.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        """Returns the best matches of the query for list requests."""
+        query = request.query_params.get(SEARCH_PARAM, '')
+        field = getattr(view, 'search_field', None)
+        if field is None or view.action != 'list' or not query.strip():
+            return queryset
+        return search(queryset, query, field)[:get_search_limit(request)]
@@ -1,10 +1,34 @@
 """Module for serializers."""
 
-from rest_framework.serializers import HyperlinkedModelSerializer
-from .models import Country, Feast, City
+from datetime import date, datetime
+from uuid import UUID
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework.serializers import (
+    BaseSerializer, HyperlinkedModelSerializer, IntegerField, ModelSerializer, ValidationError,
+)
+from .models import ROLLUP_FIELDS, Country, Feast, City, Job
 
-class CountrySerializer(HyperlinkedModelSerializer):
-    """Serializer for the Country model."""
+class SparseFieldsMixin:
+    """Serializer mixin that keeps only the fields given in the `fields` argument."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        """Drops the fields which are not requested."""
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+class CountrySerializer(SparseFieldsMixin, HyperlinkedModelSerializer):
+    """Serializer for the Country model with the read-only rollups of its cities and feasts."""
+
+    city_count = IntegerField(source='stats.city_count', read_only=True)
+    city_population = IntegerField(source='stats.city_population', read_only=True)
+    city_area = IntegerField(source='stats.city_area', read_only=True)
+    feast_count = IntegerField(source='stats.feast_count', read_only=True)
 
     class Meta:
         """Settings for country serializer."""
@@ -12,7 +36,7 @@ class CountrySerializer(HyperlinkedModelSerializer):
         model = Country
         fields = '__all__'
 
-class FeastSerializer(HyperlinkedModelSerializer):
+class FeastSerializer(SparseFieldsMixin, HyperlinkedModelSerializer):
     """Serializer for the Feast model."""
 
     class Meta:
@@ -21,7 +45,19 @@ class FeastSerializer(HyperlinkedModelSerializer):
         model = Feast
         fields = '__all__'
 
-class CitySerializer(HyperlinkedModelSerializer):
+    def validate(self, attrs):
+        """Checks the recurrence rule with the model validation."""
+        values = {
+            name: attrs.get(name, getattr(self.instance, name, None))
+            for name in ('date_of_feast', 'recurrence', 'recurrence_month', 'recurrence_weekday', 'recurrence_week')
+        }
+        try:
+            Feast(**{name: value for name, value in values.items() if value is not None}).clean()
+        except DjangoValidationError as error:
+            raise ValidationError(error.message_dict) from error
+        return attrs
+
+class CitySerializer(SparseFieldsMixin, HyperlinkedModelSerializer):
     """Serializer for the City model."""
 
     class Meta:
@@ -29,3 +65,117 @@ class CitySerializer(HyperlinkedModelSerializer):
 
         model = City
         fields = '__all__'
+
+
+def to_primitive(value):
+    """Converts a database value to a JSON-ready primitive."""
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, list):
+        return [to_primitive(item) for item in value]
+    return value
+
+class FlatSerializer(BaseSerializer):
+    """
+    Read-only serializer for .values() rows.
+
+    Related objects are emitted as plain ids and no model instances are built,
+    which makes it much cheaper than the hyperlinked serializers on large lists.
+    """
+
+    value_fields = ()
+    annotations = {}
+
+    def __init__(self, *args, **kwargs) -> None:
+        """Keeps the names of the requested fields, all fields are emitted by default."""
+        self.only = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def get_field_names(cls) -> list:
+        """Returns the names of all fields this serializer can emit."""
+        return [*cls.value_fields, *cls.annotations]
+
+    @classmethod
+    def get_values(cls, queryset, fields=None):
+        """Narrows a queryset to the rows this serializer reads, optionally only to the given fields."""
+        if fields is None:
+            return queryset.values(*cls.value_fields, **cls.annotations)
+        return queryset.values(
+            *(name for name in cls.value_fields if name in fields),
+            **{name: value for name, value in cls.annotations.items() if name in fields},
+        )
+
+    def to_representation(self, instance):
+        """Converts a .values() row to a dict of primitives."""
+        if self.only is None:
+            return {key: to_primitive(value) for key, value in instance.items()}
+        return {key: to_primitive(instance[key]) for key in self.only}
+
+class CountryFlatSerializer(FlatSerializer):
+    """Flat serializer for the Country model."""
+
+    value_fields = ('id', 'created', 'modified', 'name', 'population', 'area_country', 'hymn')
+    annotations = {name: F(f'stats__{name}') for name in ROLLUP_FIELDS}
+
+class FeastFlatSerializer(FlatSerializer):
+    """Flat serializer for the Feast model."""
+
+    value_fields = (
+        'id', 'created', 'modified', 'title', 'date_of_feast', 'description',
+        'recurrence', 'recurrence_month', 'recurrence_weekday', 'recurrence_week',
+    )
+    annotations = {
+        'country_ids': ArrayAgg('countries__id', filter=Q(countries__isnull=False), default=[]),
+    }
+
+class CityFlatSerializer(FlatSerializer):
+    """Flat serializer for the City model."""
+
+    value_fields = (
+        'id', 'created', 'modified', 'country', 'name', 'population', 'coordinates', 'area_city',
+        'latitude', 'longitude',
+    )
+
+class CountryToFeastFlatSerializer(FlatSerializer):
+    """Flat serializer for the CountryToFeast model."""
+
+    value_fields = ('id', 'created', 'modified', 'country', 'feast')
+
+class JobSerializer(ModelSerializer):
+    """
+    Serializer for background jobs, of which clients set the type, arguments and start time.
+
+    Arguments, results and errors may hold paths and data of the server, so
+    they are only shown to superusers.
+    """
+
+    private_fields = ('args', 'result', 'error')
+
+    class Meta:
+        """Inner class metadata for the serializer."""
+
+        model = Job
+        fields = (
+            'id', 'type', 'args', 'status', 'attempts', 'run_at', 'created', 'started', 'finished', 'result', 'error',
+        )
+        read_only_fields = ('status', 'attempts', 'created', 'started', 'finished', 'result', 'error')
+
+    def to_representation(self, instance):
+        """Drops the private fields unless the request is made by a superuser."""
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        if request is None or not request.user.is_superuser:
+            for name in self.private_fields:
+                data.pop(name)
+        return data
+
+    def validate_args(self, value) -> dict:
+        """Checks the arguments are an object of keyword arguments."""
+        if not isinstance(value, dict):
+            raise ValidationError('Expected an object.')
+        return value
@@ -0,0 +1,48 @@
+"""Module for signal receivers."""
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import CachedTokenAuthentication
+from .bulk import bulk_saved
+from .caching import invalidate
+from .models import Country, Feast, City, CountryToFeast
+from .recurrence import refresh_occurrences
+
+CACHED_MODELS = (Country, Feast, City, CountryToFeast)
+
+
+@receiver(post_delete, sender=Token)
+def drop_deleted_token(sender, instance, **kwargs):
+    """Drops a deleted token from the authentication caches."""
+    CachedTokenAuthentication.invalidate([instance.key])
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def drop_user_tokens(sender, instance, **kwargs):
+    """Drops tokens of a saved user, for example a deactivated one, from the authentication caches."""
+    CachedTokenAuthentication.invalidate(Token.objects.filter(user=instance).values_list('key', flat=True))
+
+def drop_cached_responses(sender, **kwargs):
+    """Drops cached API responses of a saved or deleted catalog model."""
+    invalidate(sender)
+
+for model in CACHED_MODELS:
+    post_save.connect(drop_cached_responses, sender=model, dispatch_uid=f'cache:save:{model._meta.label}')
+    post_delete.connect(drop_cached_responses, sender=model, dispatch_uid=f'cache:delete:{model._meta.label}')
+
+@receiver(m2m_changed, sender=Feast.countries.through)
+def drop_cached_links(sender, action, **kwargs):
+    """Drops cached API responses when feasts and countries are linked or unlinked in bulk."""
+    if action.startswith('post_'):
+        invalidate(sender)
+
+@receiver(post_save, sender=Feast)
+def expand_saved_feast(sender, instance, **kwargs):
+    """Replaces the occurrences of a saved feast."""
+    refresh_occurrences([instance])
+
+@receiver(bulk_saved, sender=Feast)
+def expand_bulk_feasts(sender, instances, **kwargs):
+    """Replaces the occurrences of feasts written in bulk."""
+    refresh_occurrences(instances)
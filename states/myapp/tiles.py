@@ -0,0 +1,83 @@
+"""Module for clustered city map tiles."""
+
+from django.db.models import Avg, Count, F, FloatField, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Left
+from rest_framework.exceptions import ValidationError
+from .geo import LOCATED, MAX_ZOOM, SUMMARY_ZOOM, tile_quadkey
+from .models import City, CityCell
+
+CELL_DEPTH = 3
+# Digits of quadkeys are 0 to 3, so every key starting with a prefix sorts before prefix + '4'.
+PREFIX_END = '4'
+
+
+def parse_tile(zoom, x, y) -> tuple[int, int, int]:
+    """Reads the zoom level and the x and y numbers of a tile from the URL."""
+    zoom, x, y = int(zoom), int(x), int(y)
+    if zoom > MAX_ZOOM:
+        raise ValidationError({'z': f'The zoom level must not be above {MAX_ZOOM}.'})
+    if x >= 1 << zoom or y >= 1 << zoom:
+        raise ValidationError({'x': f'Tile numbers must be below {1 << zoom} at zoom level {zoom}.'})
+    return zoom, x, y
+
+def get_city_clusters(prefix: str, depth: int):
+    """Groups located cities with quadkeys starting with the prefix by their first depth digits."""
+    return City.objects.filter(
+        LOCATED, quadkey__gte=prefix, quadkey__lt=prefix + PREFIX_END,
+    ).values(
+        cell=Left('quadkey', depth),
+    ).annotate(
+        count=Count('pk'),
+        latitude=Avg('latitude'),
+        longitude=Avg('longitude'),
+        population=Coalesce(Sum('population'), Value(0)),
+    )
+
+def get_summary_clusters(prefix: str, depth: int):
+    """Groups the city cells with quadkeys starting with the prefix by their first depth digits."""
+    total = Cast(Sum('count'), FloatField())
+    return CityCell.objects.filter(
+        count__gt=0, cell__gte=prefix, cell__lt=prefix + PREFIX_END,
+    ).values(
+        group=Left('cell', depth),
+    ).annotate(
+        total=Sum('count'),
+        latitude=Sum('latitude_sum') / total,
+        longitude=Sum('longitude_sum') / total,
+        population=Sum('population'),
+    ).values('latitude', 'longitude', 'population', cell=F('group'), count=F('total'))
+
+def get_tile(zoom: int, x: int, y: int) -> dict:
+    """
+    Returns clusters of the located cities of a tile.
+
+    The tile is split into a grid of 2^CELL_DEPTH cells per side, and every
+    cell with cities becomes a cluster with the number of cities, their
+    centroid and summed population. The quadkey of a tile is the prefix of the
+    quadkeys of its cities, so clusters are a range scan grouped by a longer
+    prefix. Low zoom grids are summed from the few thousand city cells kept by
+    triggers instead of the whole city table.
+
+    Returns:
+        dict: tile numbers and clusters ordered by cell quadkey
+    """
+    prefix, depth = tile_quadkey(zoom, x, y), min(zoom + CELL_DEPTH, MAX_ZOOM)
+    if depth <= SUMMARY_ZOOM:
+        clusters = get_summary_clusters(prefix, depth)
+    else:
+        clusters = get_city_clusters(prefix, depth)
+    return {
+        'z': zoom,
+        'x': x,
+        'y': y,
+        'clusters': [
+            {
+                'cell': cluster['cell'],
+                'count': cluster['count'],
+                'latitude': round(cluster['latitude'], 6),
+                'longitude': round(cluster['longitude'], 6),
+                'population': cluster['population'],
+            }
+            for cluster in clusters.order_by('cell')
+        ],
+    }
@@ -8,6 +8,7 @@ router = routers.DefaultRouter()
 router.register(r'countries', views.CountryViewSet)
 router.register(r'feasts', views.FeastViewSet)
 router.register(r'cities', views.CityViewSet)
+router.register(r'jobs', views.JobViewSet)
 
 urlpatterns = [
     path('', views.home_page, name='homepage'),
@@ -19,6 +20,15 @@ urlpatterns = [
     path('city/', views.view_city, name='city'),
     path('accounts/', include('django.contrib.auth.urls')),
     path('register/', views.register, name='register'),
+    path('api/async/countries/', views.country_list_async, name='countries-async'),
+    path('api/async/countries/<str:pk>/', views.country_detail_async, name='country-async'),
+    path('api/async/feasts/', views.feast_list_async, name='feasts-async'),
+    path('api/async/feasts/<str:pk>/', views.feast_detail_async, name='feast-async'),
+    path('api/async/cities/', views.city_list_async, name='cities-async'),
+    path('api/async/cities/<str:pk>/', views.city_detail_async, name='city-async'),
+    path('api/export/<slug:dataset>.<slug:fmt>', views.ExportView.as_view(), name='export'),
+    path('api/changes/<slug:dataset>/', views.ChangesView.as_view(), name='changes'),
+    path('api/cache-stats/', views.CacheStatsView.as_view(), name='cache-stats'),
     path('api/', include(router.urls), name='api'),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
     path('profile/', views.profile, name='profile'),
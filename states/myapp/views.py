@@ -1,30 +1,66 @@
 """Module for views."""
 
 from typing import Any
-from rest_framework import viewsets, permissions, authentication
+from functools import cached_property
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.conf import settings
+from django.db.models import Prefetch
+from django.db.models.functions import Greatest
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.views.generic import ListView
-from django.core import paginator as django_paginator, exceptions
+from django.core import exceptions
 from django.contrib.auth import decorators, mixins
-from .models import Country, Feast, City, Client
-from .serializers import CountrySerializer, FeastSerializer, CitySerializer
+from django.utils.translation import get_language
+from .models import ROLLUP_FIELDS, Country, Feast, City, Client, CountryToFeast, FeastOccurrence, Job, JobStatus
+from . import bulk
+from .serializers import (
+    CountrySerializer, FeastSerializer, CitySerializer,
+    CountryFlatSerializer, FeastFlatSerializer, CityFlatSerializer, JobSerializer,
+)
 from .forms import RegistrationForm
+from .export import CONTENT_TYPES, DATASETS, export_stream
+from .jobs import JOB_TYPES, MAX_PAGE_SIZE as MAX_JOBS_PAGE_SIZE, PAGE_SIZE as JOBS_PAGE_SIZE, enqueue
+from .changes import MAX_PAGE_SIZE as MAX_CHANGES_PAGE_SIZE, PAGE_SIZE as CHANGES_PAGE_SIZE, get_changes
+from .pagination import (
+    DEFAULT_ORDERING, KEYSET_PARAMS, ORDERING_PARAM, CountedPaginator, KeysetPagination, OrderingFilter,
+    decode_cursor, keyset_window, parse_ordering,
+)
+from .conditional import ConditionalMixin
+from .caching import CachedResponseMixin, cached_count, get_fragment_keys, get_stats
+from .search import (
+    SEARCH_CONFIGS, SEARCH_PARAM, TrigramSearchFilter, full_text_search, get_search_limit, search,
+)
+from .authentication import CachedTokenAuthentication
+from .async_api import create_async_api
+from .counters import get_counts
+from .feast_calendar import get_calendar, parse_countries, parse_range
+from .tiles import get_tile, parse_tile
+from . import geo
 
 
 def home_page(request):
-    """Home page."""
-
+    """Home page with the row counts of the catalog tables read from the counters."""
+    counts = get_counts((Country, Feast, City), estimate=settings.COUNTS_ESTIMATED)
     return render(
         request,
         'index.html',
         {
-            'countries': Country.objects.count(),
-            'feasts': Feast.objects.count(),
-            'cities': City.objects.count(),
+            'countries': counts[Country],
+            'feasts': counts[Feast],
+            'cities': counts[City],
+            'estimated': settings.COUNTS_ESTIMATED,
         }
     )
 
-def create_listview(model_class, plural_name, template):
+def create_listview(
+    model_class, plural_name, template, search_field=None, base_queryset=None, ordering_fields=None, cache_models=(),
+):
     """
     Creates a custom ListView for Django with pagination and login requirement.
 
@@ -32,17 +68,79 @@ def create_listview(model_class, plural_name, template):
         model_class (type): The model class to be displayed in the view.
         plural_name (str): The plural name used in the template context.
         template (str): The template name to render the view.
+        search_field (str): The field searched by the `q` parameter, if any.
+        base_queryset (QuerySet): The rows to list instead of all instances, if given.
+        ordering_fields (dict): Lookups of the names the `ordering` parameter sorts by, if any.
+        cache_models (tuple): Other models the cached rows are rendered from.
         
     Returns:
         CustomListView: A subclass of Django's ListView with customizations.
     """
     class CustomListView(mixins.LoginRequiredMixin, ListView):
-        """A custom Django ListView with login requirement, pagination, and dynamic context data."""
+        """
+        A custom Django ListView with login requirement, pagination, and dynamic context data.
+
+        Rows are ordered by an indexed (field, pk) key, ('created', 'pk') unless
+        another is requested. Numbered pages take the total from the row
+        counters, or from the cache for searches, so a page runs one query
+        for its rows. `after` and `before` cursors switch to keyset pages,
+        which cost the same however deep they are.
+        """
 
         model = model_class
+        queryset = base_queryset
         template_name = template
         paginate_by = 10
+        paginator_class = CountedPaginator
         context_object_name = plural_name
+        keyset = None
+
+        def get_ordering(self):
+            """Returns the order_by arguments of a valid `ordering` parameter or the default ordering."""
+            try:
+                return parse_ordering(self.request.GET.get(ORDERING_PARAM, ''), ordering_fields or {})
+            except ValueError:
+                return list(DEFAULT_ORDERING)
+
+        def get_search_query(self) -> str:
+            """Returns the `q` search query, empty when the view is not searchable."""
+            return self.request.GET.get(SEARCH_PARAM, '').strip() if search_field else ''
+
+        def get_queryset(self):
+            """Returns the instances matching the `q` search, best matches first, or in the requested order."""
+            queryset = super().get_queryset()
+            query = self.get_search_query()
+            return search(queryset, query, search_field) if query else queryset
+
+        def count(self, queryset) -> int:
+            """Returns the number of listed rows without counting the table."""
+            query = self.get_search_query()
+            if not query:
+                return get_counts((model_class,))[model_class]
+            return cached_count(queryset, (model_class,), self.request.path, query)
+
+        def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+            """Builds a paginator which reads the total with count."""
+            return self.paginator_class(
+                queryset, per_page, orphans=orphans, allow_empty_first_page=allow_empty_first_page,
+                counter=lambda: self.count(queryset), **kwargs,
+            )
+
+        def paginate_queryset(self, queryset, page_size):
+            """Returns a keyset page when an `after` or `before` cursor is given and a numbered page otherwise."""
+            params = self.request.GET
+            if KEYSET_PARAMS.isdisjoint(params) or self.get_search_query():
+                paginator = self.get_paginator(queryset, page_size)
+                page = paginator.get_page(params.get(self.page_kwarg))
+                return paginator, page, page.object_list, page.has_other_pages()
+            try:
+                rows, previous, following = keyset_window(
+                    queryset, self.get_ordering(), page_size, params.get('after'), params.get('before'),
+                )
+            except ValueError as error:
+                raise Http404(str(error)) from error
+            self.keyset = {'previous': previous, 'next': following}
+            return None, None, rows, False
 
         def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
             """
@@ -50,15 +148,17 @@ def create_listview(model_class, plural_name, template):
             model instances in the context.
             """
             context = super().get_context_data(**kwargs)
-            instances = model_class.objects.all()
-            paginator = django_paginator.Paginator(instances, 10)
-            page = self.request.GET.get('page')
-            page_obj = paginator.get_page(page)
-            context[f'{plural_name}_list'] = page_obj
+            context['query'] = self.request.GET.get(SEARCH_PARAM, '') if search_field else ''
+            ordering = self.request.GET.get(ORDERING_PARAM, '')
+            context['ordering'] = ordering if ordering.removeprefix('-') in (ordering_fields or {}) else ''
+            context['keyset'] = self.keyset
+            context['fragments'] = get_fragment_keys(rows=(model_class, *cache_models))
+            page = context['page_obj']
+            context[f'{plural_name}_list'] = context['object_list'] if page is None else page
             return context
     return CustomListView
 
-def create_view(model, model_name, template, redirect_page):
+def create_view(model, model_name, template, redirect_page, base_queryset=None):
     """
     Creates a view function for displaying a single instance of a model.
     
@@ -74,6 +174,7 @@ def create_view(model, model_name, template, redirect_page):
         template (type): The path to the HTML template to use for rendering the view.
         redirect_page (type): The URL pattern name or callable to redirect
         to if the ID is not provided or the instance does not exist.
+        base_queryset (QuerySet): The rows to look the instance up in instead of all instances, if given.
     
     Returns:
         view: A view function that handles GET requests
@@ -86,7 +187,7 @@ def create_view(model, model_name, template, redirect_page):
         if not id_:
             return redirect(redirect_page)
         try:
-            target = model.objects.get(id=id_) if id_ else None
+            target = (model.objects.all() if base_queryset is None else base_queryset).get(id=id_) if id_ else None
         except exceptions.ValidationError:
             return redirect(redirect_page)
         if not target:
@@ -94,7 +195,10 @@ def create_view(model, model_name, template, redirect_page):
         if model_name == 'country':
             cities = City.objects.filter(country=target)
             feasts = Feast.objects.filter(countries=target)
-            context = {model_name: target, 'cities': cities, 'feasts': feasts}
+            context = {
+                model_name: target, 'cities': cities, 'feasts': feasts,
+                'fragments': get_fragment_keys(cities=(City,), feasts=(Feast, CountryToFeast)),
+            }
             return render(
                 request,
                 template,
@@ -117,13 +221,25 @@ def create_view(model, model_name, template, redirect_page):
             )
     return view
 
-view_country = create_view(Country, 'country', 'entities/country.html', 'countries')
+view_country = create_view(
+    Country, 'country', 'entities/country.html', 'countries', base_queryset=Country.objects.select_related('stats'),
+)
 view_feast = create_view(Feast, 'feast', 'entities/feast.html', 'feasts')
 view_city = create_view(City, 'city', 'entities/city.html', 'cities')
 
-CountryListView = create_listview(Country, 'countries', 'catalog/countries.html')
+COUNTRY_ORDERING = {'name': 'name', **{name: f'stats__{name}' for name in ROLLUP_FIELDS}}
+
+CountryListView = create_listview(
+    Country, 'countries', 'catalog/countries.html', search_field='name',
+    base_queryset=Country.objects.select_related('stats'), ordering_fields=COUNTRY_ORDERING,
+    cache_models=(City, CountryToFeast),
+)
 FeastListView = create_listview(Feast, 'feasts', 'catalog/feasts.html')
-CityListView = create_listview(City, 'cities', 'catalog/cities.html')
+CityListView = create_listview(City, 'cities', 'catalog/cities.html', search_field='name')
+
+country_list_async, country_detail_async = create_async_api(Country, CountryFlatSerializer)
+feast_list_async, feast_detail_async = create_async_api(Feast, FeastFlatSerializer)
+city_list_async, city_detail_async = create_async_api(City, CityFlatSerializer)
 
 def register(request):
     """
@@ -212,27 +328,385 @@ def profile(request):
     )
 
 
-class CountryViewSet(viewsets.ModelViewSet):
+class SparseFieldsetMixin:
+    """
+    Narrows reads to the fields given in the `fields` or `exclude` query parameters.
+
+    Both the serializer output and the SQL are narrowed: unrequested columns
+    are left out with only() or defer(), so large text columns are not even
+    read from the database when they are not needed.
+    """
+
+    def get_available_fields(self) -> list:
+        """Returns the names of the fields the read serializer can emit."""
+        if self.use_flat_reads():
+            return self.flat_serializer_class.get_field_names()
+        return list(self.serializer_class(context=self.get_serializer_context()).fields)
+
+    @cached_property
+    def sparse_fields(self):
+        """Returns the requested field names or None when the response is not narrowed."""
+        params = self.request.query_params
+        if self.request.method not in ('GET', 'HEAD') or not ('fields' in params or 'exclude' in params):
+            return None
+        available = self.get_available_fields()
+        requested = set(filter(None, params.get('fields', '').split(','))) or set(available)
+        excluded = set(filter(None, params.get('exclude', '').split(',')))
+        unknown = (requested | excluded) - set(available)
+        if unknown:
+            raise ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+        return [name for name in available if name in requested - excluded]
+
+    def get_key_fields(self) -> list:
+        """Returns the fields every read needs: the primary key, the pagination keys and the sorting field."""
+        keys = [self.queryset.model._meta.pk.name, *getattr(self.paginator, 'ordering', ())]
+        ordering_fields = getattr(self, 'ordering_fields', {})
+        name = self.request.query_params.get(ORDERING_PARAM, '').removeprefix('-')
+        if name in ordering_fields:
+            keys.append(name if self.use_flat_reads() else ordering_fields[name])
+        return keys
+
+    def get_queryset(self):
+        """Loads only the requested columns."""
+        queryset = super().get_queryset()
+        fields = self.sparse_fields
+        if fields is None or self.use_flat_reads():
+            return queryset
+        columns = {field.name for field in queryset.model._meta.concrete_fields}
+        if 'fields' in self.request.query_params:
+            return queryset.only(*columns.intersection(fields), *self.get_key_fields())
+        return queryset.defer(*columns.difference(fields).difference(self.get_key_fields()))
+
+    def get_serializer(self, *args, **kwargs):
+        """Builds a serializer which emits only the requested fields."""
+        fields = self.sparse_fields
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+
+class FlatReadMixin:
+    """
+    Serves reads with flat_serializer_class straight from .values() rows.
+
+    The flat mode is the viewset default when flat_reads is set and can be
+    switched per request with the `flat` query parameter.
+    """
+
+    flat_serializer_class = None
+    flat_reads = False
+
+    def use_flat_reads(self) -> bool:
+        """Checks if the current request should be served by the flat serializer."""
+        if self.flat_serializer_class is None:
+            return False
+        flag = self.request.query_params.get('flat')
+        if flag is None:
+            return self.flat_reads
+        return flag.lower() in ('1', 'true', 'yes')
+
+    def get_flat_queryset(self):
+        """Returns the filtered queryset narrowed to the rows of the flat serializer."""
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = self.sparse_fields
+        if fields is None:
+            return self.flat_serializer_class.get_values(queryset)
+        return self.flat_serializer_class.get_values(queryset, {*fields, *self.get_key_fields()})
+
+    def get_flat_serializer(self, *args, **kwargs):
+        """Builds a flat serializer which emits only the requested fields."""
+        return self.flat_serializer_class(*args, fields=self.sparse_fields, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        """Lists resources with the flat serializer when it is requested."""
+        if not self.use_flat_reads():
+            return super().list(request, *args, **kwargs)
+        queryset = self.get_flat_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_flat_serializer(page, many=True).data)
+        return Response(self.get_flat_serializer(queryset, many=True).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieves a resource with the flat serializer when it is requested."""
+        if not self.use_flat_reads():
+            return super().retrieve(request, *args, **kwargs)
+        lookup = {self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        row = get_object_or_404(self.get_flat_queryset(), **lookup)
+        return Response(self.get_flat_serializer(row).data)
+
+
+class CatalogViewSet(
+    CachedResponseMixin, ConditionalMixin, SparseFieldsetMixin, FlatReadMixin, viewsets.ModelViewSet,
+):
+    """
+    A base ViewSet with the settings shared by catalog resources.
+
+    Related objects of serialized fields are loaded in bulk with the lookups
+    given in read_prefetches, so reads run a fixed number of queries. Lists
+    are searched by the `q` parameter on search_field when it is set.
+    """
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [MyPermission]
+    pagination_class = KeysetPagination
+    filter_backends = [TrigramSearchFilter, OrderingFilter]
+    search_field = None
+    ordering_fields = {}
+    read_prefetches = {}
+
+    def get_queryset(self):
+        """Prefetches related objects of the fields which are going to be serialized."""
+        queryset = super().get_queryset()
+        if self.request.method not in ('GET', 'HEAD') or self.use_flat_reads():
+            return queryset
+        fields = self.sparse_fields
+        return queryset.prefetch_related(*(
+            lookup for name, lookup in self.read_prefetches.items() if fields is None or name in fields
+        ))
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """Creates a list of resources in one transaction."""
+        created, errors = bulk.bulk_create(self.queryset.model, request.data)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'ids': [instance.pk for instance in created]}, status=status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.put
+    def bulk_update(self, request):
+        """Updates the given fields of a list of resources identified by id in one transaction."""
+        updated, errors = bulk.bulk_update(self.queryset.model, request.data)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'updated': len(updated)})
+
+    @bulk_create.mapping.delete
+    def bulk_delete(self, request):
+        """Deletes resources by a list of ids in one transaction."""
+        deleted, errors = bulk.bulk_delete(self.queryset.model, request.data)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'deleted': deleted})
+
+
+class CountryViewSet(CatalogViewSet):
     """A ViewSet for managing country resources."""
 
     serializer_class = CountrySerializer
-    queryset = Country.objects.all()
-    authentication_classes = [authentication.TokenAuthentication]
-    permission_classes = [MyPermission]
+    flat_serializer_class = CountryFlatSerializer
+    queryset = Country.objects.select_related('stats')
+    search_field = 'name'
+    ordering_fields = COUNTRY_ORDERING
+    conditional_timestamp = Greatest('modified', 'stats__updated')
+    cache_models = (City, CountryToFeast)
 
 
-class FeastViewSet(viewsets.ModelViewSet):
+class FeastViewSet(CatalogViewSet):
     """A ViewSet for managing country resources."""
 
     serializer_class = FeastSerializer
+    flat_serializer_class = FeastFlatSerializer
     queryset = Feast.objects.all()
-    authentication_classes = [authentication.TokenAuthentication]
-    permission_classes = [MyPermission]
+    conditional_related = ((CountryToFeast, 'feast', 'created'),)
+    cache_models = (CountryToFeast, FeastOccurrence)
+    read_prefetches = {'countries': Prefetch('countries', queryset=Country.objects.only('id'))}
 
-class CityViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def links(self, request):
+        """Links feasts with countries by a list of {country, feast} ids, skipping existing links."""
+        created, errors = bulk.bulk_create(CountryToFeast, request.data, ignore_conflicts=True)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'linked': len(created)}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False)
+    def calendar(self, request):
+        """Returns feasts between the `start` and `end` days grouped by day, cached by the resolved days."""
+        start, end = parse_range(request.query_params)
+        return self.cached(self.get_calendar_response, request, start, end)
+
+    def get_calendar_response(self, request, start, end):
+        """Returns the calendar of the range, limited to `country` ids when given."""
+        return Response(get_calendar(start, end, parse_countries(request.query_params)))
+
+    @action(detail=False, url_path='search', url_name='search')
+    def text_search(self, request):
+        """Finds feasts by words of the title and description, most relevant first."""
+        return self.cached(self.get_text_search_response, request)
+
+    def get_text_search_response(self, request):
+        """
+        Returns ranked feasts with highlighted snippets for the `q` query.
+
+        Words are stemmed in the `lang` language, by default the active one.
+        """
+        query = request.query_params.get(SEARCH_PARAM, '').strip()
+        if not query:
+            raise ValidationError({SEARCH_PARAM: 'A search query is required.'})
+        language = request.query_params.get('lang') or get_language().split('-')[0]
+        if language not in SEARCH_CONFIGS:
+            raise ValidationError({'lang': f"Supported languages: {', '.join(SEARCH_CONFIGS)}."})
+        rows = full_text_search(self.queryset, query, language).values(
+            'id', 'title', 'date_of_feast', 'rank', 'title_headline', 'description_headline',
+        )
+        return Response(list(rows[:get_search_limit(request)]))
+
+class CityViewSet(CatalogViewSet):
     """A ViewSet for managing country resources."""
 
     serializer_class = CitySerializer
+    flat_serializer_class = CityFlatSerializer
     queryset = City.objects.all()
-    authentication_classes = [authentication.TokenAuthentication]
+    search_field = 'name'
+
+    def get_distance_response(self, queryset):
+        """Returns flat rows of cities with their distance from the requested point in meters."""
+        rows = queryset.values(*CityFlatSerializer.value_fields, 'distance')
+        return Response(CityFlatSerializer(rows, many=True).data)
+
+    @action(detail=False)
+    def nearest(self, request):
+        """Returns the `limit` cities closest to the `lat` and `lon` point."""
+        return self.cached(self.get_nearest_response, request)
+
+    def get_nearest_response(self, request):
+        """Finds the nearest cities over the GiST index of their coordinates."""
+        params = request.query_params
+        latitude, longitude = geo.parse_point(params)
+        limit = int(geo.parse_number(params, 'limit', 1, geo.MAX_NEAREST_LIMIT, geo.NEAREST_LIMIT))
+        return self.get_distance_response(geo.nearest(self.queryset, latitude, longitude, limit))
+
+    @action(detail=False)
+    def within(self, request):
+        """Returns cities not farther than `radius` meters from the `lat` and `lon` point, nearest first."""
+        return self.cached(self.get_within_response, request)
+
+    def get_within_response(self, request):
+        """Finds the cities in the radius over the GiST index of their coordinates."""
+        params = request.query_params
+        latitude, longitude = geo.parse_point(params)
+        radius = geo.parse_number(params, 'radius', 0, geo.MAX_RADIUS)
+        limit = int(geo.parse_number(params, 'limit', 1, geo.MAX_WITHIN_LIMIT, geo.WITHIN_LIMIT))
+        return self.get_distance_response(geo.within(self.queryset, latitude, longitude, radius, limit))
+
+    @action(detail=False, url_path=r'tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)', url_name='tile')
+    def tile(self, request, z, x, y):
+        """Returns clusters of cities in the `z`/`x`/`y` map tile, cached per tile."""
+        return self.cached(self.get_tile_response, request, z, x, y)
+
+    def get_tile_response(self, request, z, x, y):
+        """Aggregates the cities of the tile over the quadkey index."""
+        return Response(get_tile(*parse_tile(z, x, y)))
+
+
+class ExportView(APIView):
+    """
+    Streams a full dataset export as NDJSON or CSV.
+
+    Rows are read over a server-side cursor and written as they arrive, so memory
+    stays flat for any table size. Pass `gzip=1` to get a gzip compressed file.
+    """
+
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [MyPermission]
+
+    def get(self, request, dataset, fmt):
+        """Returns a streaming response with the requested dataset."""
+        if dataset not in DATASETS or fmt not in CONTENT_TYPES:
+            raise Http404
+        gzip = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+        filename = f'{dataset}.{fmt}.gz' if gzip else f'{dataset}.{fmt}'
+        response = StreamingHttpResponse(
+            export_stream(dataset, fmt, gzip),
+            content_type='application/gzip' if gzip else f'{CONTENT_TYPES[fmt]}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class JobViewSet(
+    viewsets.mixins.CreateModelMixin, viewsets.mixins.RetrieveModelMixin, viewsets.mixins.ListModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    A ViewSet for queuing background jobs and following their status.
+
+    Jobs are run by the run_worker command. Lists hold the newest `limit`
+    jobs, filtered by the `status` and `type` parameters.
+    """
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [MyPermission]
+    serializer_class = JobSerializer
+    queryset = Job.objects.order_by('-created', '-id')
+
+    def get_queryset(self):
+        """Filters jobs by status and type and limits lists."""
+        queryset = super().get_queryset()
+        job_status = self.request.query_params.get('status')
+        if job_status:
+            if job_status not in JobStatus.values:
+                raise ValidationError({'status': f"Expected one of {', '.join(JobStatus.values)}."})
+            queryset = queryset.filter(status=job_status)
+        if self.request.query_params.get('type'):
+            queryset = queryset.filter(type=self.request.query_params['type'])
+        if self.action != 'list':
+            return queryset
+        try:
+            size = min(max(int(self.request.query_params.get('limit', JOBS_PAGE_SIZE)), 1), MAX_JOBS_PAGE_SIZE)
+        except ValueError as error:
+            raise ValidationError({'limit': 'A whole number is required.'}) from error
+        return queryset[:size]
+
+    def perform_create(self, serializer):
+        """Checks the arguments, queues the job and wakes the workers."""
+        data = serializer.validated_data
+        if data['type'] not in JOB_TYPES:
+            raise ValidationError({'type': f"Expected one of {', '.join(JOB_TYPES)}."})
+        try:
+            serializer.instance = enqueue(data['type'], data.get('args'), data.get('run_at'))
+        except ValueError as error:
+            raise ValidationError({'args': str(error)}) from error
+
+
+class ChangesView(APIView):
+    """
+    Returns the rows of a dataset changed and deleted since a cursor.
+
+    Clients start without `since`, then pass the `next` cursor of each page,
+    so they sync in proportion to the changes instead of the table size.
+    """
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [MyPermission]
+
+    def get(self, request, dataset):
+        """Returns a page of changed rows, deleted ids and the next cursor."""
+        if dataset not in DATASETS:
+            raise Http404
+        model, serializer = DATASETS[dataset]
+        cursor = None
+        if request.query_params.get('since'):
+            try:
+                cursor = decode_cursor(request.query_params['since'])
+            except ValueError as error:
+                raise NotFound(str(error)) from error
+        try:
+            size = min(max(int(request.query_params.get('limit', CHANGES_PAGE_SIZE)), 1), MAX_CHANGES_PAGE_SIZE)
+        except ValueError as error:
+            raise ValidationError({'limit': 'A whole number is required.'}) from error
+        changes = get_changes(model, serializer, cursor, size)
+        changes['changed'] = serializer(changes['changed'], many=True).data
+        return Response(changes)
+
+
+class CacheStatsView(APIView):
+    """Returns hit and miss counters of the API response cache."""
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [MyPermission]
+
+    def get(self, request):
+        """Returns the cache statistics."""
+        return Response(get_stats())
@@ -36,6 +36,7 @@ INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
+    'django.contrib.postgres',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
@@ -101,6 +102,26 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Row counts on the home page are read from pg_class statistics instead of
+# the exact counters when set, which skips even the counter table.
+COUNTS_ESTIMATED = getenv('COUNTS_ESTIMATED', '').lower() in ('1', 'true', 'yes')
+
+# Dotted paths of the callables consume_outbox passes each batch of outbox
+# events to, in order.
+OUTBOX_HANDLERS = [
+    name for name in getenv('OUTBOX_HANDLERS', 'myapp.outbox.invalidate_caches').split(',') if name
+]
+
+# Directory the export jobs write their files to.
+JOB_EXPORT_DIR = Path(getenv('JOB_EXPORT_DIR', BASE_DIR / 'exports'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
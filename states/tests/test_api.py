@@ -1,11 +1,22 @@
 """Module for testing api."""
 
+import gzip
+import json
+from datetime import date, timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
 from rest_framework import status
-from myapp.models import Country, Feast, City
+from myapp.models import Country, Feast, City, Job, JobStatus
+from myapp.serializers import FeastFlatSerializer
+from myapp.authentication import CachedTokenAuthentication
+from myapp.recurrence import HORIZON_DAYS
 
 def create_viewset_test(model_class, url, creation_attrs):
     """
@@ -47,6 +58,124 @@ def create_viewset_test(model_class, url, creation_attrs):
             """
             self.get(self.superuser, self.superuser_token)
 
+        def test_keyset_pagination(self):
+            """
+            Walks the endpoint page by page with next cursors and checks every row is seen once.
+            """
+            created_ids = {str(model_class.objects.create(**creation_attrs).id) for _ in range(4)}
+            created_ids.add(str(model_class.objects.create(**creation_attrs, created=None).id))
+            self.client.force_authenticate(user=self.user, token=self.user_token)
+            self.assertEqual(len(self.client.get(url).data), 5)
+
+            seen, cursor = [], ''
+            for _ in range(3):
+                response = self.client.get(url, {'page_size': 2, 'cursor': cursor})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                seen.extend(row['url'].rstrip('/').split('/')[-1] for row in response.data['results'])
+                cursor = response.data['next_cursor']
+            self.assertIsNone(cursor)
+            self.assertEqual(len(seen), 5)
+            self.assertEqual(set(seen), created_ids)
+
+            response = self.client.get(url, {'cursor': 'broken'})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        def test_flat_reads(self):
+            """
+            Tests list and detail reads served by the flat serializer.
+            """
+            created_id = str(model_class.objects.create(**creation_attrs).id)
+            self.client.force_authenticate(user=self.user, token=self.user_token)
+
+            response = self.client.get(url, {'flat': 1})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([row['id'] for row in response.data], [created_id])
+
+            response = self.client.get(f'{url}{created_id}/', {'flat': 1})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['id'], created_id)
+            self.assertNotIn('url', response.data)
+
+            response = self.client.get(url, {'flat': 1, 'page_size': 1})
+            self.assertEqual(len(response.data['results']), 1)
+
+        def test_bulk(self):
+            """
+            Tests bulk creation, update and deletion of resources in one request each.
+            """
+            self.client.force_authenticate(user=self.user, token=self.user_token)
+            response = self.client.post(f'{url}bulk/', [creation_attrs], format='json')
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+            self.client.force_authenticate(user=self.superuser, token=self.superuser_token)
+            response = self.client.post(f'{url}bulk/', [creation_attrs] * 3, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            ids = [str(id_) for id_ in response.data['ids']]
+            self.assertEqual(model_class.objects.count(), 3)
+
+            response = self.client.post(f'{url}bulk/', [creation_attrs, {'unknown': 1}], format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual([error['index'] for error in response.data['errors']], [1])
+            self.assertEqual(model_class.objects.count(), 3)
+
+            items = [{'id': id_, 'created': '2000-01-01T00:00:00Z'} for id_ in ids]
+            response = self.client.put(f'{url}bulk/', items, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(model_class.objects.filter(created__year=2000).count(), 3)
+
+            response = self.client.delete(f'{url}bulk/', ids[:2], format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['deleted'], 2)
+            self.assertEqual(model_class.objects.count(), 1)
+
+        def test_conditional_get(self):
+            """
+            Tests that fresh client copies get 304 and changes produce a new ETag.
+            """
+            instance = model_class.objects.create(**creation_attrs)
+            self.client.force_authenticate(user=self.user, token=self.user_token)
+            for path in (url, f'{url}{instance.id}/'):
+                response = self.client.get(path)
+                etag = response['ETag']
+                self.assertIn('Last-Modified', response)
+
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(response['ETag'], etag)
+                response = self.client.get(path, {'flat': 1}, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+                instance.save()
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertNotEqual(response['ETag'], etag)
+
+                response = self.client.get(path, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        def test_sparse_fieldsets(self):
+            """
+            Tests that the fields and exclude parameters narrow the response rows.
+            """
+            model_class.objects.create(**creation_attrs)
+            self.client.force_authenticate(user=self.user, token=self.user_token)
+            cases = (
+                ({'fields': 'url,created'}, {'url', 'created'}),
+                ({'flat': 1, 'fields': 'id'}, {'id'}),
+                ({'flat': 1, 'fields': 'id', 'page_size': 1}, {'id'}),
+            )
+            for params, keys in cases:
+                response = self.client.get(url, params)
+                rows = response.data['results'] if 'page_size' in params else response.data
+                self.assertEqual(set(rows[0]), keys)
+
+            response = self.client.get(url, {'exclude': 'modified'})
+            self.assertNotIn('modified', response.data[0])
+            self.assertIn('created', response.data[0])
+
+            response = self.client.get(url, {'fields': 'url,unknown'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
         def manage(
                 self,
                 user: User,
@@ -102,3 +231,800 @@ CountryViewSetTest = create_viewset_test(
 )
 FeastViewSetTest = create_viewset_test(Feast, '/api/feasts/', {'title': 'nfrnrfr'})
 CityViewSetTest = create_viewset_test(City, '/api/cities/', {'name': 'fkfff'})
+
+
+class FeastFlatSerializerTest(TestCase):
+    """
+    A test case for the ids emitted by the flat feast serializer.
+    """
+    def test_country_ids(self):
+        """
+        Checks that linked countries are emitted as plain ids and lonely feasts get an empty list.
+        """
+        country = Country.objects.create(name='A')
+        feast = Feast.objects.create(title='B')
+        feast.countries.add(country)
+        Feast.objects.create(title='C')
+        rows = FeastFlatSerializer(
+            FeastFlatSerializer.get_values(Feast.objects.order_by('title')), many=True,
+        ).data
+        self.assertEqual([row['country_ids'] for row in rows], [[str(country.id)], []])
+
+
+class ExportTest(TestCase):
+    """
+    A test case for the streaming export endpoint.
+    """
+    def setUp(self):
+        """
+        Creates a country with a city and authenticates a regular user.
+        """
+        self.country = Country.objects.create(name='A')
+        self.city = City.objects.create(name='B', country=self.country, population=10)
+        self.client = APIClient()
+        user = User.objects.create_user(username='user', password='user')
+        self.client.force_authenticate(user=user, token=Token.objects.create(user=user))
+
+    def export(self, path: str, **params) -> bytes:
+        """
+        Downloads an export and returns its body.
+        """
+        response = self.client.get(f'/api/export/{path}', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content)
+
+    def test_ndjson(self):
+        """
+        Checks that every city is exported as a JSON line with a plain country id.
+        """
+        rows = [json.loads(line) for line in self.export('cities.ndjson').splitlines()]
+        self.assertEqual(rows[0]['id'], str(self.city.id))
+        self.assertEqual(rows[0]['country'], str(self.country.id))
+
+    def test_csv_gzip(self):
+        """
+        Checks a gzip compressed CSV export with a header line.
+        """
+        lines = gzip.decompress(self.export('countries.csv', gzip=1)).decode().splitlines()
+        self.assertTrue(lines[0].startswith('id,created,modified,name'))
+        self.assertEqual(len(lines), 2)
+
+    def test_unknown(self):
+        """
+        Checks that unknown datasets and formats are not found.
+        """
+        self.assertEqual(self.client.get('/api/export/users.csv').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/export/cities.xml').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ChangesTest(TestCase):
+    """
+    A test case for the change feed endpoint.
+    """
+    def setUp(self):
+        """
+        Authenticates a regular user.
+        """
+        self.client = APIClient()
+        user = User.objects.create_user(username='user', password='user')
+        self.client.force_authenticate(user=user, token=Token.objects.create(user=user))
+
+    def changes(self, dataset: str, **params) -> dict:
+        """
+        Reads a page of changes of a dataset.
+        """
+        response = self.client.get(f'/api/changes/{dataset}/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_sync(self):
+        """
+        Checks that pages follow updates, including writes which skip save, and deletes.
+        """
+        country = Country.objects.create(name='A')
+        cities = [City.objects.create(name=name, country=country) for name in ('B', 'C', 'D')]
+        page = self.changes('cities', limit=2)
+        self.assertEqual([row['name'] for row in page['changed']], ['B', 'C'])
+        self.assertTrue(page['more'])
+        page = self.changes('cities', limit=2, since=page['next'])
+        self.assertEqual([row['name'] for row in page['changed']], ['D'])
+        self.assertFalse(page['more'])
+        City.objects.filter(pk=cities[0].pk).update(population=5)
+        deleted = cities[1].id
+        cities[1].delete()
+        page = self.changes('cities', since=page['next'])
+        self.assertEqual([row['population'] for row in page['changed']], [5])
+        self.assertEqual(page['deleted'], [deleted])
+        self.assertEqual(self.changes('cities', since=page['next'])['changed'], [])
+
+    def test_cascades(self):
+        """
+        Checks that rows deleted with their country leave tombstones.
+        """
+        country = Country.objects.create(name='A')
+        city_id = City.objects.create(name='B', country=country).id
+        Feast.objects.create(title='F').countries.add(country)
+        link_id = country.countrytofeast_set.get().id
+        since = self.changes('country-feasts')['next']
+        country.delete()
+        self.assertEqual(self.changes('cities', since=since)['deleted'], [city_id])
+        self.assertEqual(self.changes('country-feasts', since=since)['deleted'], [link_id])
+        self.assertEqual(self.client.get('/api/changes/cities/', {'since': 'x'}).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BulkRelationsTest(TestCase):
+    """
+    A test case for related objects in bulk requests.
+    """
+    def setUp(self):
+        """
+        Creates a country and a feast and authenticates a superuser.
+        """
+        self.country = Country.objects.create(name='A')
+        self.feast = Feast.objects.create(title='B')
+        self.client = APIClient()
+        user = User.objects.create_user(username='superuser', password='superuser', is_superuser=True)
+        self.client.force_authenticate(user=user, token=Token.objects.create(user=user))
+
+    def test_city_country(self):
+        """
+        Checks that cities refer to existing countries by id.
+        """
+        items = [
+            {'name': 'C', 'country': str(self.country.id)},
+            {'name': 'D', 'country': str(self.feast.id)},
+            {'name': 'E', 'country': 'abc'},
+        ]
+        response = self.client.post('/api/cities/bulk/', items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                '/api/cities/bulk/', [{**items[0], 'coordinates': '55.75, 37.61'}], format='json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((City.objects.get().country, City.objects.get().latitude), (self.country, 55.75))
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE "states"."city"')])
+
+    def test_links(self):
+        """
+        Checks that feasts are linked with countries and repeated links are skipped.
+        """
+        items = [{'country': str(self.country.id), 'feast': str(self.feast.id)}]
+        for linked in (1, 0):
+            response = self.client.post('/api/feasts/links/', items, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(response.data['linked'], linked)
+        self.assertEqual(list(self.feast.countries.all()), [self.country])
+
+        response = self.client.post('/api/feasts/links/', [{'country': str(self.country.id)}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_links_change_etag(self):
+        """
+        Checks that linking a feast with a country changes the feast ETag.
+        """
+        path = f'/api/feasts/{self.feast.id}/'
+        etag = self.client.get(path)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.feast.countries.add(self.country)
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class CountrySparseFieldsTest(TestCase):
+    """
+    A test case for the columns read by narrowed country requests.
+    """
+    def test_hymn_not_selected(self):
+        """
+        Checks that the hymn column is not read when it is not requested.
+        """
+        Country.objects.create(name='A', hymn='Long anthem')
+        client = APIClient()
+        user = User.objects.create_user(username='user', password='user')
+        client.force_authenticate(user=user, token=Token.objects.create(user=user))
+        for params in ({'fields': 'url,name'}, {'exclude': 'hymn'}, {'flat': 1, 'fields': 'name'}):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get('/api/countries/', params)
+            self.assertNotIn('hymn', response.data[0])
+            self.assertFalse([query for query in queries if 'hymn' in query['sql']])
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    """
+    A test case for the cached token authentication.
+    """
+    def setUp(self):
+        """
+        Creates a user with a token and empties the token caches.
+        """
+        cache.clear()
+        CachedTokenAuthentication.local_cache.clear()
+        self.user = User.objects.create_user(username='user', password='user')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def token_queries(self) -> int:
+        """
+        Makes a request and returns how many token queries it ran.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/countries/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len([query for query in queries if 'authtoken_token' in query['sql']])
+
+    def test_cached(self):
+        """
+        Checks that only the first request reads the token from the database.
+        """
+        self.assertEqual(self.token_queries(), 1)
+        self.assertEqual(self.token_queries(), 0)
+        CachedTokenAuthentication.local_cache.clear()
+        self.assertEqual(self.token_queries(), 0)
+
+    def test_deleted_token(self):
+        """
+        Checks that a deleted token is rejected at once.
+        """
+        self.token_queries()
+        self.token.delete()
+        self.assertEqual(self.client.get('/api/countries/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user(self):
+        """
+        Checks that a deactivated user is rejected at once.
+        """
+        self.token_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/countries/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stale_entry(self):
+        """
+        Checks that cache entries hold no password hash and a stale lookup can not revive a deleted token.
+        """
+        self.token_queries()
+        cache_key = CachedTokenAuthentication.cache_key(self.token.key)
+        version = cache.get(cache_key)
+        entry = cache.get(CachedTokenAuthentication.entry_key(cache_key, version))
+        self.assertNotIn(self.user.password, entry)
+        self.token.delete()
+        cache.add(CachedTokenAuthentication.entry_key(cache_key, version), entry)
+        self.assertEqual(self.client.get('/api/countries/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AsyncApiTest(TestCase):
+    """
+    A test case for the async read API.
+    """
+    def setUp(self):
+        """
+        Creates cities and a token for a regular user.
+        """
+        cache.clear()
+        CachedTokenAuthentication.local_cache.clear()
+        country = Country.objects.create(name='A')
+        self.ids = {str(City.objects.create(name=f'city {index}', country=country).id) for index in range(3)}
+        user = User.objects.create_user(username='user', password='user')
+        self.auth = f'Token {Token.objects.create(user=user).key}'
+
+    async def test_list(self):
+        """
+        Walks the async city list with cursors.
+        """
+        seen, params = set(), {'page_size': 2, 'count': 1}
+        for _ in range(2):
+            response = await self.async_client.get('/api/async/cities/', params, AUTHORIZATION=self.auth)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            self.assertEqual(data['count'], 3)
+            seen.update(row['id'] for row in data['results'])
+            params['cursor'] = data['next_cursor']
+        self.assertIsNone(params['cursor'])
+        self.assertEqual(seen, self.ids)
+
+    async def test_detail(self):
+        """
+        Reads a single city and checks missing ones are not found.
+        """
+        id_ = next(iter(self.ids))
+        response = await self.async_client.get(f'/api/async/cities/{id_}/', AUTHORIZATION=self.auth)
+        self.assertEqual(response.json()['id'], id_)
+        response = await self.async_client.get('/api/async/cities/abc/', AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_not_authenticated(self):
+        """
+        Checks that requests without a valid token are rejected.
+        """
+        response = await self.async_client.get('/api/async/feasts/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.get('/api/async/feasts/', AUTHORIZATION='Token abc')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.post('/api/async/feasts/', AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class ResponseCacheTest(TestCase):
+    """
+    A test case for the signal-invalidated API response cache.
+    """
+    def setUp(self):
+        """
+        Empties the cache, creates a country and a feast and authenticates a superuser.
+        """
+        cache.clear()
+        self.country = Country.objects.create(name='A')
+        self.feast = Feast.objects.create(title='B')
+        self.client = APIClient()
+        user = User.objects.create_user(username='superuser', password='superuser', is_superuser=True)
+        self.client.force_authenticate(user=user, token=Token.objects.create(user=user))
+
+    def get(self, url: str, expected: str):
+        """
+        Makes a GET request as if committed and checks whether it was served from the cache.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Cache'], expected)
+        return response
+
+    def test_hit_without_queries(self):
+        """
+        Checks that a repeated request is served from the cache without queries and counted.
+        """
+        first = self.get('/api/countries/', 'MISS')
+        with self.assertNumQueries(0):
+            second = self.get('/api/countries/', 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.get('/api/countries/?fields=name', 'MISS')
+        response = self.client.get('/api/countries/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        stats = self.client.get('/api/cache-stats/').data
+        self.assertEqual((stats['hits'], stats['misses']), (2, 2))
+
+    def test_signals(self):
+        """
+        Checks that saves, deletes and m2m changes drop cached responses of their models.
+        """
+        self.get('/api/feasts/', 'MISS')
+        self.get('/api/cities/', 'MISS')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.feast.countries.add(self.country)
+        self.assertEqual(self.get('/api/feasts/', 'MISS').data[0]['countries'][0].split('/')[-2], str(self.country.id))
+        self.get('/api/cities/', 'HIT')
+        self.country.name = 'C'
+        self.country.save()
+        self.get('/api/feasts/', 'HIT')
+        City.objects.create(name='D', country=self.country)
+        self.assertEqual(len(self.get('/api/cities/', 'MISS').data), 1)
+        self.get(f'/api/feasts/{self.feast.id}/', 'MISS')
+        self.feast.delete()
+        self.assertEqual(self.client.get(f'/api/feasts/{self.feast.id}/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk(self):
+        """
+        Checks that bulk writes, which send no signals, drop cached responses too.
+        """
+        self.get('/api/countries/', 'MISS')
+        response = self.client.put('/api/countries/bulk/', [{'id': str(self.country.id), 'name': 'C'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get('/api/countries/', 'MISS').data[0]['name'], 'C')
+        self.client.post('/api/countries/bulk/', [{'name': 'D'}], format='json')
+        self.assertEqual(len(self.get('/api/countries/', 'MISS').data), 2)
+
+
+class SearchTest(TestCase):
+    """
+    A test case for the trigram name search.
+    """
+    def setUp(self):
+        """
+        Creates cities with similar and unrelated names and authenticates a regular user.
+        """
+        country = Country.objects.create(name='Russia')
+        for name in ('Moscow', 'Saint Petersburg', 'Kazan', 'Moscow Oblast town'):
+            City.objects.create(name=name, country=country)
+        self.client = APIClient()
+        user = User.objects.create_user(username='user', password='user')
+        self.client.force_authenticate(user=user, token=Token.objects.create(user=user))
+
+    def names(self, **params) -> list:
+        """
+        Searches cities and returns the names of the results in order.
+        """
+        response = self.client.get('/api/cities/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['name'] for row in response.data]
+
+    def test_ranked(self):
+        """
+        Checks that misspelled queries match and the closest name comes first.
+        """
+        self.assertEqual(self.names(q='moscw'), ['Moscow', 'Moscow Oblast town'])
+        self.assertEqual(self.names(q='moscow', page_size=1), ['Moscow'])
+        self.assertEqual(len(self.names(q='  ')), 4)
+
+    def test_substring(self):
+        """
+        Checks case-insensitive substring matches in API and flat reads and on countries.
+        """
+        self.assertEqual(self.names(q='PETERS'), ['Saint Petersburg'])
+        self.assertEqual(self.names(q='zan', flat=1), ['Kazan'])
+        response = self.client.get('/api/countries/', {'q': 'russ'})
+        self.assertEqual([row['name'] for row in response.data], ['Russia'])
+
+
+class FullTextSearchTest(TestCase):
+    """
+    A test case for the full-text feast search.
+    """
+    def setUp(self):
+        """
+        Creates feasts in both languages and authenticates a regular user.
+        """
+        Feast.objects.create(title='Harvest festival', description='People celebrate the harvesting of crops.')
+        Feast.objects.create(title='День независимости', description='Праздник независимости страны.')
+        Feast.objects.create(title='New Year', description='Fireworks at midnight.')
+        self.client = APIClient()
+        user = User.objects.create_user(username='user', password='user')
+        self.client.force_authenticate(user=user, token=Token.objects.create(user=user))
+
+    def test_stemming(self):
+        """
+        Checks that word forms match in English and Russian, the active language by default.
+        """
+        response = self.client.get('/api/feasts/search/', {'q': 'harvests', 'lang': 'en'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['title'] for row in response.data], ['Harvest festival'])
+        self.assertEqual(response.data[0]['title_headline'], '<mark>Harvest</mark> festival')
+        self.assertIn('<mark>harvesting</mark>', response.data[0]['description_headline'])
+        response = self.client.get('/api/feasts/search/', {'q': 'независимость'})
+        self.assertEqual([row['title'] for row in response.data], ['День независимости'])
+
+    def test_invalid(self):
+        """
+        Checks that an empty query and an unsupported language are rejected.
+        """
+        response = self.client.get('/api/feasts/search/', {'q': ' '})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/feasts/search/', {'q': 'harvest', 'lang': 'de'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CalendarTest(TestCase):
+    """
+    A test case for the feast calendar.
+    """
+    def setUp(self):
+        """
+        Creates feasts on two days linked with two countries and authenticates a regular user.
+        """
+        self.first, self.second = Country.objects.create(name='A'), Country.objects.create(name='B')
+        Feast.objects.create(title='Spring', date_of_feast='2024-03-01').countries.add(self.first)
+        Feast.objects.create(title='Labour', date_of_feast='2024-05-01').countries.add(self.first, self.second)
+        Feast.objects.create(title='May', date_of_feast='2024-05-01').countries.add(self.second)
+        Feast.objects.create(title='Undated')
+        self.client = APIClient()
+        user = User.objects.create_user(username='user', password='user')
+        self.client.force_authenticate(user=user, token=Token.objects.create(user=user))
+
+    def calendar(self, **params) -> list:
+        """
+        Requests the calendar and returns (day, titles) pairs.
+        """
+        response = self.client.get('/api/feasts/calendar/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(day['date'], [feast['title'] for feast in day['feasts']]) for day in response.data]
+
+    def test_range(self):
+        """
+        Checks that feasts of the range are grouped by day in date and title order.
+        """
+        self.assertEqual(
+            self.calendar(start='2024-01-01', end='2024-12-31'),
+            [('2024-03-01', ['Spring']), ('2024-05-01', ['Labour', 'May'])],
+        )
+        self.assertEqual(self.calendar(start='2024-05-01'), [('2024-05-01', ['Labour', 'May'])])
+        self.assertEqual(self.calendar(start='2024-05-02', end='2024-05-31'), [])
+
+    def test_default_day(self):
+        """
+        Checks that the cached calendar of today moves on with the date.
+        """
+        for today, expected in ((date(2024, 3, 1), [('2024-03-01', ['Spring'])]), (date(2024, 3, 2), [])):
+            with mock.patch('myapp.feast_calendar.timezone.localdate', return_value=today):
+                self.assertEqual(self.calendar(), expected)
+
+    def test_countries(self):
+        """
+        Checks that a country filter keeps feasts celebrated in any of the countries with all their countries.
+        """
+        response = self.client.get('/api/feasts/calendar/', {'start': '2024-05-01', 'country': str(self.first.id)})
+        feasts = response.data[0]['feasts']
+        self.assertEqual([feast['title'] for feast in feasts], ['Labour'])
+        self.assertEqual(sorted(feasts[0]['country_ids']), sorted([str(self.first.id), str(self.second.id)]))
+        countries = f'{self.first.id},{self.second.id}'
+        self.assertEqual(
+            self.calendar(start='2024-01-01', end='2024-06-01', country=countries),
+            [('2024-03-01', ['Spring']), ('2024-05-01', ['Labour', 'May'])],
+        )
+
+    def test_recurring(self):
+        """
+        Checks that a yearly feast is listed every year, also before the expansion window, and bad rules are rejected.
+        """
+        Feast.objects.create(title='Anniversary', date_of_feast='2024-05-01', recurrence='yearly')
+        year = timezone.localdate().year + 1
+        self.assertEqual(
+            self.calendar(start=f'{year}-04-30', end=f'{year}-05-02'),
+            [(f'{year}-05-01', ['Anniversary'])],
+        )
+        self.assertEqual(
+            self.calendar(start='2024-04-30', end='2024-05-01'),
+            [('2024-05-01', ['Anniversary', 'Labour', 'May'])],
+        )
+        superuser = User.objects.create_user(username='superuser', password='superuser', is_superuser=True)
+        self.client.force_authenticate(user=superuser, token=Token.objects.create(user=superuser))
+        response = self.client.post('/api/feasts/', {'title': 'Rule', 'recurrence': 'yearly'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('date_of_feast', response.data)
+
+    def test_invalid(self):
+        """
+        Checks that malformed dates, reversed or too long ranges and bad ids are rejected.
+        """
+        for params in (
+            {'start': '2024-13-01'},
+            {'start': '2024-05-02', 'end': '2024-05-01'},
+            {'start': '2024-01-01', 'end': '2025-01-01'},
+            {'start': (timezone.localdate() + timedelta(days=HORIZON_DAYS + 1)).isoformat()},
+            {'country': 'abc'},
+        ):
+            response = self.client.get('/api/feasts/calendar/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProximityTest(TestCase):
+    """
+    A test case for the nearest and within city queries.
+    """
+    def setUp(self):
+        """
+        Creates located and unlocated cities and authenticates a regular user.
+        """
+        country = Country.objects.create(name='Russia')
+        City.objects.create(name='Moscow', country=country, coordinates='55°45′21″N 37°37′04″E')
+        City.objects.create(name='Tver', country=country, coordinates='56.8587, 35.9176')
+        City.objects.create(name='Vladivostok', country=country, coordinates='43.1155 N, 131.8855 E')
+        City.objects.create(name='Nowhere', country=country, coordinates='unknown')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='user', is_superuser=True)
+        self.client.force_authenticate(user=self.user, token=Token.objects.create(user=self.user))
+
+    def test_nearest(self):
+        """
+        Checks that located cities are returned nearest first with their distance in meters.
+        """
+        response = self.client.get('/api/cities/nearest/', {'lat': 55.75, 'lon': 37.62, 'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['name'] for row in response.data], ['Moscow', 'Tver'])
+        self.assertLess(response.data[0]['distance'], 1000)
+        self.assertAlmostEqual(response.data[1]['distance'] / 1000, 161, delta=5)
+        response = self.client.get('/api/cities/nearest/', {'lat': 55.75, 'lon': 37.62})
+        self.assertEqual(len(response.data), 3)
+
+    def test_within(self):
+        """
+        Checks that only cities in the radius are returned and bulk writes are located.
+        """
+        response = self.client.get('/api/cities/within/', {'lat': 55.75, 'lon': 37.62, 'radius': 200000})
+        self.assertEqual([row['name'] for row in response.data], ['Moscow', 'Tver'])
+        city = City.objects.get(name='Nowhere')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                '/api/cities/bulk/', [{'id': str(city.id), 'coordinates': '55.8 N 37.5 E'}], format='json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get('/api/cities/within/', {'lat': 55.75, 'lon': 37.62, 'radius': 20000})
+        self.assertEqual([row['name'] for row in response.data], ['Moscow', 'Nowhere'])
+
+    def test_invalid(self):
+        """
+        Checks that missing and out of range parameters are rejected.
+        """
+        for url, params in (
+            ('/api/cities/nearest/', {'lat': 55.75}),
+            ('/api/cities/nearest/', {'lat': 91, 'lon': 0}),
+            ('/api/cities/nearest/', {'lat': 0, 'lon': 0, 'limit': 0}),
+            ('/api/cities/within/', {'lat': 0, 'lon': 0}),
+            ('/api/cities/within/', {'lat': 0, 'lon': 'x', 'radius': 10}),
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TileTest(TestCase):
+    """
+    A test case for the clustered city map tiles.
+    """
+    def setUp(self):
+        """
+        Creates cities in Moscow, Tver and Sydney and authenticates a regular user.
+        """
+        country = Country.objects.create(name='World')
+        self.moscow = City.objects.create(name='Moscow', country=country, coordinates='55.75, 37.62', population=100)
+        City.objects.create(name='Tver', country=country, coordinates='56.86, 35.92', population=10)
+        City.objects.create(name='Sydney', country=country, coordinates='-33.86, 151.21')
+        self.client = APIClient()
+        user = User.objects.create_user(username='user', password='user')
+        self.client.force_authenticate(user=user, token=Token.objects.create(user=user))
+
+    def clusters(self, zoom: int, x: int, y: int) -> list:
+        """
+        Requests a tile and returns (count, population) pairs of its clusters.
+        """
+        response = self.client.get(f'/api/cities/tiles/{zoom}/{x}/{y}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(cluster['count'], cluster['population']) for cluster in response.data['clusters']]
+
+    def test_world(self):
+        """
+        Checks that low zoom tiles sum the cells kept by triggers on writes and deletes.
+        """
+        response = self.client.get('/api/cities/tiles/0/0/0/')
+        self.assertEqual([(cluster['cell'], cluster['count']) for cluster in response.data['clusters']], [
+            ('120', 2), ('311', 1),
+        ])
+        self.assertAlmostEqual(response.data['clusters'][0]['latitude'], 56.305)
+        self.moscow.population = 1000
+        self.moscow.save()
+        self.assertEqual(self.clusters(0, 0, 0), [(2, 1010), (1, 0)])
+        City.objects.filter(name='Sydney').delete()
+        self.assertEqual(self.clusters(0, 0, 0), [(2, 1010)])
+
+    def test_zoomed(self):
+        """
+        Checks that high zoom tiles split nearby cities into their own clusters.
+        """
+        self.assertEqual(self.clusters(3, 4, 2), [(1, 10), (1, 100)])
+        self.assertEqual(self.clusters(3, 7, 4), [(1, 0)])
+        self.assertEqual(self.clusters(6, 38, 20), [(1, 100)])
+        self.assertEqual(self.clusters(6, 0, 0), [])
+
+    def test_invalid(self):
+        """
+        Checks that zoom levels and tile numbers out of range are rejected.
+        """
+        for path in ('19/0/0', '2/4/0', '2/0/4'):
+            response = self.client.get(f'/api/cities/tiles/{path}/')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CountryRollupTest(TestCase):
+    """
+    A test case for country rollups in the API.
+    """
+    def setUp(self):
+        """
+        Creates countries with cities and feasts and authenticates a regular user.
+        """
+        self.small, self.large = Country.objects.create(name='Small'), Country.objects.create(name='Large')
+        City.objects.create(name='Town', country=self.small, population=1000)
+        for name in ('First', 'Second'):
+            City.objects.create(name=name, country=self.large, population=10)
+        Feast.objects.create(title='Feast').countries.add(self.small)
+        self.client = APIClient()
+        user = User.objects.create_user(username='user', password='user')
+        self.client.force_authenticate(user=user, token=Token.objects.create(user=user))
+
+    def names(self, **params) -> list:
+        """
+        Lists countries and returns their names in order.
+        """
+        response = self.client.get('/api/countries/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['name'] for row in response.data]
+
+    def test_fields(self):
+        """
+        Checks that rollups are read in both serializers and change with the cities.
+        """
+        response = self.client.get(f'/api/countries/{self.large.id}/')
+        self.assertEqual(
+            [response.data[name] for name in ('city_count', 'city_population', 'city_area', 'feast_count')],
+            [2, 20, 0, 0],
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            City.objects.create(name='Third', country=self.large, population=5)
+        response = self.client.get(f'/api/countries/{self.large.id}/', {'flat': 1})
+        self.assertEqual((response.data['city_count'], response.data['city_population']), (3, 25))
+
+    def test_ordering(self):
+        """
+        Checks sorting by rollups in both directions, with a page size and invalid fields.
+        """
+        self.assertEqual(self.names(ordering='-city_count'), ['Large', 'Small'])
+        self.assertEqual(self.names(ordering='-city_population', flat=1), ['Small', 'Large'])
+        response = self.client.get('/api/countries/', {'ordering': 'hymn'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sorted_pages(self):
+        """
+        Checks that sorted lists are paged by cursors over the sorting field, also in flat and narrowed reads.
+        """
+        Country.objects.create(name='Empty')
+        for params in ({}, {'flat': 1}, {'flat': 1, 'fields': 'name'}, {'fields': 'name'}):
+            names, cursor = [], ''
+            while cursor is not None:
+                response = self.client.get(
+                    '/api/countries/', {'ordering': '-city_count', 'page_size': 1, 'cursor': cursor, **params},
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                names.extend(row['name'] for row in response.data['results'])
+                cursor = response.data['next_cursor']
+            self.assertEqual(names, ['Large', 'Small', 'Empty'])
+        response = self.client.get('/api/countries/', {'ordering': 'name', 'cursor': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class JobApiTest(TestCase):
+    """
+    A test case for queuing jobs and reading their status over the API.
+    """
+    def setUp(self):
+        """
+        Creates a user and a superuser with tokens.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='user')
+        self.superuser = User.objects.create_user(username='superuser', password='superuser', is_superuser=True)
+        for user in (self.user, self.superuser):
+            Token.objects.create(user=user)
+
+    def test_create(self):
+        """
+        Checks that superusers queue jobs of known types and users read their status but not their arguments.
+        """
+        self.client.force_authenticate(user=self.user, token=self.user.auth_token)
+        response = self.client.post('/api/jobs/', {'type': 'reconcile_rollups'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.superuser, token=self.superuser.auth_token)
+        response = self.client.post('/api/jobs/', {'type': 'unknown'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for name, args in (
+            ('export', {'dataset': 'planets'}), ('export', {'dataset': ['countries']}),
+            ('import_catalog', {'dataset': 'countries', 'format': ['csv'], 'path': 'countries.csv'}),
+            ('import_catalog', {'dataset': 'countries', 'path': 5}),
+        ):
+            response = self.client.post('/api/jobs/', {'type': name, 'args': args}, format='json')
+            self.assertEqual((response.status_code, list(response.data)), (status.HTTP_400_BAD_REQUEST, ['args']))
+        response = self.client.post(
+            '/api/jobs/', {'type': 'export', 'args': {'dataset': 'countries'}, 'status': 'done'}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Job.objects.get().status, JobStatus.QUEUED)
+        self.client.force_authenticate(user=self.user, token=self.user.auth_token)
+        response = self.client.get(f"/api/jobs/{response.data['id']}/")
+        self.assertEqual((response.data['type'], response.data['status']), ('export', 'queued'))
+        self.assertFalse({'args', 'result', 'error'} & set(response.data))
+        self.client.force_authenticate(user=self.superuser, token=self.superuser.auth_token)
+        response = self.client.get(f"/api/jobs/{response.data['id']}/")
+        self.assertEqual(response.data['args'], {'dataset': 'countries'})
+
+    def test_list(self):
+        """
+        Checks that lists are filtered by status and limited.
+        """
+        Job.objects.bulk_create([Job(type='export'), Job(type='export', status=JobStatus.FAILED)])
+        self.client.force_authenticate(user=self.user, token=self.user.auth_token)
+        response = self.client.get('/api/jobs/', {'status': 'failed'})
+        self.assertEqual([job['status'] for job in response.data], ['failed'])
+        self.assertNotIn('error', response.data[0])
+        self.assertEqual(len(self.client.get('/api/jobs/', {'limit': 1}).data), 1)
+        response = self.client.get('/api/jobs/', {'status': 'lost'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
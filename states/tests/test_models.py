@@ -1,11 +1,29 @@
 """Module for models test."""
 
-from datetime import datetime, timezone
+import gzip
+import json
+from datetime import date, datetime, timezone
+from pathlib import Path
+from time import perf_counter, sleep
+from uuid import RFC_4122
+from tempfile import TemporaryDirectory
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 
-from myapp.models import Country, Feast, City, Client, check_created, check_modified
+from myapp.models import (
+    Country, CountryStats, Feast, City, Client, CountryToFeast, Job, JobStatus, OutboxEvent, Recurrence,
+    check_created, check_modified, get_datetime, uuid7,
+)
+from myapp.counters import get_counts
+from myapp.ingest import import_file
+from myapp.jobs import JOB_TYPES, claim, enqueue, run, wait
+from myapp.outbox import MAX_ATTEMPTS, consume
+from myapp.rollups import reconcile
+from myapp.geo import parse_coordinates
+from myapp.recurrence import extend_occurrences, insert_occurrences, nth_weekday, occurrence_dates
 
 class CountryModelTests(TestCase):
     """
@@ -28,6 +46,21 @@ class CountryModelTests(TestCase):
         self.assertEqual(country.hymn, 'National Anthem')
 
 
+class UUIDTests(TestCase):
+    """
+    A test case for time-ordered primary keys.
+    """
+    def test_uuid7(self):
+        """
+        Checks that keys are version 7 UUIDs ordered by the time they are made at.
+        """
+        first = uuid7()
+        sleep(0.002)
+        second = uuid7()
+        self.assertEqual((first.version, first.variant), (7, RFC_4122))
+        self.assertLess(first, second)
+        self.assertEqual(Country.objects.create(name='A').id.version, 7)
+
 class FeastModelTests(TestCase):
     """
     A test case for validating the fields and
@@ -159,3 +192,405 @@ invalid_methods = {f'test_inval_{args[0].__name__}':
 valid_methods = {f'test_val_{args[0].__name__}': create_val_test(*args) for args in validators_pass}
 
 ValidatorsTest = type('ValidatorsTest', (TestCase,), invalid_methods | valid_methods)
+
+
+class RecurrenceTests(TestCase):
+    """
+    A test case for feast recurrence rules and their occurrences.
+    """
+    def test_nth_weekday(self):
+        """
+        Checks weekdays counted from the start and the end of a month.
+        """
+        self.assertEqual(nth_weekday(2024, 5, 0, -1), date(2024, 5, 27))
+        self.assertEqual(nth_weekday(2024, 5, 0, 1), date(2024, 5, 6))
+        self.assertEqual(nth_weekday(2024, 2, 3, 4), date(2024, 2, 22))
+        self.assertEqual(nth_weekday(2024, 11, 3, 4), date(2024, 11, 28))
+
+    def test_yearly(self):
+        """
+        Checks that yearly feasts start on their date and move February 29 in common years.
+        """
+        feast = Feast(title='Leap', date_of_feast=date(2024, 2, 29), recurrence=Recurrence.YEARLY)
+        self.assertEqual(
+            occurrence_dates(feast, date(2020, 1, 1), date(2026, 12, 31)),
+            [date(2024, 2, 29), date(2025, 2, 28), date(2026, 2, 28)],
+        )
+
+    def test_clean(self):
+        """
+        Checks that rules without the fields they repeat by are rejected.
+        """
+        with self.assertRaises(ValidationError):
+            Feast(title='A', recurrence=Recurrence.YEARLY).clean()
+        with self.assertRaises(ValidationError):
+            Feast(title='A', recurrence=Recurrence.WEEKDAY, recurrence_month=5).clean()
+
+    def test_occurrences(self):
+        """
+        Checks that saved feasts are expanded and a rule change replaces their occurrences.
+        """
+        feast = Feast.objects.create(
+            title='Memorial', recurrence=Recurrence.WEEKDAY,
+            recurrence_month=5, recurrence_weekday=0, recurrence_week=-1,
+        )
+        days = list(feast.occurrences.values_list('date', flat=True))
+        self.assertTrue(days)
+        self.assertTrue(all(day.month == 5 and day.weekday() == 0 and day.day > 24 for day in days))
+        feast.recurrence = Recurrence.NONE
+        feast.date_of_feast = date(2001, 1, 1)
+        feast.save()
+        self.assertEqual(list(feast.occurrences.values_list('date', flat=True)), [date(2001, 1, 1)])
+
+    def test_extend(self):
+        """
+        Checks that the horizon is extended only after the last stored occurrence.
+        """
+        feast = Feast.objects.create(title='New Year', date_of_feast=date(2000, 1, 1), recurrence=Recurrence.YEARLY)
+        feast.occurrences.all().delete()
+        self.assertEqual(extend_occurrences((date(2030, 1, 1), date(2032, 6, 1))), 3)
+        self.assertEqual(extend_occurrences((date(2030, 1, 1), date(2033, 6, 1))), 1)
+        self.assertEqual(extend_occurrences((date(2030, 1, 1), date(2033, 6, 1))), 0)
+        self.assertEqual(feast.occurrences.count(), 4)
+        self.assertEqual(insert_occurrences([(feast.pk, date(2030, 1, 1)), (feast.pk, date(2034, 1, 1))]), 1)
+
+
+class CoordinatesTests(TestCase):
+    """
+    A test case for parsing city coordinates.
+    """
+    def test_formats(self):
+        """
+        Checks decimal, hemisphere and degrees, minutes and seconds notations.
+        """
+        self.assertEqual(parse_coordinates('55.7558, 37.6173'), (55.7558, 37.6173))
+        self.assertEqual(parse_coordinates('-33.86 151.21'), (-33.86, 151.21))
+        self.assertEqual(parse_coordinates('40.7128 N, 74.0060 W'), (40.7128, -74.006))
+        self.assertEqual(parse_coordinates('74.0060 W 40.7128 N'), (40.7128, -74.006))
+        latitude, longitude = parse_coordinates('55°45′21″N 37°37′04″E')
+        self.assertAlmostEqual(latitude, 55.7558, places=4)
+        self.assertAlmostEqual(longitude, 37.6178, places=4)
+
+    def test_invalid(self):
+        """
+        Checks that texts which are not a single point are rejected.
+        """
+        for text in (None, '', 'unknown', '55.75', '1 2 3', '95, 10', '10, 190', '10 N 20 S'):
+            self.assertIsNone(parse_coordinates(text))
+
+    def test_save(self):
+        """
+        Checks that saving a city keeps its latitude and longitude in sync.
+        """
+        city = City.objects.create(name='Moscow', coordinates='55.75, 37.62')
+        self.assertEqual((city.latitude, city.longitude), (55.75, 37.62))
+        city.coordinates = 'unknown'
+        city.save(update_fields=['coordinates'])
+        city.refresh_from_db()
+        self.assertIsNone(city.latitude)
+
+
+class RollupTests(TestCase):
+    """
+    A test case for the country rollups kept by triggers.
+    """
+    def setUp(self):
+        """
+        Creates two countries.
+        """
+        self.first, self.second = Country.objects.create(name='First'), Country.objects.create(name='Second')
+
+    def rollups(self, country) -> tuple:
+        """
+        Returns the city count, population and area and the feast count of a country.
+        """
+        stats = CountryStats.objects.get(country=country)
+        return stats.city_count, stats.city_population, stats.city_area, stats.feast_count
+
+    def test_cities(self):
+        """
+        Checks that city inserts, moves, updates and deletes, single and bulk, are rolled up.
+        """
+        self.assertEqual(self.rollups(self.first), (0, 0, 0, 0))
+        city = City.objects.create(name='A', country=self.first, population=100, area_city=10)
+        City.objects.bulk_create([City(name='B', country=self.first, population=5), City(name='C')])
+        self.assertEqual(self.rollups(self.first), (2, 105, 10, 0))
+        city.country = self.second
+        city.save()
+        City.objects.filter(name='B').update(population=50)
+        self.assertEqual(self.rollups(self.first), (1, 50, 0, 0))
+        self.assertEqual(self.rollups(self.second), (1, 100, 10, 0))
+        City.objects.all().delete()
+        self.assertEqual(self.rollups(self.first), (0, 0, 0, 0))
+        self.assertEqual(self.rollups(self.second), (0, 0, 0, 0))
+
+    def test_feasts(self):
+        """
+        Checks that feast links are rolled up and deleting a country removes its rollups.
+        """
+        feast = Feast.objects.create(title='Feast')
+        feast.countries.add(self.first, self.second)
+        CountryToFeast.objects.create(country=self.first, feast=Feast.objects.create(title='Other'))
+        self.assertEqual(self.rollups(self.first)[3], 2)
+        feast.delete()
+        self.assertEqual(self.rollups(self.first)[3], 1)
+        self.assertEqual(self.rollups(self.second)[3], 0)
+        self.first.delete()
+        self.assertFalse(CountryStats.objects.filter(country=self.first.pk).exists())
+
+    def test_reconcile(self):
+        """
+        Checks that reconcile fixes only drifted and missing rollups.
+        """
+        City.objects.create(name='A', country=self.first, population=7)
+        self.assertEqual(reconcile(), [])
+        CountryStats.objects.filter(country=self.first).update(city_count=5)
+        CountryStats.objects.filter(country=self.second).delete()
+        self.assertEqual(sorted(reconcile()), sorted([self.first.pk, self.second.pk]))
+        self.assertEqual(self.rollups(self.first), (1, 7, 0, 0))
+        self.assertEqual(self.rollups(self.second), (0, 0, 0, 0))
+
+
+class CounterTests(TestCase):
+    """
+    A test case for the row counters kept by triggers.
+    """
+    def test_exact(self):
+        """
+        Checks that single, bulk and cascading writes are counted.
+        """
+        country = Country.objects.create(name='A')
+        City.objects.bulk_create([City(name=str(index), country=country) for index in range(3)])
+        Feast.objects.create(title='Feast')
+        self.assertEqual(get_counts((Country, Feast, City)), {Country: 1, Feast: 1, City: 3})
+        country.delete()
+        self.assertEqual(get_counts((Country, City)), {Country: 0, City: 0})
+
+    def test_estimated(self):
+        """
+        Checks that estimates come from the statistics of analyzed tables.
+        """
+        City.objects.bulk_create([City(name=str(index)) for index in range(5)])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE states.city')
+        self.assertEqual(get_counts((City,), estimate=True), {City: 5})
+
+
+class ImportTests(TestCase):
+    """
+    A test case for bulk imports of catalog files.
+    """
+    def setUp(self):
+        """
+        Creates a directory for the imported files.
+        """
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name: str, text: str) -> Path:
+        """
+        Writes a file, gzipped when its name ends with .gz.
+        """
+        path = Path(self.directory.name) / name
+        path.write_bytes(gzip.compress(text.encode()) if name.endswith('.gz') else text.encode())
+        return path
+
+    def test_upsert(self):
+        """
+        Checks that rows are matched by natural keys and invalid rows are rejected.
+        """
+        Country.objects.create(name='A', population=1)
+        countries = self.write('countries.csv', 'name,population\nA,5\nB,-1\nC,x\nD,\n')
+        *_, (progress, errors) = import_file('countries', countries)
+        self.assertEqual((progress.rows, progress.written, progress.rejected), (4, 2, 2))
+        self.assertEqual(Country.objects.get(name='A').population, 5)
+        self.assertEqual(sorted(Country.objects.values_list('name', flat=True)), ['A', 'D'])
+        cities = [{'name': 'X', 'country': 'A', 'coordinates': '55.75, 37.61'}, {'name': 'Y', 'country': 'Z'}]
+        lines = ''.join(json.dumps(city) + '\n' for city in cities)
+        list(import_file('cities', self.write('cities.jsonl.gz', lines)))
+        city = City.objects.get()
+        self.assertEqual((city.country.name, city.latitude), ('A', 55.75))
+        self.assertEqual(CountryStats.objects.get(country=city.country).city_count, 1)
+        list(import_file('cities', self.write('again.jsonl', lines)))
+        self.assertEqual(City.objects.count(), 1)
+        lines = json.dumps({'name': 'X', 'country': 'A', 'population': 7}) + '\n'
+        lines += json.dumps({'name': 'W', 'country': 'A', 'coordinates': None, 'population': 1}) + '\n'
+        list(import_file('cities', self.write('partial.jsonl', lines)))
+        city = City.objects.get(name='X')
+        self.assertEqual((city.population, city.coordinates, city.latitude), (7, '55.75, 37.61', 55.75))
+        lines = json.dumps({'name': 'X', 'country': 'A', 'coordinates': None}) + '\n'
+        list(import_file('cities', self.write('cleared.jsonl', lines)))
+        city = City.objects.get(name='X')
+        self.assertEqual((city.population, city.coordinates, city.latitude), (7, None, None))
+
+    def test_feast_rules(self):
+        """
+        Checks that feasts breaking the rules of Feast.clean are rejected, also by the values they keep.
+        """
+        Feast.objects.create(title='Dated', date_of_feast=date(2024, 5, 1))
+        feasts = self.write('feasts.csv', (
+            'title,recurrence,recurrence_month,recurrence_weekday,recurrence_week\n'
+            'X,yearly,,,\nY,weekday,5,,\nZ,weekday,5,0,-1\nDated,yearly,,,\n'
+        ))
+        batches = list(import_file('feasts', feasts))
+        progress = batches[-1][0]
+        self.assertEqual([row for _, errors in batches for row, _ in errors], [1, 2])
+        self.assertEqual((progress.written, progress.rejected), (2, 2))
+        self.assertEqual(Feast.objects.get(title='Dated').recurrence, Recurrence.YEARLY)
+        self.assertTrue(Feast.objects.get(title='Z').occurrences.exists())
+
+    def test_resume(self):
+        """
+        Checks that an interrupted import continues after the written batches.
+        """
+        path = self.write('feasts.csv', 'title,recurrence_month\nFirst,1\nSecond,13\nThird,\n')
+        batches = import_file('feasts', path, batch_size=1)
+        next(batches)
+        batches.close()
+        self.assertEqual(list(Feast.objects.values_list('title', flat=True)), ['First'])
+        *_, (progress, _) = import_file('feasts', path, batch_size=1)
+        self.assertEqual((progress.rows, progress.written, progress.rejected), (3, 2, 1))
+        self.assertEqual(list(import_file('feasts', path)), [])
+
+
+class OutboxTests(TestCase):
+    """
+    A test case for the outbox of catalog changes.
+    """
+    def test_events(self):
+        """
+        Checks that writes, including cascaded deletes, leave events with row payloads.
+        """
+        country = Country.objects.create(name='A')
+        City.objects.create(name='B', country=country)
+        Country.objects.filter(pk=country.pk).update(population=5)
+        country.delete()
+        events = [(event.table, event.operation) for event in OutboxEvent.objects.order_by('id')]
+        self.assertEqual(events[:3], [
+            ('states.country', 'insert'), ('states.city', 'insert'), ('states.country', 'update'),
+        ])
+        self.assertEqual(set(events[3:]), {('states.city', 'delete'), ('states.country', 'delete')})
+        self.assertEqual(OutboxEvent.objects.filter(operation='update').get().payload['population'], 5)
+
+    def test_consume(self):
+        """
+        Checks that handled batches are deleted and failed ones are retried a limited number of times.
+        """
+        for name in ('A', 'B', 'C'):
+            Country.objects.create(name=name)
+        handled = []
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(consume([handled.extend], size=2), (2, 0))
+        self.assertTrue([query for query in queries if 'FOR UPDATE SKIP LOCKED' in query['sql']])
+        self.assertEqual([event.payload['name'] for event in handled], ['A', 'B'])
+
+        def fail(events):
+            raise RuntimeError('unavailable')
+
+        for _ in range(MAX_ATTEMPTS):
+            self.assertEqual(consume([fail]), (0, 1))
+        self.assertEqual(consume([handled.extend]), (0, 0))
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.attempts, event.error), (MAX_ATTEMPTS, 'RuntimeError: unavailable'))
+
+    def test_poison_event(self):
+        """
+        Checks that a failing event does not charge the attempts of the others in its batch.
+        """
+        for name in ('A', 'B', 'C'):
+            Country.objects.create(name=name)
+        handled = []
+
+        def handler(events):
+            if any(event.payload['name'] == 'B' for event in events):
+                raise ValueError('poison')
+            handled.extend(event.payload['name'] for event in events)
+
+        self.assertEqual(consume([handler]), (2, 1))
+        self.assertEqual(handled, ['A', 'C'])
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.payload['name'], event.attempts), ('B', 1))
+
+class JobTests(TestCase):
+    """
+    A test case for the background job queue.
+    """
+    def test_run(self):
+        """
+        Checks that a claimed job runs with its arguments and stores the result.
+        """
+        country = Country.objects.create(name='A')
+        City.objects.create(name='B', country=country)
+        job = enqueue('delete_country', {'id': str(country.id)})
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(claim(), job)
+        self.assertTrue([query for query in queries if 'FOR UPDATE SKIP LOCKED' in query['sql']])
+        job = run(Job.objects.get(pk=job.pk))
+        self.assertEqual((job.status, job.attempts, job.result), (JobStatus.DONE, 1, {'deleted': 3}))
+        self.assertFalse(Country.objects.exists())
+        self.assertIsNone(claim())
+        with self.assertRaises(ValueError):
+            enqueue('unknown')
+
+    def test_retries(self):
+        """
+        Checks that a failed job is queued again after a backoff and fails for good after its attempts.
+        """
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / 'countries.csv'
+            path.write_text('name\n')
+            job = enqueue('import_catalog', {'dataset': 'countries', 'path': str(path)})
+        max_attempts = JOB_TYPES['import_catalog'][2]
+        for attempt in range(1, max_attempts + 1):
+            job = run(claim())
+            self.assertEqual((job.attempts, job.error.split(':')[0]), (attempt, 'FileNotFoundError'))
+            if attempt < max_attempts:
+                self.assertEqual(job.status, JobStatus.QUEUED)
+                self.assertGreater(job.run_at, get_datetime())
+                self.assertIsNone(claim())
+                Job.objects.filter(pk=job.pk).update(run_at=get_datetime())
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertIsNone(claim())
+
+    def test_concurrency(self):
+        """
+        Checks that a job type does not run more jobs at once than its limit and that abandoned jobs are rescued.
+        """
+        first, second = enqueue('reconcile_rollups'), enqueue('reconcile_rollups')
+        running = claim()
+        self.assertEqual(running, first)
+        self.assertIsNone(claim())
+        run(running)
+        self.assertEqual(claim(), second)
+        run(Job.objects.get(pk=second.pk))
+        Job.objects.filter(pk=second.pk).update(status=JobStatus.RUNNING, attempts=1)
+        self.assertEqual(claim(), second)
+        self.assertEqual(run(Job.objects.get(pk=second.pk)).attempts, 2)
+
+    def test_wait(self):
+        """
+        Checks that idle workers do not spin on ready jobs of a type at its concurrency limit.
+        """
+        enqueue('reconcile_rollups')
+        running = claim()
+        enqueue('reconcile_rollups')
+        start = perf_counter()
+        wait(0.2)
+        self.assertGreaterEqual(perf_counter() - start, 0.15)
+        run(running)
+
+    def test_invalid_args(self):
+        """
+        Checks that arguments are checked against the handler when a job is queued.
+        """
+        for name, args in (
+            ('reconcile_rollups', {'dry_run': True}),
+            ('delete_country', {}),
+            ('delete_country', {'id': 'abc'}),
+            ('export', {'dataset': 'planets'}),
+            ('export', {'dataset': 'feasts', 'format': 'xml'}),
+            ('import_catalog', {'dataset': 'countries', 'path': '/nonexistent/countries.csv'}),
+        ):
+            with self.assertRaises(ValueError):
+                enqueue(name, args)
+        self.assertFalse(Job.objects.exists())
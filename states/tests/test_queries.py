@@ -0,0 +1,109 @@
+"""Module for testing query counts."""
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+from myapp.models import Country, Feast, City, Client
+
+ROW_COUNTS = (2, 20)
+YEAR = timezone.localdate().year
+
+def fill(rows: int) -> None:
+    """
+    Creates countries with cities and feasts linked to every country.
+    """
+    countries = [Country.objects.create(name=f'country {index}') for index in range(rows)]
+    for index in range(rows):
+        City.objects.create(name=f'city {index}', country=countries[index])
+        Feast.objects.create(title=f'feast {index}').countries.add(*countries)
+
+def create_queries_test(url, max_queries, params=None, api=True):
+    """
+    Creates a test method that checks a request runs at most max_queries
+    queries whatever the number of rows.
+    """
+    def method(self):
+        """
+        Requests the url over a small and a bigger table and checks query counts.
+        """
+        for rows in ROW_COUNTS:
+            fill(rows - Country.objects.count())
+            path = url.format(**self.ids())
+            with CaptureQueriesContext(connection) as queries:
+                response = self.request(path, params, api)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(queries), max_queries)
+    return method
+
+class QueriesTestBase(TestCase):
+    """
+    A base test case which makes authenticated API and page requests.
+    """
+    def setUp(self):
+        """
+        Authenticates API and page clients as a regular user.
+        """
+        user = User.objects.create_user(username='user', password='user')
+        Client.objects.create(user=user)
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(user=user, token=Token.objects.create(user=user))
+        self.client.force_login(user=user)
+
+    def ids(self) -> dict:
+        """
+        Returns ids of the first rows for detail urls.
+        """
+        return {
+            'country': Country.objects.order_by('name').first().id,
+            'feast': Feast.objects.order_by('title').first().id,
+            'city': City.objects.order_by('name').first().id,
+        }
+
+    def request(self, url, params, api):
+        """
+        Makes a GET request and reads the whole response.
+        """
+        response = (self.api_client if api else self.client).get(url, params)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+endpoints = {
+    'countries_list': ('/api/countries/', 2),
+    'countries_detail': ('/api/countries/{country}/', 2),
+    'feasts_list': ('/api/feasts/', 4),
+    'feasts_detail': ('/api/feasts/{feast}/', 4),
+    'feasts_page': ('/api/feasts/', 5, {'page_size': 5}),
+    'feasts_flat': ('/api/feasts/', 3, {'flat': 1}),
+    'feasts_countries_field': ('/api/feasts/', 4, {'fields': 'url,countries'}),
+    'feasts_calendar': ('/api/feasts/calendar/', 1, {'start': f'{YEAR}-01-01', 'end': f'{YEAR}-12-31'}),
+    'feasts_calendar_past': ('/api/feasts/calendar/', 2, {'start': '2024-01-01', 'end': '2024-12-31'}),
+    'cities_list': ('/api/cities/', 2),
+    'cities_detail': ('/api/cities/{city}/', 2),
+    'cities_page': ('/api/cities/', 3, {'page_size': 5}),
+    'cities_export': ('/api/export/cities.ndjson', 1),
+    'links_export': ('/api/export/country-feasts.csv', 1),
+}
+pages = {
+    'home_page': ('/', 3),
+    'countries_page': ('/countries/', 4),
+    'feasts_page': ('/feasts/', 4),
+    'cities_page': ('/cities/', 4),
+    'country_page': ('/country/?id={country}', 5),
+    'feast_page': ('/feast/?id={feast}', 4),
+    'city_page': ('/city/?id={city}', 4),
+}
+
+api_methods = {f'test_{name}': create_queries_test(*args) for name, args in endpoints.items()}
+ApiQueriesTest = type('ApiQueriesTest', (QueriesTestBase,), api_methods)
+
+page_methods = {
+    f'test_{name}': create_queries_test(url, max_queries, api=False)
+    for name, (url, max_queries) in pages.items()
+}
+PageQueriesTest = type('PageQueriesTest', (QueriesTestBase,), page_methods)
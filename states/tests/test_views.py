@@ -1,10 +1,15 @@
 """Modeule for views test."""
 
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.test.client import Client as TestClient
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.utils import translation
 from rest_framework import status
+from myapp.caching import get_fragment_keys
 from myapp.models import Country, Feast, City, Client
 
 def create_method_with_auth(url, page_name, template, login=False):
@@ -113,3 +118,136 @@ TestNoAuth = type('TestNoAuth', (TestCase,), methods_no_auth)
 methods_intance = {f'test_{page[1]}':
                    create_method_instance(*page) for page in instance_pages}
 TestInstancePages = type('TestInstancePages', (TestCase,), methods_intance)
+
+
+class SearchPageTest(TestCase):
+    """
+    A test case for the name search on catalog pages.
+    """
+    def test_search(self):
+        """
+        Checks that the cities page lists only matches of the query and keeps it in the form.
+        """
+        user = User.objects.create(username='user', password='user')
+        Client.objects.create(user=user)
+        self.client.force_login(user=user)
+        country = Country.objects.create(name='A')
+        for name in ('Moscow', 'Kazan'):
+            City.objects.create(name=name, country=country)
+        response = self.client.get('/cities/', {'q': 'mosc'})
+        self.assertEqual([city.name for city in response.context['cities_list']], ['Moscow'])
+        self.assertContains(response, 'value="mosc"')
+
+
+class CountryRollupPageTest(TestCase):
+    """
+    A test case for country rollups on catalog pages.
+    """
+    def test_ordering(self):
+        """
+        Checks that countries are sorted by their rollups and the detail page shows them.
+        """
+        user = User.objects.create(username='user', password='user')
+        Client.objects.create(user=user)
+        self.client.force_login(user=user)
+        small, large = Country.objects.create(name='Small'), Country.objects.create(name='Large')
+        City.objects.create(name='Town', country=small)
+        for name in ('First', 'Second'):
+            City.objects.create(name=name, country=large)
+        response = self.client.get('/countries/', {'ordering': '-city_count'})
+        self.assertEqual([country.name for country in response.context['countries_list']], ['Large', 'Small'])
+        response = self.client.get('/countries/', {'ordering': 'unknown'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse('country'), {'id': large.id})
+        self.assertContains(response, 'Cities: 2')
+
+
+class KeysetPageTest(TestCase):
+    """
+    A test case for cursor pages of catalog lists.
+    """
+    def test_keyset(self):
+        """
+        Checks that next and previous cursors walk the list in the order of numbered pages.
+        """
+        user = User.objects.create(username='user', password='user')
+        Client.objects.create(user=user)
+        self.client.force_login(user=user)
+        country = Country.objects.create(name='A')
+        City.objects.bulk_create(City(name=f'City {number}', country=country) for number in range(25))
+        expected = [
+            city.id for page in (1, 2, 3)
+            for city in self.client.get('/cities/', {'page': page}).context['cities_list']
+        ]
+        self.assertEqual(expected, list(City.objects.order_by('created', 'pk').values_list('id', flat=True)))
+        response = self.client.get('/cities/', {'after': ''})
+        seen = [city.id for city in response.context['cities_list']]
+        self.assertIsNone(response.context['keyset']['previous'])
+        while response.context['keyset']['next']:
+            response = self.client.get('/cities/', {'after': response.context['keyset']['next']})
+            seen.extend(city.id for city in response.context['cities_list'])
+        self.assertEqual(seen, expected)
+        response = self.client.get('/cities/', {'before': response.context['keyset']['previous']})
+        self.assertEqual([city.id for city in response.context['cities_list']], expected[10:20])
+        self.assertContains(response, '?after=')
+        response = self.client.get('/cities/', {'after': 'broken'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_keyset_ordering(self):
+        """
+        Checks that cursor pages keep a requested ordering.
+        """
+        user = User.objects.create(username='user', password='user')
+        Client.objects.create(user=user)
+        self.client.force_login(user=user)
+        countries = [Country.objects.create(name=f'Country {number:02}') for number in range(12)]
+        response = self.client.get('/countries/', {'ordering': '-name', 'after': ''})
+        self.assertEqual(response.context['countries_list'][0], countries[-1])
+        response = self.client.get('/countries/', {'ordering': '-name', 'after': response.context['keyset']['next']})
+        self.assertEqual(list(response.context['countries_list']), countries[1::-1])
+
+
+class FragmentCacheTest(TestCase):
+    """
+    A test case for cached fragments of catalog and country pages.
+    """
+    def setUp(self):
+        """
+        Logs a user in and starts from an empty cache.
+        """
+        cache.clear()
+        user = User.objects.create(username='user', password='user')
+        Client.objects.create(user=user)
+        self.client.force_login(user=user)
+
+    def test_country_blocks(self):
+        """
+        Checks that country blocks are served from the cache until their rows change.
+        """
+        country = Country.objects.create(name='A')
+        City.objects.create(name='Moscow', country=country)
+        self.client.get(reverse('country'), {'id': country.id})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('country'), {'id': country.id})
+        self.assertContains(response, 'Moscow')
+        self.assertFalse([query for query in queries if 'states"."city"' in query['sql']])
+        City.objects.create(name='Kazan', country=country)
+        self.assertContains(self.client.get(reverse('country'), {'id': country.id}), 'Kazan')
+
+    def test_list_rows(self):
+        """
+        Checks that list rows are cached per page and language and dropped when rows change.
+        """
+        country = Country.objects.create(name='A')
+        City.objects.create(name='Moscow', country=country)
+        self.client.get('/cities/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/cities/')
+        self.assertContains(response, 'Moscow')
+        self.assertFalse([query for query in queries if 'states"."city"' in query['sql']])
+        City.objects.create(name='Kazan', country=country)
+        self.assertContains(self.client.get('/cities/'), 'Kazan')
+        with translation.override('en'):
+            english = get_fragment_keys(rows=(City,))
+        with translation.override('ru'):
+            self.assertNotEqual(get_fragment_keys(rows=(City,)), english)